@@ -1,18 +1,33 @@
+import base64
 import json
 import os
+import queue
 import uuid
 import threading
-from datetime import timedelta
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+import click
+from datetime import datetime, timedelta
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_session import Session
 from flasgger import Swagger
-from models import db, User, ProcessingResult
-from ocr import perform_ocr
-from tesseract_ocr import perform_tesseract_ocr
-from htr import perform_htr
-from ner import perform_ner, translate_text
-from relations import extract_relations
+from flask_migrate import Migrate
+from models import db, enable_sqlite_tuning, User, ProcessingResult, StageResult
+from registry import registry, default_device
+from cache import ResultCache
+from jobs import JobScheduler, JobStore, QueueFullError
+from pipeline import Pipeline
+from batching import DynamicBatcher
+from model_server import ModelServer, ModelClient, ModelServerError
+from events import progress_events
+from ocr import perform_ocr, get_reader, EASYOCR_MODEL_NAME
+from tesseract_ocr import perform_tesseract_ocr, get_tesseract, TESSERACT_MODEL_NAME
+from ocr_cascade import perform_auto_ocr, cascade_stats
+from htr import perform_htr, load_trocr, HTR_MODEL_NAME
+from ner import perform_ner_spans, perform_ner_spans_batch, render_entities, translate_text, translate_with_offsets
+from ner import get_ner_model, NER_MODEL_NAME, NER_OUTPUT_VERSION
+from relation_rules import extract_rule_relations
+from relations import extract_relations_batch, RelationBatcher, _load_model as load_relation_model
+from relations import MODEL_NAME as RELATION_MODEL_NAME, cache_version as relations_cache_version
 
 app = Flask(__name__)
 
@@ -27,6 +42,8 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 db_path = os.path.join(basedir, 'archive.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite: ожидание блокировки при записи из фоновых потоков (мс)
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 30000))
 
 # Конфигурация сессий
 app.config['SESSION_TYPE'] = 'filesystem'
@@ -36,6 +53,90 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
 app.config['SESSION_USE_SIGNER'] = True
 app.config['SESSION_KEY_PREFIX'] = 'ai_archive_'
 
+# Модели, загружаемые заранее (через запятую: ocr,htr,ner,relations,tesseract)
+app.config['WARMUP_MODELS'] = [
+    name.strip() for name in os.environ.get('WARMUP_MODELS', '').split(',') if name.strip()
+]
+
+# Точность моделей на CPU (через запятую, например relations=int8,htr=bfloat16):
+# float32 (по умолчанию), bfloat16 или int8 (динамическое квантование)
+app.config['MODEL_PRECISION'] = {
+    name.strip(): precision.strip() for name, precision in (
+        item.split('=', 1) for item in os.environ.get('MODEL_PRECISION', '').split(',') if '=' in item)
+}
+
+# Фоновая обработка: документов в работе, размер очереди и потоки каждого этапа
+app.config['WORKER_COUNT'] = int(os.environ.get('WORKER_COUNT', 4))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', 20))
+app.config['STAGE_WORKERS'] = {
+    'recognizing': int(os.environ.get('RECOGNIZING_CONCURRENCY', 2)),
+    'translating': int(os.environ.get('TRANSLATING_CONCURRENCY', 1)),
+    'ner': int(os.environ.get('NER_CONCURRENCY', 2)),
+    # Документы на этапе связей ждут общий батч LLM, а не модель по очереди
+    'relations': int(os.environ.get('RELATIONS_CONCURRENCY', os.environ.get('RELATIONS_BATCH_SIZE', 4))),
+}
+# Динамический батчинг LLM: максимум текстов в батче и ожидание попутчиков (мс)
+app.config['RELATIONS_BATCH_SIZE'] = int(os.environ.get('RELATIONS_BATCH_SIZE', 4))
+app.config['RELATIONS_BATCH_WAIT_MS'] = int(os.environ.get('RELATIONS_BATCH_WAIT_MS', 50))
+# Батчинг NER в сервере моделей: максимум текстов в батче и ожидание (мс)
+app.config['NER_BATCH_SIZE'] = int(os.environ.get('NER_BATCH_SIZE', 8))
+app.config['NER_BATCH_WAIT_MS'] = int(os.environ.get('NER_BATCH_WAIT_MS', 20))
+# Задачи хранятся в БД: аренда, heartbeat и повторные попытки
+app.config['JOB_LEASE_SECONDS'] = int(os.environ.get('JOB_LEASE_SECONDS', 120))
+app.config['JOB_HEARTBEAT_SECONDS'] = int(os.environ.get('JOB_HEARTBEAT_SECONDS', 30))
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+app.config['JOB_POLL_SECONDS'] = int(os.environ.get('JOB_POLL_SECONDS', 10))
+
+# Интервал keep-alive для потока прогресса (SSE), секунды
+app.config['SSE_KEEPALIVE_SECONDS'] = int(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+
+# Список результатов: размер страницы, максимум для API и длина превью текста
+app.config['RESULTS_PAGE_SIZE'] = int(os.environ.get('RESULTS_PAGE_SIZE', 20))
+app.config['RESULTS_MAX_PAGE_SIZE'] = int(os.environ.get('RESULTS_MAX_PAGE_SIZE', 100))
+app.config['RESULT_PREVIEW_CHARS'] = int(os.environ.get('RESULT_PREVIEW_CHARS', 200))
+
+# Извлечение связей: rules - только шаблоны по спанам NER, llm - только модель,
+# rules-then-llm - модель, если шаблоны покрыли меньше заданной доли сущностей
+RELATIONS_MODES = ('llm', 'rules', 'rules-then-llm')
+RELATIONS_MODE_ALIASES = {'rules-then-llm-on-low-coverage': 'rules-then-llm'}
+
+
+def relations_mode(value: str) -> str:
+    """
+    Validates a `RELATIONS_MODE` value and resolves aliases.
+
+    Raises:
+        ValueError: The value is not one of `RELATIONS_MODES` or an alias.
+    """
+    mode = RELATIONS_MODE_ALIASES.get(value.strip(), value.strip())
+    if mode not in RELATIONS_MODES:
+        raise ValueError(f"Unknown RELATIONS_MODE {value!r}, expected one of: {', '.join(RELATIONS_MODES)}")
+    return mode
+
+
+app.config['RELATIONS_MODE'] = relations_mode(os.environ.get('RELATIONS_MODE', 'llm'))
+app.config['RELATIONS_RULES_MIN_COVERAGE'] = float(os.environ.get('RELATIONS_RULES_MIN_COVERAGE', 0.6))
+
+# Tesseract: процессов на страницу; больше 1 - страница делится на блоки текста,
+# которые распознаются параллельно (1 - вся страница одним вызовом)
+app.config['TESSERACT_WORKERS'] = int(os.environ.get('TESSERACT_WORKERS', 1))
+
+# HTR: группировать фрагменты в строки с поправкой на наклон страницы (1 - включено)
+app.config['HTR_DESKEW'] = os.environ.get('HTR_DESKEW', '').lower() in ('1', 'true', 'yes')
+
+# Режим OCR auto: строки Tesseract с уверенностью ниже порога (0-100) читает EasyOCR,
+# при такой доле неуверенных строк EasyOCR читает всю страницу
+app.config['OCR_AUTO_MIN_CONFIDENCE'] = float(os.environ.get('OCR_AUTO_MIN_CONFIDENCE', 70))
+app.config['OCR_AUTO_PAGE_SHARE'] = float(os.environ.get('OCR_AUTO_PAGE_SHARE', 0.5))
+
+# Сервер моделей: Unix-сокет общего процесса с моделями (пусто - модели в этом процессе)
+# и таймаут ожидания ответа, секунды
+app.config['MODEL_SERVER_SOCKET'] = os.environ.get('MODEL_SERVER_SOCKET', '')
+app.config['MODEL_SERVER_TIMEOUT'] = float(os.environ.get('MODEL_SERVER_TIMEOUT', 600))
+
+# Кэш результатов NER и извлечения связей по хэшу текста (байт, 0 - отключен)
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
 # Папка для загрузок
 UPLOAD_FOLDER = 'static/uploads'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -44,6 +145,7 @@ os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
 
 # Инициализация расширений
 db.init_app(app)
+migrate = Migrate(app, db, render_as_batch=True)
 Session(app)
 
 login_manager = LoginManager()
@@ -70,11 +172,91 @@ def load_user(user_id):
 
 # Создание таблиц базы данных
 with app.app_context():
+    enable_sqlite_tuning(db.engine, app.config['SQLITE_BUSY_TIMEOUT_MS'])
     db.create_all()
     print(f"Database initialized at: {db_path}")
     print(f"Session storage: {app.config['SESSION_FILE_DIR']}")
 
 
+# ============ Model Warm-up ============
+
+# Models are loaded lazily on first use; name -> (registry model name, loader)
+MODELS = {
+    'ocr': (EASYOCR_MODEL_NAME, get_reader),
+    'htr': (HTR_MODEL_NAME, load_trocr),
+    'ner': (NER_MODEL_NAME, get_ner_model),
+    'relations': (RELATION_MODEL_NAME, load_relation_model),
+    'tesseract': (TESSERACT_MODEL_NAME, get_tesseract),
+}
+
+
+for name, precision in app.config['MODEL_PRECISION'].items():
+    if name not in MODELS:
+        raise ValueError(f"Unknown model for precision setting: {name}")
+    # Только модели на torch (htr, relations); для остальных ValueError
+    registry.set_precision(MODELS[name][0], precision)
+
+
+def warm_up_models(names):
+    """Loads the given models into the registry ahead of the first request."""
+    for name in names:
+        if name not in MODELS:
+            print(f"Unknown model for warm-up: {name}")
+            continue
+        try:
+            MODELS[name][1]()
+        except Exception as e:
+            print(f"Failed to warm up model {name}: {e}")
+
+
+@app.cli.command('warmup')
+@click.argument('names', nargs=-1)
+def warmup_command(names):
+    """Load models into memory (all models if no names are given)."""
+    warm_up_models(names or list(MODELS))
+
+
+# С сервером моделей модели грузит он, а не веб-процесс
+if app.config['WARMUP_MODELS'] and not app.config['MODEL_SERVER_SOCKET']:
+    threading.Thread(target=warm_up_models,
+                     args=(app.config['WARMUP_MODELS'],),
+                     daemon=True).start()
+
+
+def model_status():
+    """Whether each model of `MODELS` is resident in this process."""
+    return {name: registry.is_loaded(model_name) for name, (model_name, _) in MODELS.items()}
+
+
+# ============ Health Routes ============
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: reports resident models and whether warm-up has finished."""
+    if model_client is not None:
+        try:
+            status = model_client.call('status')
+        except ModelServerError as e:
+            app.logger.warning(f"Model server is not ready: {e}")
+            status = {'models': {}, 'loaded': []}
+        resident, loaded = status['models'], status['loaded']
+    else:
+        resident, loaded = model_status(), registry.stats()
+    ready = all(resident.get(name, False) for name in app.config['WARMUP_MODELS'])
+    return jsonify({
+        'ready': ready,
+        'required': app.config['WARMUP_MODELS'],
+        'models': resident,
+        'loaded': loaded,
+    }), 200 if ready else 503
+
+
 # ============ Authentication Routes ============
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -126,95 +308,483 @@ def logout():
 
 # ============ Background Processing ============
 
-def update_stage(result_id, stage, stage_data_update=None):
-    """Helper to update processing stage in database."""
+def publish_progress(result_id, current_stage, status='processing', stage_data=None, error=None):
+    """Pushes a stage transition (and its delta) to SSE subscribers of a result."""
+    progress_events.publish(result_id, {
+        'current_stage': current_stage,
+        'status': status,
+        'stage_data': stage_data or {},
+        'error': error
+    })
+
+
+def start_stage(result_id, stage):
+    """Marks a stage as running: one write for the transition and its stage row."""
     with app.app_context():
-        result = ProcessingResult.query.get(result_id)
-        if result:
-            result.current_stage = stage
-            if stage_data_update:
-                try:
-                    current_data = json.loads(result.stage_data or '{}')
-                    current_data.update(stage_data_update)
-                    result.stage_data = json.dumps(current_data, ensure_ascii=False)
-                except Exception:
-                    result.stage_data = json.dumps(stage_data_update, ensure_ascii=False)
-                db.session.commit()
+        db.session.execute(db.update(ProcessingResult)
+                           .where(ProcessingResult.id == result_id)
+                           .values(current_stage=stage))
+        row = StageResult.query.filter_by(result_id=result_id, stage=stage).first()
+        if row is None:
+            row = StageResult(result_id=result_id, stage=stage)
+            db.session.add(row)
+        row.status = 'running'
+        row.started_at = datetime.utcnow()
+        row.finished_at = None
+        row.duration_seconds = None
+        row.error = None
+        db.session.commit()
+    publish_progress(result_id, stage)
 
 
-def process_in_background(result_id, filepath, text_type, ocr_model, translate):
-    """Background processing with stage-by-stage updates."""
+def finish_stage(result_id, stage, artifact=None, payload=None):
+    """
+    Marks a stage as completed and stores its artifact in a single write.
+
+    The artifact goes to the result column mapped in
+    `ProcessingResult.STAGE_ARTIFACTS` only; the stage row keeps the small
+    payload and timings.
+    """
+    column, key = ProcessingResult.STAGE_ARTIFACTS[stage]
     with app.app_context():
-        result = ProcessingResult.query.get(result_id)
+        db.session.execute(db.update(ProcessingResult)
+                           .where(ProcessingResult.id == result_id)
+                           .values({column: artifact}))
+        row = StageResult.query.filter_by(result_id=result_id, stage=stage).first()
+        row.status = 'completed'
+        row.payload = json.dumps(payload or {}, ensure_ascii=False)
+        row.finished_at = datetime.utcnow()
+        row.duration_seconds = (row.finished_at - row.started_at).total_seconds()
+        db.session.commit()
+        stage_info = row.to_dict()
+    stage_info[key] = _artifact_value(stage, artifact)
+    publish_progress(result_id, stage, stage_data={stage: stage_info})
+
+
+def _artifact_value(stage, artifact):
+    """Stored artifact as sent to clients: entity spans are decoded from JSON."""
+    if stage == 'ner' and artifact is not None:
+        return json.loads(artifact)
+    return artifact
+
+
+def _ner_output(result):
+    """
+    Entity spans of a result and their HTML, rendered on demand.
+
+    Results processed before spans were stored only have the legacy HTML.
+
+    Returns:
+        tuple: (list of span dicts or None, HTML or None).
+    """
+    if result.entities_json is None:
+        return None, result.processed_text_html
+    entities = json.loads(result.entities_json)
+    return entities, render_entities(result.ner_text or '', entities)
+
+
+def recognize_text(filepath, engine):
+    """
+    Recognizes an image with 'ocr' (EasyOCR), 'tesseract', 'auto' (Tesseract,
+    then EasyOCR for low-confidence lines) or 'htr' (TrOCR).
+
+    Runs in the model server when `MODEL_SERVER_SOCKET` is set, otherwise in
+    this process.
+    """
+    if model_client is not None:
+        # У сервера своя рабочая папка
+        return model_client.call(engine, path=os.path.abspath(filepath))
+    if engine == 'tesseract':
+        return tesseract_ocr(filepath)
+    if engine == 'auto':
+        return auto_ocr(filepath)
+    if engine == 'htr':
+        return htr_text(filepath)
+    return perform_ocr(filepath)
+
+
+def tesseract_ocr(filepath):
+    """`perform_tesseract_ocr` with the configured number of block workers."""
+    return perform_tesseract_ocr(filepath, workers=app.config['TESSERACT_WORKERS'])
+
+
+def htr_text(filepath):
+    """Text of `perform_htr` with the configured line deskewing."""
+    return perform_htr(filepath, deskew=app.config['HTR_DESKEW'])[1]
+
+
+def auto_ocr(filepath):
+    """`perform_auto_ocr` with the configured escalation thresholds."""
+    return perform_auto_ocr(filepath, min_confidence=app.config['OCR_AUTO_MIN_CONFIDENCE'],
+                            page_share=app.config['OCR_AUTO_PAGE_SHARE'])
+
+
+def ner_spans(text):
+    """NER spans of a text, from the model server if configured."""
+    if model_client is not None:
+        return model_client.call('ner', text=text)
+    return perform_ner_spans(text)
+
+
+def llm_relations(text, on_relation=None):
+    """LLM relations of a text through the shared batcher, in the model server if configured."""
+    if model_client is None:
+        return relation_batcher.extract(text, on_relation)
+    # Из JSON отношения приходят списками
+    callback = (lambda relation: on_relation(tuple(relation))) if on_relation is not None else None
+    return [tuple(relation) for relation in model_client.call('relations', on_event=callback, text=text)]
+
+
+def relation_cache_version():
+    """
+    Version of cached relations for the process that runs the LLM.
+
+    With `MODEL_SERVER_SOCKET` it is asked from the model server once, so web
+    workers never import torch; otherwise it is computed for this process.
+    """
+    global _relation_cache_version
+    if _relation_cache_version is None:
+        if model_client is not None:
+            _relation_cache_version = model_client.call('relations_version')
+        else:
+            _relation_cache_version = relations_cache_version(default_device())
+    return _relation_cache_version
+
+
+def cached_ner_spans(text):
+    """NER spans from the result cache, running the model on a miss."""
+    # Спаны - смещения в точном тексте, поэтому ключ без нормализации
+    return result_cache.get_or_compute('ner', text, NER_MODEL_NAME, NER_OUTPUT_VERSION,
+                                       lambda: ner_spans(text), normalize=False)
+
+
+def cached_relations(text, on_relation=None):
+    """
+    Relations from the result cache, running the LLM on a miss.
+
+    `on_relation` receives relations while the LLM generates them; on a cache
+    hit it is not called. Model and model server errors are raised, so the
+    job attempt fails and is retried.
+    """
+    def compute():
         try:
-            # Stage 1: OCR/HTR Recognition
-            update_stage(result_id, 'recognizing')
+            return llm_relations(text, on_relation)
+        except Exception:
+            # Ошибку не кэшируем и пробрасываем: задание упадёт и JobStore повторит его
+            app.logger.exception("Relation extraction failed")
+            raise
+
+    relations = result_cache.get_or_compute('relations', text, RELATION_MODEL_NAME,
+                                            relation_cache_version(), compute)
+    return [tuple(relation) for relation in relations]
+
+
+def relations_for_text(text, spans=None, on_relation=None):
+    """
+    Relations of a text in the configured `RELATIONS_MODE`.
+
+    Args:
+        text (str): Text to analyze.
+        spans (list): NER spans of exactly this text; computed (or taken from
+            the cache) when needed and not given.
+        on_relation (callable): Receives LLM relations while they are generated.
+
+    Returns:
+        tuple: (relations, source), source being 'rules' or 'llm'.
+
+    Raises:
+        ValueError: `RELATIONS_MODE` is unknown.
+    """
+    mode = relations_mode(app.config['RELATIONS_MODE'])
+    if mode == 'llm':
+        return cached_relations(text, on_relation), 'llm'
+    if spans is None:
+        spans = cached_ner_spans(text)
+    relations, coverage = extract_rule_relations(text, spans)
+    if mode == 'rules' or coverage >= app.config['RELATIONS_RULES_MIN_COVERAGE']:
+        return relations, 'rules'
+    app.logger.info(f"Rule coverage {coverage:.2f} is low, falling back to the LLM")
+    return cached_relations(text, on_relation), 'llm'
+
+
+def _stage_completed(doc, stage):
+    """Checks whether a stage was completed by an earlier attempt of the job."""
+    return stage in doc['done']
+
+
+def _load_artifact(result_id, stage):
+    """Reads the stored artifact of one stage without loading the others."""
+    column, _ = ProcessingResult.STAGE_ARTIFACTS[stage]
+    with app.app_context():
+        return db.session.query(getattr(ProcessingResult, column)) \
+            .filter(ProcessingResult.id == result_id).scalar()
 
-            if text_type == 'ocr':
-                if ocr_model == 'tesseract':
-                    text = perform_tesseract_ocr(filepath)
-                else:
-                    text = perform_ocr(filepath)
-            else:
-                _, text = perform_htr(filepath)
 
-            result = ProcessingResult.query.get(result_id)
-            result.original_text = text
-            db.session.commit()
+def recognize_stage(doc):
+    """Pipeline stage 1: OCR/HTR recognition."""
+    if _stage_completed(doc, 'recognizing'):
+        doc['text'] = _load_artifact(doc['result_id'], 'recognizing')
+        return
 
-            update_stage(result_id, 'recognizing', {
-                'recognizing': {'status': 'completed', 'text': text}
-            })
+    result_id = doc['result_id']
+    start_stage(result_id, 'recognizing')
 
-            # Stage 2: Translation (optional)
-            if translate:
-                update_stage(result_id, 'translating')
-                text = translate_text(text)
-                update_stage(result_id, 'translating', {
-                    'translating': {'status': 'completed', 'text': text}
-                })
+    if doc['text_type'] == 'ocr':
+        engine = doc['ocr_model'] if doc['ocr_model'] in ('tesseract', 'auto') else 'ocr'
+    else:
+        engine = 'htr'
+    text = recognize_text(doc['filepath'], engine)
 
-            # Stage 3: NER
-            update_stage(result_id, 'ner')
-            annotated_text_html = perform_ner(text)
+    finish_stage(result_id, 'recognizing', text)
+    doc['text'] = text
 
-            result = ProcessingResult.query.get(result_id)
-            result.processed_text_html = annotated_text_html
-            db.session.commit()
 
-            update_stage(result_id, 'ner', {
-                'ner': {'status': 'completed', 'html': annotated_text_html}
-            })
+def translate_stage(doc):
+    """Pipeline stage 2: optional translation."""
+    if not doc['translate']:
+        return
+    if _stage_completed(doc, 'translating'):
+        doc['text'] = _load_artifact(doc['result_id'], 'translating')
+        return
 
-            # Stage 4: Relations
-            update_stage(result_id, 'relations')
-            relations = extract_relations(text)
-            relations_json = json.dumps(relations, ensure_ascii=False, indent=2)
+    result_id = doc['result_id']
+    start_stage(result_id, 'translating')
+    doc['text'] = translate_text(doc['text'])
+    finish_stage(result_id, 'translating', doc['text'])
 
-            result = ProcessingResult.query.get(result_id)
-            result.relations_json = relations_json
-            db.session.commit()
 
-            update_stage(result_id, 'relations', {
-                'relations': {'status': 'completed', 'json': relations_json, 'count': len(relations)}
-            })
+def ner_stage(doc):
+    """Pipeline stage 3: NER."""
+    if _stage_completed(doc, 'ner'):
+        return
 
-            # Final: Completed
-            result = ProcessingResult.query.get(result_id)
-            result.current_stage = 'completed'
-            result.status = 'completed'
-            db.session.commit()
+    result_id = doc['result_id']
+    start_stage(result_id, 'ner')
+    entities = cached_ner_spans(doc['text'])
+    doc['entities'] = entities
+    entities_json = json.dumps(entities, ensure_ascii=False, separators=(',', ':'))
+    finish_stage(result_id, 'ner', entities_json, {'count': len(entities)})
 
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
+
+def relations_stage(doc):
+    """Pipeline stage 4: relation extraction."""
+    if _stage_completed(doc, 'relations'):
+        return
+
+    result_id = doc['result_id']
+    start_stage(result_id, 'relations')
+    count = 0
+
+    def on_relation(relation):
+        # Частичный результат уходит только подписчикам SSE, в БД не пишется.
+        # Событие несёт только новую связь и их число, список собирает клиент
+        nonlocal count
+        count += 1
+        publish_progress(result_id, 'relations', stage_data={
+            'relations': {'status': 'running', 'count': count, 'relation': relation}
+        })
+
+    relations, source = relations_for_text(doc['text'], doc.get('entities'), on_relation)
+    relations_json = json.dumps(relations, ensure_ascii=False, indent=2)
+    finish_stage(result_id, 'relations', relations_json, {'count': len(relations), 'source': source})
+
+
+def process_in_background(result_id, filepath, text_type, ocr_model, translate):
+    """
+    Background processing with stage-by-stage updates.
+
+    The document goes through the shared stage pipeline, so stages of
+    different documents overlap. Stages that already have a completed
+    StageResult row (e.g. from an attempt that was interrupted by a restart)
+    are not run again; their stored artifact is reused. Errors are raised to
+    the caller.
+    """
+    with app.app_context():
+        done = {row.stage for row in StageResult.query.filter_by(
+            result_id=result_id, status='completed')}
+
+    pipeline.run({
+        'result_id': result_id,
+        'filepath': filepath,
+        'text_type': text_type,
+        'ocr_model': ocr_model,
+        'translate': translate,
+        'done': done,
+    })
+
+    # Final: Completed
+    with app.app_context():
+        db.session.execute(db.update(ProcessingResult)
+                           .where(ProcessingResult.id == result_id)
+                           .values(current_stage='completed', status='completed',
+                                   error_message=None))
+        db.session.commit()
+    publish_progress(result_id, 'completed', status='completed')
+
+
+def run_job(result_id):
+    """Leases a persisted job, runs it with heartbeats and records the outcome."""
+    owner = job_store.new_owner()
+    payload = job_store.lease(result_id, owner)
+    if payload is None:
+        return
+
+    try:
+        with job_store.heartbeating(result_id, owner):
+            process_in_background(result_id, **payload)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        retry = job_store.fail(result_id, owner, str(e))
+        with app.app_context():
+            db.session.execute(db.update(StageResult)
+                               .where(StageResult.result_id == result_id,
+                                      StageResult.status == 'running')
+                               .values(status='failed', error=str(e)))
             result = ProcessingResult.query.get(result_id)
             if result:
+                result.error_message = str(e)
+                if retry:
+                    result.current_stage = 'queued'
+                else:
+                    result.current_stage = 'failed'
+                    result.status = 'failed'
+                db.session.commit()
+        if retry:
+            publish_progress(result_id, 'queued', error=str(e))
+        else:
+            publish_progress(result_id, 'failed', status='failed', error=str(e))
+        return
+
+    job_store.complete(result_id, owner)
+
+
+def recover_jobs():
+    """Re-submits persisted jobs that are queued or whose lease has expired."""
+    for result_id in job_store.expire_exhausted():
+        with app.app_context():
+            result = ProcessingResult.query.get(result_id)
+            if result and result.status == 'processing':
                 result.current_stage = 'failed'
                 result.status = 'failed'
-                result.error_message = str(e)
+                result.error_message = result.error_message or 'Обработка прервана'
                 db.session.commit()
 
+    for result_id in job_store.recoverable():
+        if scheduler.position(result_id) is not None:
+            continue
+        try:
+            scheduler.submit(result_id, run_job, result_id)
+        except QueueFullError:
+            break
+
+
+result_cache = ResultCache(app, max_bytes=app.config['RESULT_CACHE_MAX_BYTES'],
+                           enabled=app.config['RESULT_CACHE_MAX_BYTES'] > 0)
+
+# Relation workers of concurrent jobs share LLM calls through the batcher
+relation_batcher = RelationBatcher(
+    max_batch=app.config['RELATIONS_BATCH_SIZE'],
+    max_wait=app.config['RELATIONS_BATCH_WAIT_MS'] / 1000,
+    extract_batch=lambda texts, callbacks: extract_relations_batch(texts, raise_errors=True,
+                                                                   on_relation=callbacks))
+
+# Thin-client mode: models live in the process started with `flask serve-models`
+model_client = ModelClient(app.config['MODEL_SERVER_SOCKET'], timeout=app.config['MODEL_SERVER_TIMEOUT']) \
+    if app.config['MODEL_SERVER_SOCKET'] else None
+# Версия кэша связей; запрашивается при первом обращении к кэшу
+_relation_cache_version = None
+
+
+job_store = JobStore(app,
+                     lease_seconds=app.config['JOB_LEASE_SECONDS'],
+                     heartbeat_seconds=app.config['JOB_HEARTBEAT_SECONDS'],
+                     max_attempts=app.config['JOB_MAX_ATTEMPTS'])
+
+pipeline = Pipeline([
+    ('recognizing', recognize_stage, app.config['STAGE_WORKERS']['recognizing']),
+    ('translating', translate_stage, app.config['STAGE_WORKERS']['translating']),
+    ('ner', ner_stage, app.config['STAGE_WORKERS']['ner']),
+    ('relations', relations_stage, app.config['STAGE_WORKERS']['relations']),
+])
+
+# Scheduler workers bound the number of documents in flight across the pipeline
+scheduler = JobScheduler(workers=app.config['WORKER_COUNT'],
+                         max_queue=app.config['JOB_QUEUE_SIZE'],
+                         poll=recover_jobs,
+                         poll_interval=app.config['JOB_POLL_SECONDS'])
+
+
+def model_server_handlers():
+    """
+    Operations served by `flask serve-models`.
+
+    They are the in-process model calls; NER and LLM requests of all web
+    workers are batched together by the server's batchers.
+    """
+    ner_batcher = DynamicBatcher(perform_ner_spans_batch,
+                                 max_batch=app.config['NER_BATCH_SIZE'],
+                                 max_wait=app.config['NER_BATCH_WAIT_MS'] / 1000,
+                                 name='ner-batcher')
+    return {
+        'ocr': lambda args, emit: perform_ocr(args['path']),
+        'tesseract': lambda args, emit: tesseract_ocr(args['path']),
+        'auto': lambda args, emit: auto_ocr(args['path']),
+        'htr': lambda args, emit: htr_text(args['path']),
+        'ner': lambda args, emit: ner_batcher.run(args['text']),
+        'relations': lambda args, emit: relation_batcher.extract(args['text'], emit),
+        'relations_version': lambda args, emit: relations_cache_version(default_device()),
+        'status': lambda args, emit: {
+            'models': model_status(),
+            'loaded': registry.stats(),
+            'relations_batching': relation_batcher.stats(),
+            'ner_batching': ner_batcher.stats(),
+            'ocr_cascade': cascade_stats.stats(),
+        },
+    }
+
+
+@app.cli.command('serve-models')
+@click.option('--socket', 'socket_path', help='Unix socket path (default: MODEL_SERVER_SOCKET).')
+def serve_models_command(socket_path):
+    """Serve OCR, HTR, NER and relation models to web workers over a Unix socket."""
+    socket_path = socket_path or app.config['MODEL_SERVER_SOCKET']
+    if not socket_path:
+        raise click.UsageError('Set MODEL_SERVER_SOCKET or pass --socket.')
+    warm_up_models(app.config['WARMUP_MODELS'])
+    server = ModelServer(socket_path, model_server_handlers())
+    print(f"Serving models at {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+@app.before_request
+def start_scheduler():
+    """Starts workers and job recovery in the serving process (not in tests)."""
+    if not app.config.get('TESTING'):
+        scheduler.start()
+
+
+@app.route('/api/stats')
+@login_required
+def processing_stats():
+    """Queue, per-stage throughput, LLM batching, OCR cascade, model server and result cache metrics."""
+    stats = {
+        'scheduler': scheduler.stats(),
+        'stages': pipeline.stats(),
+        'relations_batching': relation_batcher.stats(),
+        'ocr_cascade': cascade_stats.stats(),
+        'cache': result_cache.stats()
+    }
+    if model_client is not None:
+        try:
+            stats['model_server'] = model_client.call('status')
+        except ModelServerError as e:
+            stats['model_server'] = {'error': str(e)}
+    return jsonify(stats)
+
 
 # ============ Main Routes ============
 
@@ -253,49 +823,196 @@ def process():
         ocr_model=ocr_model,
         translated=translate,
         status='processing',
-        current_stage='queued',
-        stage_data='{}'
+        current_stage='queued'
     )
     db.session.add(result)
+    db.session.flush()
+    job = job_store.create(result.id, {
+        'filepath': filepath,
+        'text_type': text_type,
+        'ocr_model': ocr_model,
+        'translate': translate
+    })
     db.session.commit()
 
-    # Start background processing
-    thread = threading.Thread(
-        target=process_in_background,
-        args=(result.id, filepath, text_type, ocr_model, translate),
-        daemon=True
-    )
-    thread.start()
+    # Queue background processing
+    try:
+        position = scheduler.submit(result.id, run_job, result.id)
+    except QueueFullError as e:
+        db.session.delete(job)
+        db.session.delete(result)
+        db.session.commit()
+        os.remove(filepath)
+        return jsonify({
+            'error': 'Очередь обработки переполнена, попробуйте позже',
+            'queue_position': e.queue_size + 1,
+            'queue_size': e.queue_size,
+            'eta_seconds': e.eta_seconds
+        }), 429
 
     return jsonify({
         'success': True,
-        'result_id': result.id
+        'result_id': result.id,
+        'queue_position': position,
+        'eta_seconds': scheduler.eta_seconds(position)
     })
 
 
-@app.route('/api/result/<int:result_id>/progress')
-@login_required
-def get_progress(result_id):
-    """API endpoint for polling processing progress."""
-    result = ProcessingResult.query.get_or_404(result_id)
+def _progress_payload(result):
+    """
+    Progress snapshot of a result built from its small stage rows.
 
-    if result.user_id != current_user.id:
-        return jsonify({'error': 'Unauthorized'}), 403
+    Stage artifacts (text, NER HTML, relations) are not included; clients
+    fetch them once per stage from /api/result/<id>/stages/<stage>.
+    """
+    rows = StageResult.query.filter_by(result_id=result.id).all()
+    stage_data = {row.stage: row.to_dict() for row in rows}
+    if not rows:
+        try:
+            stage_data = json.loads(result.stage_data or '{}')
+        except Exception:
+            pass
 
-    stage_data = {}
-    try:
-        stage_data = json.loads(result.stage_data or '{}')
-    except Exception:
-        pass
+    queue_position = None
+    if result.current_stage == 'queued':
+        queue_position = scheduler.position(result.id)
 
-    return jsonify({
+    return {
         'current_stage': result.current_stage,
+        'queue_position': queue_position,
         'stage_data': stage_data,
         'status': result.status,
         'error': result.error_message,
         'image_filename': result.image_filename,
         'translated': result.translated
-    })
+    }
+
+
+def _sse(event, data):
+    """Formats one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/api/result/<int:result_id>/progress')
+@login_required
+def get_progress(result_id):
+    """API endpoint for polling processing progress (fallback for the SSE stream)."""
+    result = ProcessingResult.query.get_or_404(result_id)
+
+    if result.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    return jsonify(_progress_payload(result))
+
+
+@app.route('/api/result/<int:result_id>/stages/<stage>')
+@login_required
+def get_stage_artifact(result_id, stage):
+    """Returns the stored artifact of one completed stage."""
+    if stage not in ProcessingResult.STAGE_ARTIFACTS:
+        return jsonify({'error': 'Unknown stage'}), 404
+
+    result = ProcessingResult.query.get_or_404(result_id)
+    if result.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    row = StageResult.query.filter_by(result_id=result_id, stage=stage).first()
+    data = row.to_dict() if row else {'status': 'pending'}
+    if stage == 'ner':
+        data['entities'], data['html'] = _ner_output(result)
+    else:
+        column, key = ProcessingResult.STAGE_ARTIFACTS[stage]
+        data[key] = getattr(result, column)
+    data['stage'] = stage
+    return jsonify(data)
+
+
+@app.route('/api/result/<int:result_id>/entities')
+@login_required
+def get_entities(result_id):
+    """
+    Returns the named entities and dates found in a result.
+    ---
+    tags:
+      - Results
+    parameters:
+      - name: result_id
+        in: path
+        type: integer
+        required: true
+      - name: text
+        in: query
+        type: string
+        required: false
+        enum: [ner, original]
+        description: original - map spans of a translated result onto the original OCR text
+    responses:
+      200:
+        description: Text and entity spans with offsets into it
+      403:
+        description: Result belongs to another user
+      404:
+        description: Result not found or NER has not finished
+    """
+    result = ProcessingResult.query.get_or_404(result_id)
+    if result.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if result.entities_json is None:
+        return jsonify({'error': 'Entities are not available'}), 404
+
+    text = result.ner_text
+    entities = json.loads(result.entities_json)
+    if request.args.get('text') == 'original' and result.translated:
+        # Перевод детерминирован, поэтому карту смещений можно построить заново
+        text = result.original_text or ''
+        _, offsets = translate_with_offsets(text)
+        for span in entities:
+            span['start'], span['stop'] = offsets.span_to_original(span['start'], span['stop'])
+
+    return jsonify({'text': text, 'entities': entities})
+
+
+@app.route('/api/result/<int:result_id>/events')
+@login_required
+def progress_stream(result_id):
+    """
+    Server-Sent Events stream of processing progress.
+
+    Sends one `snapshot` event with the current state, then a `stage` event
+    with only the new stage and its stage_data delta for every transition.
+    The stream ends once the result is completed or failed.
+    """
+    # Subscribe before reading the snapshot so no transition is lost in between
+    subscriber = progress_events.subscribe(result_id)
+    result = ProcessingResult.query.get(result_id)
+    if result is None or result.user_id != current_user.id:
+        progress_events.unsubscribe(result_id, subscriber)
+        if result is None:
+            return jsonify({'error': 'Not found'}), 404
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    snapshot = _progress_payload(result)
+    keepalive = app.config['SSE_KEEPALIVE_SECONDS']
+
+    def stream():
+        try:
+            yield _sse('snapshot', snapshot)
+            if snapshot['status'] in ('completed', 'failed'):
+                return
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield _sse('stage', event)
+                if event['status'] in ('completed', 'failed'):
+                    return
+        finally:
+            progress_events.unsubscribe(result_id, subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/result/<int:result_id>')
@@ -306,16 +1023,117 @@ def view_result(result_id):
     if result.user_id != current_user.id:
         flash('У вас нет доступа к этому результату', 'danger')
         return redirect(url_for('my_results'))
-    return render_template('result_detail.html', result=result)
+    _, annotated_html = _ner_output(result)
+    return render_template('result_detail.html', result=result, annotated_html=annotated_html)
+
+
+def _encode_cursor(result) -> str:
+    """Opaque keyset cursor pointing after `result` in the listing order."""
+    raw = f"{result.created_at.isoformat()}|{result.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+    """
+    Decodes a cursor made by `_encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    # binascii.Error и UnicodeDecodeError - подклассы ValueError
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    created_at, result_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(result_id)
+
+
+def _results_page(user_id: int, cursor: str = None, limit: int = 20):
+    """
+    One page of a user's results, newest first, without the large columns.
+
+    Uses keyset pagination on (created_at, id), so every page is an index
+    range scan on (user_id, created_at) regardless of how deep it is. Only
+    a prefix of the recognized text is read from the database as a preview.
+
+    Args:
+        user_id (int): Owner of the results.
+        cursor (str): Cursor returned with the previous page, or None.
+        limit (int): Page size.
+
+    Returns:
+        tuple: (list of (ProcessingResult, preview) pairs, next cursor or None).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    preview = db.func.substr(ProcessingResult.original_text, 1,
+                             app.config['RESULT_PREVIEW_CHARS'])
+    query = db.select(ProcessingResult, preview).where(ProcessingResult.user_id == user_id)
+    if cursor:
+        created_at, result_id = _decode_cursor(cursor)
+        query = query.where(db.or_(
+            ProcessingResult.created_at < created_at,
+            db.and_(ProcessingResult.created_at == created_at, ProcessingResult.id < result_id)
+        ))
+    query = query.order_by(ProcessingResult.created_at.desc(), ProcessingResult.id.desc())
+
+    # На одну строку больше, чтобы узнать, есть ли следующая страница
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    next_cursor = _encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    return [tuple(row) for row in rows[:limit]], next_cursor
 
 
 @app.route('/my_results')
 @login_required
 def my_results():
-    """View all user's processing results."""
-    results = ProcessingResult.query.filter_by(user_id=current_user.id) \
-        .order_by(ProcessingResult.created_at.desc()).all()
-    return render_template('my_results.html', results=results)
+    """View the user's processing results, one page at a time."""
+    try:
+        rows, next_cursor = _results_page(current_user.id, request.args.get('cursor'),
+                                          app.config['RESULTS_PAGE_SIZE'])
+    except ValueError:
+        return redirect(url_for('my_results'))
+    return render_template('my_results.html', results=rows, next_cursor=next_cursor,
+                           paged='cursor' in request.args)
+
+
+@app.route('/api/results')
+@login_required
+def list_results():
+    """
+    Lists the user's results page by page (summary fields and a text preview).
+    ---
+    tags:
+      - Results
+    parameters:
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: next_cursor from the previous page
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (default RESULTS_PAGE_SIZE, at most RESULTS_MAX_PAGE_SIZE)
+    responses:
+      200:
+        description: One page of results, newest first
+      400:
+        description: Invalid cursor or limit
+    """
+    limit = request.args.get('limit', app.config['RESULTS_PAGE_SIZE'], type=int)
+    if limit is None or limit < 1:
+        return jsonify({'error': 'Invalid limit'}), 400
+    limit = min(limit, app.config['RESULTS_MAX_PAGE_SIZE'])
+
+    try:
+        rows, next_cursor = _results_page(current_user.id, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'results': [result.to_summary(preview) for result, preview in rows],
+        'next_cursor': next_cursor
+    })
 
 
 # ============ NER Check Routes ============
@@ -334,8 +1152,13 @@ def ner_check():
         if text:
             if translate:
                 text = translate_text(text)
-            extracted_text = perform_ner(text)
-            relations = extract_relations(text)
+            spans = cached_ner_spans(text)
+            extracted_text = render_entities(text, spans)
+            try:
+                relations, _ = relations_for_text(text, spans)
+            except Exception:
+                app.logger.exception("Relation extraction failed")
+                flash('Не удалось извлечь связи', 'danger')
             relations_json = json.dumps(relations, ensure_ascii=False, indent=2)
 
     return render_template('ner_check.html',
@@ -346,4 +1169,7 @@ def ner_check():
 
 
 if __name__ == '__main__':
+    # With the reloader only the child process that serves requests runs jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scheduler.start()
     app.run(debug=True, threaded=True)
@@ -0,0 +1,110 @@
+"""
+Dynamic Batching Module
+
+This module collects requests from concurrent callers into batches for
+models that are cheaper to run on many inputs at once (the relation LLM,
+Slovnet NER). The first request opens a short window; everything that
+arrives meanwhile is processed in one call and each caller gets its own
+result.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class DynamicBatcher:
+    """
+    Groups items from concurrent callers into calls of a batch function.
+
+    The first item opens a window of `max_wait` seconds; everything that
+    arrives meanwhile (up to `max_batch` items) is processed in one call. A
+    single background thread runs the batches, so they never overlap.
+
+    Example:
+        >>> batcher = DynamicBatcher(perform_ner_spans_batch, max_batch=8, max_wait=0.02)
+        >>> spans = batcher.run('Иван живет в Москве.')
+    """
+
+    def __init__(self, process_batch, max_batch: int = 4, max_wait: float = 0.05,
+                 name: str = 'batcher'):
+        """
+        Args:
+            process_batch (callable): Called with a list of items, returns
+                one result per item in the same order.
+            max_batch (int): Maximum items per call.
+            max_wait (float): Seconds to wait for more items after the first.
+            name (str): Name of the background thread.
+        """
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.name = name
+        self._process_batch = process_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, item) -> Future:
+        """
+        Queues an item for the next batch.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the item's result, or to
+            the error raised by the batch function.
+        """
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((item, future))
+        return future
+
+    def run(self, item):
+        """Blocking `submit`: returns the result or raises the batch error."""
+        return self.submit(item).result()
+
+    def stats(self) -> dict:
+        """Returns the number of batches run and the average batch size."""
+        with self._lock:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait': self.max_wait,
+                'batches': self._batches,
+                'avg_batch_size': self._items / self._batches if self._batches else None,
+                'queued': self._queue.qsize(),
+            }
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, daemon=True, name=self.name)
+                self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self._process_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
@@ -0,0 +1 @@
+"""Benchmarks for AI Archive. Run with `python -m benchmarks.<name>`."""
@@ -0,0 +1,142 @@
+"""
+Benchmark: float32 vs bfloat16 vs int8 CPU inference for the relation LLM
+and TrOCR.
+
+Every precision runs in its own subprocess, so peak RSS is measured per
+precision. Each run decodes a fixed sample set greedily and reports
+generated tokens/sec, peak RSS and agreement with the float32 outputs:
+F1 over normalized relation tuples for the LLM, mean character similarity
+of recognized lines for TrOCR. Needs the Qwen and TrOCR models.
+
+Usage:
+    python -m benchmarks.bench_cpu_precision --model relations --precisions float32 bfloat16 int8
+    python -m benchmarks.bench_cpu_precision --model htr --images line_crops/
+"""
+
+import argparse
+import difflib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from PIL import Image
+
+DOCUMENTS = [
+    'Иван Петрович Смирнов родился 15.03.1890 в Москве. Его отец Пётр Сергеевич Смирнов.',
+    'Князь Алексей Дмитриевич Щербаков скончался в Санкт-Петербурге в 1912 году. '
+    'Его жена — Екатерина Васильевна.',
+    'Николай, сын Ивана Орлова, проживал в Туле и был женат на Марии Ковалевой.',
+]
+
+
+def run_relations(precision: str) -> dict:
+    import torch
+    import relations
+
+    tokenizer, generator = relations._build_generator('cpu', precision)
+    model = generator.model
+    outputs, tokens, seconds = [], 0, 0.0
+    for text in DOCUMENTS:
+        prompt = relations._format_prompt(text, tokenizer)
+        ids = tokenizer(prompt, return_tensors='pt', add_special_tokens=False).input_ids
+        start = time.perf_counter()
+        with torch.no_grad():
+            output = model.generate(input_ids=ids, attention_mask=torch.ones_like(ids),
+                                    max_new_tokens=relations.MAX_NEW_TOKENS, do_sample=False,
+                                    pad_token_id=tokenizer.eos_token_id)
+        seconds += time.perf_counter() - start
+        generated = output[0, ids.shape[1]:]
+        tokens += len(generated)
+        response = tokenizer.decode(generated, skip_special_tokens=True)
+        outputs.append([list(relation) for relation in relations._parse_llm_response(response)])
+    return {'outputs': outputs, 'tokens': tokens, 'seconds': seconds}
+
+
+def line_images(directory: str) -> list:
+    if directory:
+        return [Image.open(os.path.join(directory, name)).convert('RGB')
+                for name in sorted(os.listdir(directory))]
+    from benchmarks.bench_htr_batching import make_line_crops
+    return make_line_crops(16)
+
+
+def run_htr(precision: str, images: str) -> dict:
+    import torch
+    from htr import HTR_MODEL_NAME, load_trocr
+    from registry import registry
+
+    registry.set_precision(HTR_MODEL_NAME, precision)
+    processor, model = load_trocr(HTR_MODEL_NAME, 'cpu')
+    outputs, tokens, seconds = [], 0, 0.0
+    for image in line_images(images):
+        pixel_values = processor(images=[image], return_tensors='pt').pixel_values.to(dtype=model.dtype)
+        start = time.perf_counter()
+        with torch.no_grad():
+            generated = model.generate(pixel_values)
+        seconds += time.perf_counter() - start
+        tokens += generated.shape[1]
+        outputs.append(processor.batch_decode(generated, skip_special_tokens=True)[0])
+    return {'outputs': outputs, 'tokens': tokens, 'seconds': seconds}
+
+
+def agreement(model: str, outputs: list, baseline: list) -> float:
+    scores = []
+    for output, reference in zip(outputs, baseline):
+        if model == 'htr':
+            scores.append(difflib.SequenceMatcher(None, output, reference).ratio())
+            continue
+        import relations
+        predicted = {relations._relation_key(tuple(r)) for r in relations.merge_relations([output])}
+        expected = {relations._relation_key(tuple(r)) for r in relations.merge_relations([reference])}
+        if not predicted and not expected:
+            scores.append(1.0)
+            continue
+        hits = len(predicted & expected)
+        scores.append(2 * hits / (len(predicted) + len(expected)))
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+def worker(args):
+    if args.model == 'relations':
+        result = run_relations(args.worker)
+    else:
+        result = run_htr(args.worker, args.images)
+    # ru_maxrss в килобайтах на Linux
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', choices=['relations', 'htr'], default='relations')
+    parser.add_argument('--precisions', nargs='+', default=['float32', 'bfloat16', 'int8'])
+    parser.add_argument('--images', help='Directory of line crops for TrOCR (synthetic if omitted)')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = {}
+    for precision in ['float32'] + [p for p in args.precisions if p != 'float32']:
+        command = [sys.executable, '-m', 'benchmarks.bench_cpu_precision', '--model', args.model,
+                   '--worker', precision]
+        if args.images:
+            command += ['--images', args.images]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results[precision] = json.loads(output.strip().splitlines()[-1])
+
+    baseline = results['float32']
+    print(f"{'precision':>10} {'tokens':>7} {'seconds':>8} {'tokens/s':>9} {'peak_rss_mb':>11} {'agreement':>9}")
+    for precision, result in results.items():
+        print(f"{precision:>10} {result['tokens']:>7} {result['seconds']:>8.1f} "
+              f"{result['tokens'] / result['seconds']:>9.2f} {result['peak_rss_mb']:>11.0f} "
+              f"{agreement(args.model, result['outputs'], baseline['outputs']):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
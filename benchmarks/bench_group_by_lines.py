@@ -0,0 +1,96 @@
+"""
+Benchmark: line grouping of EasyOCR fragments, 100 to 10k fragments.
+
+Compares the vectorized `htr.group_by_lines` against the previous
+pure-Python implementation and checks that both return the same lines.
+
+Usage:
+    python -m benchmarks.bench_group_by_lines --sizes 100 1000 5000 10000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from htr import group_by_lines
+
+
+def legacy_group_by_lines(detection_results: list, y_tolerance: int = 10) -> list:
+    """Previous implementation, kept as the reference for timing and output."""
+    sorted_results = sorted(
+        detection_results,
+        key=lambda x: min([pt[1] for pt in x[0]]))
+
+    lines = []
+    current_line = []
+    current_line_y_center = None
+
+    for bbox, text, prob in sorted_results:
+        y_cords = [pt[1] for pt in bbox]
+        y_center = (min(y_cords) + max(y_cords)) / 2
+
+        if current_line_y_center is None:
+            current_line.append((bbox, text, prob))
+            current_line_y_center = y_center
+        elif abs(y_center - current_line_y_center) <= y_tolerance:
+            current_line.append((bbox, text, prob))
+            centers = [
+                (min([pt[1] for pt in b]) + max([pt[1] for pt in b])) / 2
+                for b, t, p in current_line]
+            current_line_y_center = statistics.mean(centers)
+        else:
+            if current_line:
+                lines.append(current_line)
+            current_line = [(bbox, text, prob)]
+            current_line_y_center = y_center
+
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+
+def make_fragments(count: int, per_line: int = 50, seed: int = 0) -> list:
+    """Generates a dense page of integer-coordinate EasyOCR fragments."""
+    rng = random.Random(seed)
+    fragments = []
+    for idx in range(count):
+        line, column = divmod(idx, per_line)
+        x = column * 40 + rng.randint(0, 5)
+        y = line * 30 + rng.randint(0, 4)
+        height = rng.randint(16, 20)
+        bbox = [[x, y], [x + 35, y], [x + 35, y + height], [x, y + height]]
+        fragments.append((bbox, f'w{idx}', 0.9))
+    rng.shuffle(fragments)
+    return fragments
+
+
+def best_of(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 1000, 5000, 10000])
+    parser.add_argument('--per-line', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'fragments':>10} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8} {'same':>5}")
+    for size in args.sizes:
+        fragments = make_fragments(size, per_line=args.per_line)
+        same = legacy_group_by_lines(fragments) == group_by_lines(fragments)
+        legacy = best_of(lambda: legacy_group_by_lines(fragments), args.repeats)
+        current = best_of(lambda: group_by_lines(fragments), args.repeats)
+        print(f"{size:>10} {legacy * 1000:>10.1f} {current * 1000:>10.1f} "
+              f"{legacy / current:>7.1f}x {str(same):>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: per-line vs batched TrOCR inference on CPU.
+
+Usage:
+    python -m benchmarks.bench_htr_batching --lines 40 --batch-sizes 1 4 8 16
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+from PIL import Image
+
+from htr import load_trocr, recognize_lines
+
+
+def make_line_crops(count: int, seed: int = 0) -> list:
+    """Generates synthetic line crops of varying width."""
+    rng = random.Random(seed)
+    crops = []
+    for _ in range(count):
+        width = rng.randint(80, 1200)
+        height = rng.randint(28, 48)
+        pixels = np.random.RandomState(rng.randint(0, 2 ** 31)).randint(
+            0, 255, (height, width, 3), dtype=np.uint8)
+        crops.append(Image.fromarray(pixels))
+    return crops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default="kazars24/trocr-base-handwritten-ru")
+    parser.add_argument('--lines', type=int, default=40)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    processor, model = load_trocr(args.model, 'cpu')
+    crops = make_line_crops(args.lines)
+
+    # Warm-up run so one-time allocations do not skew the first measurement
+    recognize_lines(crops[:2], processor, model, 'cpu', batch_size=2)
+
+    print(f"{'batch_size':>10} {'seconds':>10} {'lines/sec':>10} {'speedup':>8}")
+    baseline = None
+    for batch_size in args.batch_sizes:
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            recognize_lines(crops, processor, model, 'cpu', batch_size=batch_size)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        baseline = baseline or seconds
+        print(f"{batch_size:>10} {seconds:>10.2f} {args.lines / seconds:>10.2f} "
+              f"{baseline / seconds:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
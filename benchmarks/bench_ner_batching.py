@@ -0,0 +1,77 @@
+"""
+Benchmark: per-document vs batched Slovnet NER.
+
+Compares `perform_ner` called once per document with `perform_ner_batch`
+at several Slovnet batch sizes, on synthetic documents of mixed length.
+Needs the Navec and Slovnet model files used by `ner.py`.
+
+Usage:
+    python -m benchmarks.bench_ner_batching --docs 200 --batch-sizes 1 8 32 64
+"""
+
+import argparse
+import random
+import time
+
+from navec import Navec
+from slovnet import NER
+
+import ner
+
+SENTENCES = [
+    'Иван Петрович Смирнов родился 15.03.1890 в Москве.',
+    'В 1912 году он поступил в Императорский Московский университет.',
+    'Его брат Николай служил в Санкт-Петербурге при Министерстве финансов.',
+    'Семья переехала в Тулу в 1920-х годах.',
+    'Письмо было отправлено Анне Сергеевне Ковалевой из Казани.',
+]
+
+
+def make_documents(count: int, seed: int = 0) -> list:
+    """Generates documents from 1 to 60 sentences long."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 60)))
+            for _ in range(count)]
+
+
+def load_model(batch_size: int, navec):
+    model = NER.load(ner.ner_model_path, batch_size=batch_size)
+    model.navec(navec)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--window-chars', type=int, default=ner.NER_WINDOW_CHARS)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    navec = Navec.load(ner.navec_path)
+    docs = make_documents(args.docs)
+    chars = sum(len(doc) for doc in docs)
+    print(f"{args.docs} documents, {chars} characters")
+
+    model = load_model(8, navec)
+    start = time.perf_counter()
+    for doc in docs:
+        ner.annotate_text(model(doc))
+    baseline = time.perf_counter() - start
+    print(f"\n{'batch_size':>10} {'seconds':>10} {'docs/sec':>10} {'speedup':>8}")
+    print(f"{'per-doc':>10} {baseline:>10.2f} {args.docs / baseline:>10.1f} {1:>7.2f}x")
+
+    for batch_size in args.batch_sizes:
+        model = load_model(batch_size, navec)
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            ner.perform_ner_batch(docs, model=model, window_chars=args.window_chars)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        print(f"{batch_size:>10} {seconds:>10.2f} {args.docs / seconds:>10.1f} "
+              f"{baseline / seconds:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: `auto` OCR (Tesseract, EasyOCR for uncertain lines) vs always
+running EasyOCR.
+
+Reports end-to-end latency of both modes, the share of pages and lines the
+cascade escalated to EasyOCR, and how close the cascade text is to the
+EasyOCR text. Without --images, synthetic pages are rendered, a share of
+them degraded with noise and blur. Needs Tesseract (rus) and EasyOCR.
+
+Usage:
+    python -m benchmarks.bench_ocr_cascade --pages 20 --degraded 0.3
+    python -m benchmarks.bench_ocr_cascade --images scans/ --min-confidence 60 80
+"""
+
+import argparse
+import difflib
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from ocr import perform_ocr
+from ocr_cascade import perform_auto_ocr, cascade_stats, PAGE_ESCALATION_SHARE
+
+LINES = [
+    'Метрическая книга Успенской церкви за 1890 год',
+    'Иван Петрович Смирнов родился 15 марта, крещён 17 марта',
+    'Отец Пётр Сергеевич Смирнов, мещанин города Тулы',
+    'Мать Анна Васильевна, оба православного вероисповедания',
+    'Восприемники: купец Николай Орлов и девица Мария Ковалева',
+    'Таинство крещения совершал священник Алексей Дмитриев',
+]
+
+
+def load_font(size: int):
+    """DejaVu Sans (has Cyrillic) if installed, otherwise the Pillow default font."""
+    for path in ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'DejaVuSans.ttf'):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def make_pages(directory: str, count: int, degraded: float, seed: int = 0) -> list:
+    """Renders synthetic pages; `degraded` share of them get noise and blur."""
+    rng = random.Random(seed)
+    font = load_font(28)
+    paths = []
+    for index in range(count):
+        page = Image.new('L', (1400, 60 + 50 * len(LINES)), 255)
+        draw = ImageDraw.Draw(page)
+        for number, line in enumerate(rng.sample(LINES, len(LINES))):
+            draw.text((40, 30 + 50 * number), line, fill=0, font=font)
+        if index < degraded * count:
+            noise = np.random.RandomState(rng.randint(0, 2 ** 31)).normal(0, 60, (page.height, page.width))
+            page = Image.fromarray(np.clip(np.asarray(page) + noise, 0, 255).astype(np.uint8))
+            page = page.filter(ImageFilter.GaussianBlur(1.2))
+        path = os.path.join(directory, f'page_{index:03d}.png')
+        page.save(path)
+        paths.append(path)
+    return paths
+
+
+def timed(func, paths: list) -> tuple:
+    texts = []
+    start = time.perf_counter()
+    for path in paths:
+        texts.append(func(path))
+    return texts, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', help='Directory of page images (synthetic pages if omitted)')
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--degraded', type=float, default=0.3, help='Share of degraded synthetic pages')
+    parser.add_argument('--min-confidence', type=float, nargs='+', default=[70.0])
+    parser.add_argument('--page-share', type=float, default=PAGE_ESCALATION_SHARE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.images:
+            paths = [os.path.join(args.images, name) for name in sorted(os.listdir(args.images))]
+        else:
+            paths = make_pages(directory, args.pages, args.degraded)
+
+        # Прогрев: обе модели загружаются до замеров
+        perform_ocr(paths[0])
+        perform_auto_ocr(paths[0], min_confidence=101)
+
+        easyocr_texts, easyocr_seconds = timed(perform_ocr, paths)
+        print(f"{len(paths)} pages, always EasyOCR: {easyocr_seconds:.1f}s "
+              f"({len(paths) / easyocr_seconds:.2f} pages/sec)")
+        print(f"{'min_conf':>8} {'seconds':>8} {'pages/s':>8} {'speedup':>8} {'pages_esc':>9} "
+              f"{'whole':>6} {'lines_esc':>9} {'similarity':>10}")
+        for min_confidence in args.min_confidence:
+            cascade_stats.reset()
+            texts, seconds = timed(lambda path: perform_auto_ocr(path, min_confidence=min_confidence,
+                                                                 page_share=args.page_share), paths)
+            stats = cascade_stats.stats()
+            similarity = sum(difflib.SequenceMatcher(None, ' '.join(text.split()), ' '.join(reference.split())).ratio()
+                             for text, reference in zip(texts, easyocr_texts)) / len(paths)
+            print(f"{min_confidence:>8.0f} {seconds:>8.1f} {len(paths) / seconds:>8.2f} "
+                  f"{easyocr_seconds / seconds:>7.2f}x {stats['page_escalation_rate']:>9.2f} "
+                  f"{stats['pages_whole']:>6} {stats['line_escalation_rate'] or 0:>9.2f} {similarity:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: rule-based relations vs the LLM, accuracy and latency.
+
+Runs NER, the rule-based extractor and the LLM on each document and scores
+the rules against the LLM output (taken as reference): precision, recall
+and F1 over normalized tuples, plus rule coverage and timings. A summary
+shows what `rules-then-llm` would cost and agree on at several coverage
+thresholds. Needs the Navec/Slovnet files and the Qwen model.
+
+Usage:
+    python -m benchmarks.bench_relation_rules --file records.txt --thresholds 0.4 0.6 0.8
+
+`--file` holds one document per paragraph (blank-line separated); without it
+built-in metric-book style samples are used.
+"""
+
+import argparse
+import time
+
+import relations
+from ner import perform_ner_spans
+from relation_rules import extract_rule_relations
+
+SAMPLES = [
+    'Иван Петрович Смирнов родился 15.03.1890 в Москве. Его отец Пётр Сергеевич Смирнов, '
+    'а мать Анна Михайловна. Крестила его Мария Сидорова в церкви села Коломенское.',
+    'Князь Алексей Дмитриевич Щербаков, 1845 года рождения, скончался в Санкт-Петербурге '
+    'в 1912 году. Его жена — Екатерина Васильевна.',
+    'Николай, сын Ивана Орлова, проживал в Туле и был женат на Марии Ковалевой.',
+    'Письмо Анны Сергеевны из Казани получено в 1912 году, о наследстве сказано кратко.',
+]
+
+
+def keys(found: list) -> set:
+    return {relations._relation_key(relation) for relation in relations.merge_relations([found])}
+
+
+def score(predicted: set, reference: set) -> tuple:
+    hits = len(predicted & reference)
+    precision = hits / len(predicted) if predicted else (1.0 if not reference else 0.0)
+    recall = hits / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def load_documents(path: str) -> list:
+    with open(path, encoding='utf-8') as source:
+        return [' '.join(block.split()) for block in source.read().split('\n\n') if block.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--file')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.4, 0.6, 0.8])
+    args = parser.parse_args()
+
+    docs = load_documents(args.file) if args.file else SAMPLES
+    rows = []
+    print(f"{'doc':>3} {'ner_s':>6} {'rules_ms':>8} {'llm_s':>6} {'coverage':>8} "
+          f"{'rules':>5} {'llm':>4} {'prec':>5} {'rec':>5} {'f1':>5}")
+    for index, text in enumerate(docs):
+        start = time.perf_counter()
+        spans = perform_ner_spans(text)
+        ner_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rule_relations, coverage = extract_rule_relations(text, spans)
+        rules_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        llm_relations = relations.extract_relations(text)
+        llm_seconds = time.perf_counter() - start
+
+        precision, recall, f1 = score(keys(rule_relations), keys(llm_relations))
+        rows.append((coverage, rules_seconds, llm_seconds, f1))
+        print(f"{index:>3} {ner_seconds:>6.2f} {rules_seconds * 1000:>8.2f} {llm_seconds:>6.1f} "
+              f"{coverage:>8.2f} {len(rule_relations):>5} {len(llm_relations):>4} "
+              f"{precision:>5.2f} {recall:>5.2f} {f1:>5.2f}")
+
+    llm_total = sum(row[2] for row in rows)
+    print(f"\nllm only: {llm_total:.1f}s")
+    print(f"rules only: {sum(row[1] for row in rows) * 1000:.1f}ms, "
+          f"mean F1 vs LLM {sum(row[3] for row in rows) / len(rows):.2f}")
+    for threshold in args.thresholds:
+        by_rules = [row for row in rows if row[0] >= threshold]
+        seconds = sum(row[1] for row in by_rules) + sum(row[1] + row[2] for row in rows if row[0] < threshold)
+        # Документы, ушедшие в LLM, совпадают с эталоном полностью
+        f1 = (sum(row[3] for row in by_rules) + len(rows) - len(by_rules)) / len(rows)
+        print(f"rules-then-llm @ {threshold:.2f}: {len(by_rules)}/{len(rows)} by rules, "
+              f"{seconds:.1f}s ({llm_total / seconds if seconds else float('inf'):.1f}x), mean F1 {f1:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: throughput and latency of dynamic LLM batching for relations.
+
+Simulates concurrent jobs reaching the relation stage: `--clients` threads
+each send `--docs-per-client` documents through a `RelationBatcher`, for
+every combination of batch size and wait window. Batch size 1 is the old
+one-document-at-a-time behaviour. Needs the Qwen model used by `relations.py`.
+
+Usage:
+    python -m benchmarks.bench_relations_batching --clients 4 --batch-sizes 1 2 4 --waits-ms 0 50 200
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import relations
+
+DOCUMENTS = [
+    'Иван Петрович Смирнов родился 15.03.1890 в Москве в семье купца Петра Смирнова.',
+    'Анна Сергеевна Ковалева, дочь священника, окончила гимназию в Казани.',
+    'Николай Смирнов служил в Министерстве финансов и был женат на Марии Орловой.',
+    'Крещён в церкви Святого Николая 20 марта 1890 года священником Иоанном Беляевым.',
+]
+
+
+def run(clients: int, docs_per_client: int, batcher) -> tuple:
+    """Returns (wall seconds, per-request latencies)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        for i in range(docs_per_client):
+            text = DOCUMENTS[(index + i) % len(DOCUMENTS)]
+            start = time.perf_counter()
+            batcher.extract(text)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--docs-per-client', type=int, default=3)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--waits-ms', type=int, nargs='+', default=[0, 50, 200])
+    args = parser.parse_args()
+
+    relations._load_model()
+    total = args.clients * args.docs_per_client
+    print(f"{args.clients} clients x {args.docs_per_client} documents")
+    print(f"\n{'batch':>6} {'wait_ms':>8} {'seconds':>9} {'docs/sec':>9} "
+          f"{'p50_s':>7} {'p95_s':>7} {'avg_batch':>9}")
+
+    for batch_size in args.batch_sizes:
+        for wait_ms in args.waits_ms:
+            batcher = relations.RelationBatcher(max_batch=batch_size, max_wait=wait_ms / 1000)
+            seconds, latencies = run(args.clients, args.docs_per_client, batcher)
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{batch_size:>6} {wait_ms:>8} {seconds:>9.1f} {total / seconds:>9.2f} "
+                  f"{statistics.median(latencies):>7.1f} {p95:>7.1f} "
+                  f"{batcher.stats()['avg_batch_size']:>9.2f}")
+            if batch_size == 1:
+                # Без батчинга ожидание ничего не меняет
+                break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: prompt prefill with and without the cached prompt prefix.
+
+For documents of several lengths, times the prefill forward pass over the
+full formatted prompt (as every call did before) against the prefill of the
+document tail on top of a copy of `PromptPrefix.cache`, and the time to the
+first generated token for both paths. Needs the Qwen model used by
+`relations.py`.
+
+Usage:
+    python -m benchmarks.bench_relations_prefix --sentences 1 5 20 --repeats 5
+"""
+
+import argparse
+import copy
+import time
+
+import torch
+
+import relations
+
+SENTENCE = 'Иван Петрович Смирнов родился 15.03.1890 в Москве в семье купца Петра Смирнова. '
+
+
+def best_of(repeats: int, func) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sentences', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    relations.PREFIX_CACHE = False
+    relations._load_model()
+    tokenizer, model = relations._tokenizer, relations._generator.model
+    start = time.perf_counter()
+    prefix = relations.PromptPrefix(tokenizer, model)
+    print(f"Prefix: {prefix.ids.shape[1]} tokens, prefilled once in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n{'sentences':>9} {'tokens':>7} {'tail':>5} {'full_s':>8} {'cached_s':>8} {'speedup':>8} "
+          f"{'ttft_full_s':>11} {'ttft_cached_s':>13}")
+    for count in args.sentences:
+        prompt = relations._format_prompt(SENTENCE * count)
+        ids = tokenizer(prompt, return_tensors='pt', add_special_tokens=False).input_ids.to(model.device)
+        tail = tokenizer(prompt[len(prefix.text):], return_tensors='pt',
+                         add_special_tokens=False).input_ids.to(model.device)
+
+        def full_prefill():
+            with torch.no_grad():
+                model(ids, use_cache=True)
+
+        def cached_prefill():
+            with torch.no_grad():
+                model(tail, past_key_values=copy.deepcopy(prefix.cache), use_cache=True)
+
+        def full_first_token():
+            with torch.no_grad():
+                model.generate(input_ids=ids, attention_mask=torch.ones_like(ids), max_new_tokens=1,
+                               do_sample=False, pad_token_id=tokenizer.eos_token_id)
+
+        def cached_first_token():
+            original = relations._generation_kwargs
+            relations._generation_kwargs = lambda tokenizer=None: {
+                'max_new_tokens': 1, 'do_sample': False, 'pad_token_id': tokenizer.eos_token_id}
+            try:
+                prefix.generate([prompt])
+            finally:
+                relations._generation_kwargs = original
+
+        full = best_of(args.repeats, full_prefill)
+        cached = best_of(args.repeats, cached_prefill)
+        print(f"{count:>9} {ids.shape[1]:>7} {tail.shape[1]:>5} {full:>8.3f} {cached:>8.3f} "
+              f"{full / cached:>7.2f}x {best_of(args.repeats, full_first_token):>11.3f} "
+              f"{best_of(args.repeats, cached_first_token):>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: generated tokens and latency with and without early stopping.
+
+Generates relations for sample documents greedily, once running to
+`MAX_NEW_TOKENS` (or EOS) as before and once with `ListClosedCriteria`
+stopping each row when the relation list is closed. Reports generated
+tokens, seconds and whether both runs parse to the same relations, plus the
+time until the first tuple was streamed. Needs the Qwen model used by
+`relations.py`.
+
+Usage:
+    python -m benchmarks.bench_relations_stopping --repeats 2
+"""
+
+import argparse
+import time
+
+import torch
+
+import relations
+
+DOCUMENTS = [
+    'Иван Петрович Смирнов родился 15.03.1890 в Москве в семье купца Петра Смирнова.',
+    'Анна Сергеевна Ковалева, дочь священника Сергея Ковалева, окончила гимназию в Казани.',
+    'Николай Смирнов служил в Министерстве финансов и был женат на Марии Орловой. '
+    'Их сын Алексей родился в 1915 году в Санкт-Петербурге.',
+]
+
+
+def generate(model, tokenizer, prompt: str, criteria=None) -> tuple:
+    """Returns (response, generated tokens, seconds)."""
+    ids = tokenizer(prompt, return_tensors='pt', add_special_tokens=False).input_ids.to(model.device)
+    kwargs = {'stopping_criteria': [criteria]} if criteria else {}
+    start = time.perf_counter()
+    with torch.no_grad():
+        output = model.generate(input_ids=ids, attention_mask=torch.ones_like(ids),
+                                max_new_tokens=relations.MAX_NEW_TOKENS, do_sample=False,
+                                pad_token_id=tokenizer.eos_token_id, **kwargs)
+    seconds = time.perf_counter() - start
+    generated = output[0, ids.shape[1]:]
+    return tokenizer.decode(generated, skip_special_tokens=True), len(generated), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+
+    relations.PREFIX_CACHE = False
+    relations._load_model()
+    tokenizer, model = relations._tokenizer, relations._generator.model
+
+    print(f"{'doc':>3} {'tokens':>7} {'stopped':>8} {'seconds':>8} {'stopped_s':>9} {'first_tuple_s':>13} {'same':>5}")
+    totals = [0, 0, 0.0, 0.0]
+    for index, text in enumerate(DOCUMENTS):
+        prompt = relations._format_prompt(text)
+        for _ in range(args.repeats):
+            response, tokens, seconds = generate(model, tokenizer, prompt)
+
+            started = time.perf_counter()
+            first_tuple = []
+            criteria = relations.ListClosedCriteria(
+                tokenizer, lambda row, relation: first_tuple or first_tuple.append(time.perf_counter() - started))
+            stopped_response, stopped_tokens, stopped_seconds = generate(model, tokenizer, prompt, criteria)
+
+            same = relations._parse_llm_response(response) == relations._parse_llm_response(stopped_response)
+            first = f"{first_tuple[0]:.2f}" if first_tuple else '-'
+            print(f"{index:>3} {tokens:>7} {stopped_tokens:>8} {seconds:>8.2f} {stopped_seconds:>9.2f} "
+                  f"{first:>13} {str(same):>5}")
+            totals = [totals[0] + tokens, totals[1] + stopped_tokens,
+                      totals[2] + seconds, totals[3] + stopped_seconds]
+
+    print(f"\nTotal: {totals[0]} -> {totals[1]} generated tokens, "
+          f"{totals[2]:.1f}s -> {totals[3]:.1f}s ({totals[2] / totals[3]:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
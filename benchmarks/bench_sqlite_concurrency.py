@@ -0,0 +1,94 @@
+"""
+Benchmark: concurrent SQLite reads and writes.
+
+Writer threads commit stage updates (like background jobs) while reader
+threads poll progress (like the UI), once with SQLite defaults and once with
+`enable_sqlite_tuning` (WAL, busy timeout, synchronous=NORMAL). Reports
+throughput and "database is locked" errors for each mode.
+
+Usage:
+    python -m benchmarks.bench_sqlite_concurrency --writers 4 --readers 8 --seconds 5
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from models import enable_sqlite_tuning
+
+
+def run(tuned: bool, writers: int, readers: int, seconds: float) -> dict:
+    """Runs the workload against a fresh database file and returns counters."""
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    # timeout=0: без настройки писатели сразу получают "database is locked"
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 0})
+    if tuned:
+        enable_sqlite_tuning(engine)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE stages (id INTEGER PRIMARY KEY, result_id INTEGER, '
+                          'stage TEXT, status TEXT, payload TEXT)'))
+        conn.execute(text('CREATE INDEX ix_stages_result_id ON stages (result_id)'))
+
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(worker):
+        n = 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text('INSERT INTO stages (result_id, stage, status, payload) '
+                                      'VALUES (:r, :s, :st, :p)'),
+                                 {'r': worker * 100000 + n, 's': 'ner', 'st': 'completed', 'p': 'x' * 200})
+                bump('writes')
+                n += 1
+            except OperationalError:
+                bump('locked')
+
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT stage, status FROM stages WHERE result_id = :r'),
+                                 {'r': 1}).fetchall()
+                    conn.execute(text('SELECT COUNT(*) FROM stages')).scalar()
+                bump('reads')
+            except OperationalError:
+                bump('locked')
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'writes/s':>10} {'reads/s':>10} {'locked':>8}")
+    for tuned in (False, True):
+        counts = run(tuned, args.writers, args.readers, args.seconds)
+        print(f"{'tuned' if tuned else 'default':>8} {counts['writes'] / args.seconds:>10.0f} "
+              f"{counts['reads'] / args.seconds:>10.0f} {counts['locked']:>8}")
+
+
+if __name__ == '__main__':
+    main()
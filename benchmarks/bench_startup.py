@@ -0,0 +1,48 @@
+"""
+Benchmark: application import latency.
+
+Imports each module in a fresh interpreter and reports wall-clock time, so
+regressions such as eager model loading at import show up immediately.
+
+Usage:
+    python -m benchmarks.bench_startup --repeats 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ['registry', 'ocr', 'tesseract_ocr', 'htr', 'ner', 'relations', 'app']
+
+
+def time_import(module: str) -> float:
+    """Returns seconds taken by `import module` in a new interpreter."""
+    code = ("import time; start = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - start)")
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':>15} {'median ms':>10} {'min ms':>10}")
+    for module in args.modules:
+        timings = [time_import(module) for _ in range(args.repeats)]
+        print(f"{module:>15} {statistics.median(timings) * 1000:>10.0f} "
+              f"{min(timings) * 1000:>10.0f}")
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import app'], check=True,
+                   capture_output=True)
+    print(f"\nInterpreter start + import app: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
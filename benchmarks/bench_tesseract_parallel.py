@@ -0,0 +1,84 @@
+"""
+Benchmark: whole-page Tesseract vs region-level Tesseract with a pool of
+workers on multi-column pages.
+
+Reports pages/sec for every worker count, the number of blocks per page and
+how close the text is to the whole-page text. Without --images, synthetic
+two- and three-column pages with a heading are rendered. Needs Tesseract
+(rus).
+
+Usage:
+    python -m benchmarks.bench_tesseract_parallel --pages 10 --workers 1 2 4 8
+    OMP_THREAD_LIMIT=1 python -m benchmarks.bench_tesseract_parallel --images scans/
+"""
+
+import argparse
+import difflib
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from benchmarks.bench_ocr_cascade import LINES, load_font
+from tesseract_ocr import perform_tesseract_ocr, segment_blocks
+
+
+def make_pages(directory: str, count: int, seed: int = 0) -> list:
+    """Renders pages with a heading and 2-3 columns of paragraphs."""
+    rng = random.Random(seed)
+    font = load_font(22)
+    paths = []
+    for index in range(count):
+        columns = 2 + index % 2
+        page = Image.new('L', (2400, 3200), 255)
+        draw = ImageDraw.Draw(page)
+        draw.text((120, 80), 'Ведомость о родившихся, бракосочетавшихся и умерших', fill=0, font=load_font(48))
+        width = (2400 - 240) // columns
+        for column in range(columns):
+            top = 240
+            while top < 2900:
+                for _ in range(rng.randint(4, 9)):
+                    # Строка колонки - обрезанная до ширины колонки фраза
+                    line = rng.choice(LINES)[:width // 14]
+                    draw.text((120 + column * width, top), line, fill=0, font=font)
+                    top += 34
+                top += 60
+        path = os.path.join(directory, f'page_{index:03d}.png')
+        page.save(path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', help='Directory of page images (synthetic pages if omitted)')
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.images:
+            paths = [os.path.join(args.images, name) for name in sorted(os.listdir(args.images))]
+        else:
+            paths = make_pages(directory, args.pages)
+
+        blocks = sum(len(segment_blocks(Image.open(path))) for path in paths) / len(paths)
+        print(f"{len(paths)} pages, {blocks:.1f} blocks/page, cpu_count={os.cpu_count()}")
+        print(f"{'workers':>7} {'seconds':>8} {'pages/sec':>9} {'speedup':>8} {'similarity':>10}")
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            texts = [perform_tesseract_ocr(path, workers=workers) for path in paths]
+            seconds = time.perf_counter() - start
+            if baseline is None:
+                baseline = (seconds, texts)
+            similarity = sum(difflib.SequenceMatcher(None, ' '.join(text.split()), ' '.join(reference.split())).ratio()
+                             for text, reference in zip(texts, baseline[1])) / len(paths)
+            print(f"{workers:>7} {seconds:>8.1f} {len(paths) / seconds:>9.2f} "
+                  f"{baseline[0] / seconds:>7.2f}x {similarity:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
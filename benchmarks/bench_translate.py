@@ -0,0 +1,94 @@
+"""
+Benchmark: pre-reform orthography translation on large documents.
+
+Compares the previous `translate_text` (12 `str.replace` calls and five
+regex passes) with the translation-table version, the offset-tracking
+variant and the chunked streaming variant, and checks that all of them
+produce the same text.
+
+Usage:
+    python -m benchmarks.bench_translate --sizes-mb 1 4 16 --chunk-kb 64
+"""
+
+import argparse
+import random
+import re
+import time
+
+import ner
+
+SENTENCES = [
+    'Въ 1912 году Иванъ Петровичъ поступилъ въ Императорскiй университетъ.',
+    'Письмо отправлено изъ Москвы\n\nвъ Санктъ-Петербургъ съ курьеромъ.',
+    'Ѳедоръ  Ѳомичъ  объявилъ о продажѣ имѣнiя.',
+    'Мiръ и вѣра; подъ  сводами  церкви.',
+]
+
+
+def legacy_translate_text(text: str) -> str:
+    """Previous implementation, kept as the reference for timing and output."""
+    replacements = {
+        'ѣ': 'е', 'Ѣ': 'Е', 'i': 'и', 'I': 'И', 'І': 'И', 'і': 'и',
+        'ѵ': 'и', 'Ѵ': 'И', 'ѳ': 'ф', 'Ѳ': 'Ф', "ћ": 'e', 'y': 'ы',
+    }
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+
+    text = re.sub(r'ъ(\s|[.,;:!?—–\n\"\')\]])', r'\1', text)
+    text = re.sub(r'(\s|[.,;:!?—–\n\"\'(\[])ъ', r'\1', text)
+    text = text.replace('ъ', '')
+    text = text.replace('Ъ', '')
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+
+def make_text(megabytes: float, seed: int = 0) -> str:
+    """Generates roughly `megabytes` MB (UTF-8) of pre-reform text."""
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence.encode('utf-8')) + 1
+    return ' '.join(parts)
+
+
+def best_of(func, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--chunk-kb', type=int, default=64)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    chunk = args.chunk_kb * 1024
+
+    print(f"{'MB':>6} {'legacy s':>9} {'table s':>8} {'speedup':>8} {'offsets s':>10} "
+          f"{'stream s':>9} {'anchors':>9}")
+    for megabytes in args.sizes_mb:
+        text = make_text(megabytes)
+        chunks = [text[i:i + chunk] for i in range(0, len(text), chunk)]
+
+        legacy_seconds, expected = best_of(lambda: legacy_translate_text(text), args.repeats)
+        seconds, translated = best_of(lambda: ner.translate_text(text), args.repeats)
+        offset_seconds, (with_offsets, offsets) = best_of(
+            lambda: ner.translate_with_offsets(text), args.repeats)
+        stream_seconds, streamed = best_of(
+            lambda: ''.join(ner.translate_chunks(iter(chunks))), args.repeats)
+        assert translated == with_offsets == streamed == expected
+
+        print(f"{megabytes:>6g} {legacy_seconds:>9.3f} {seconds:>8.3f} "
+              f"{legacy_seconds / seconds:>7.2f}x {offset_seconds:>10.3f} {stream_seconds:>9.3f} "
+              f"{len(offsets._translated):>9}")
+
+
+if __name__ == '__main__':
+    main()
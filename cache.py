@@ -0,0 +1,199 @@
+"""
+Result Cache Module
+
+This module provides a persistent, content-addressed cache for model output
+(NER spans, extracted relations). Entries are keyed by a hash of the input
+text together with the model name and a version of the prompt or output
+format, so re-submitting the same text skips the models entirely, and
+changing the prompt or model invalidates old entries automatically.
+
+The cache is bounded by the total size of stored values; the least recently
+used entries are evicted first.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import unicodedata
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CacheEntry
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for cache keys: Unicode NFC, collapsed whitespace.
+
+    Example:
+        >>> normalize_text('  Иван\\n\\nПетров ')
+        'Иван Петров'
+    """
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def make_key(kind: str, text: str, model: str, version: str) -> str:
+    """
+    Builds the cache key for a model output.
+
+    Args:
+        kind (str): Output kind, e.g. 'ner' or 'relations'.
+        text (str): Input text, already normalized if the output allows it.
+        model (str): Model name.
+        version (str): Prompt or output format version.
+
+    Returns:
+        str: sha256 hex digest.
+    """
+    digest = hashlib.sha256()
+    for part in (kind, model, version, text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite-backed LRU cache of model outputs with hit/miss counters.
+
+    Example:
+        >>> cache = ResultCache(app, max_bytes=64 * 1024 * 1024)
+        >>> relations = cache.get_or_compute('relations', text, MODEL_NAME, PROMPT_VERSION,
+        ...                                  lambda: extract_relations(text))
+    """
+
+    def __init__(self, app, max_bytes: int = 64 * 1024 * 1024, enabled: bool = True):
+        """
+        Args:
+            app: Flask application (for the database context).
+            max_bytes (int): Maximum total size of cached values.
+            enabled (bool): If False every lookup is a miss and nothing is stored.
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def get_or_compute(self, kind: str, text: str, model: str, version: str, compute,
+                       normalize: bool = True):
+        """
+        Returns the cached output for a text, computing and storing it on a miss.
+
+        Args:
+            kind (str): Output kind, e.g. 'ner' or 'relations'.
+            text (str): Input text.
+            model (str): Model name.
+            version (str): Prompt or output format version.
+            compute (callable): Produces the output (JSON-serializable) on a
+                miss. A None result is returned as is and not stored, e.g.
+                when the model failed.
+            normalize (bool): Key on `normalize_text(text)`. Disable for outputs
+                that hold character offsets into the exact text, like NER spans.
+
+        Returns:
+            The cached or freshly computed output. Tuples come back as lists.
+        """
+        key = make_key(kind, normalize_text(text) if normalize else text, model, version)
+        found, value = self.get(kind, key)
+        if found:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(kind, key, value)
+        return value
+
+    def get(self, kind: str, key: str) -> tuple:
+        """
+        Looks up an entry and marks it as recently used.
+
+        Returns:
+            tuple: (found, value).
+        """
+        if not self.enabled:
+            self._count(kind, 'misses')
+            return False, None
+        with self.app.app_context():
+            entry = db.session.get(CacheEntry, key)
+            if entry is None:
+                self._count(kind, 'misses')
+                return False, None
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_used_at = datetime.utcnow()
+            value = json.loads(entry.value)
+            db.session.commit()
+        self._count(kind, 'hits')
+        return True, value
+
+    def put(self, kind: str, key: str, value) -> None:
+        """Stores an entry, then evicts least recently used ones over `max_bytes`."""
+        if not self.enabled:
+            return
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self.app.app_context():
+            try:
+                db.session.merge(CacheEntry(key=key, kind=kind, value=data, size_bytes=size,
+                                            hits=0, last_used_at=datetime.utcnow()))
+                db.session.commit()
+            except IntegrityError:
+                # Тот же ключ только что записал другой поток
+                db.session.rollback()
+                return
+            self._evict()
+
+    def _evict(self):
+        total = db.session.query(db.func.coalesce(db.func.sum(CacheEntry.size_bytes), 0)).scalar()
+        if total <= self.max_bytes:
+            return
+        oldest = db.session.query(CacheEntry.key, CacheEntry.kind, CacheEntry.size_bytes) \
+            .order_by(CacheEntry.last_used_at).all()
+        keys = []
+        for key, kind, size in oldest:
+            if total <= self.max_bytes:
+                break
+            keys.append(key)
+            total -= size
+            self._count(kind, 'evictions')
+        db.session.execute(db.delete(CacheEntry).where(CacheEntry.key.in_(keys)))
+        db.session.commit()
+        logger.debug(f"Evicted {len(keys)} cache entries")
+
+    def _count(self, kind: str, counter: str):
+        with self._lock:
+            counters = self._counters.setdefault(kind, {'hits': 0, 'misses': 0, 'evictions': 0})
+            counters[counter] += 1
+
+    def stats(self) -> dict:
+        """Returns per-kind hit/miss/eviction counters, entry count and size."""
+        with self._lock:
+            counters = {kind: dict(values) for kind, values in self._counters.items()}
+        with self.app.app_context():
+            rows = db.session.query(CacheEntry.kind, db.func.count(), db.func.sum(CacheEntry.size_bytes)) \
+                .group_by(CacheEntry.kind).all()
+        for kind, entries, size in rows:
+            counters.setdefault(kind, {'hits': 0, 'misses': 0, 'evictions': 0})
+            counters[kind].update({'entries': entries, 'bytes': size or 0})
+        for values in counters.values():
+            lookups = values['hits'] + values['misses']
+            values['hit_rate'] = values['hits'] / lookups if lookups else None
+            values.setdefault('entries', 0)
+            values.setdefault('bytes', 0)
+        return {'enabled': self.enabled, 'max_bytes': self.max_bytes, 'kinds': counters}
+
+    def clear(self) -> None:
+        """Removes all entries and resets the counters."""
+        with self.app.app_context():
+            db.session.execute(db.delete(CacheEntry))
+            db.session.commit()
+        with self._lock:
+            self._counters.clear()
@@ -0,0 +1,83 @@
+"""
+Progress Events Module
+
+This module provides an in-process publish/subscribe bus for processing
+progress. Background stages publish stage transitions and deltas per result,
+and Server-Sent Events streams subscribe to them instead of polling the
+database.
+"""
+
+import queue
+import threading
+
+
+class EventBus:
+    """
+    Thread-safe in-process pub/sub keyed by channel.
+
+    Every subscriber gets its own bounded queue; when a slow subscriber's
+    queue is full the oldest event is dropped, so publishers never block.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel) -> queue.Queue:
+        """
+        Registers a subscriber for a channel.
+
+        Args:
+            channel: Channel key, e.g. a result id.
+
+        Returns:
+            queue.Queue: Queue receiving events published after this call.
+        """
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber: queue.Queue) -> None:
+        """Removes a subscriber registered with `subscribe`."""
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    def publish(self, channel, event: dict) -> int:
+        """
+        Delivers an event to every subscriber of a channel.
+
+        Args:
+            channel: Channel key.
+            event (dict): Event payload.
+
+        Returns:
+            int: Number of subscribers the event was delivered to.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+        return len(subscribers)
+
+    def subscriber_count(self, channel) -> int:
+        """Returns the number of subscribers of a channel."""
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+progress_events = EventBus()
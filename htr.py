@@ -1,50 +1,118 @@
 import cv2
+import numpy as np
 from PIL import Image
-import torch
-from transformers import VisionEncoderDecoderModel, TrOCRProcessor
-import easyocr
-import statistics
+from ocr import get_reader
+from registry import registry, default_device, apply_cpu_precision
 
+HTR_MODEL_NAME = "kazars24/trocr-base-handwritten-ru"
+registry.allow_precision(HTR_MODEL_NAME)
 
-def group_by_lines(detection_results: list, y_tolerance: int = 10) -> list:
+
+def load_trocr(model_name: str = HTR_MODEL_NAME, device: str = None) -> tuple:
+    """
+    Returns the shared TrOCR processor and model, loading them on first use.
+
+    On CPU the model is converted to the precision configured for it in the
+    model registry (float32 by default, bfloat16 or int8).
+
+    Args:
+        model_name (str): Name of the TrOCR model to use.
+        device (str): Device to place the model on. Defaults to GPU
+            when available.
+
+    Returns:
+        tuple: (TrOCRProcessor, VisionEncoderDecoderModel) on `device`.
+    """
+    device = device or default_device()
+
+    def loader():
+        # Imported lazily: torch and transformers dominate app startup time
+        import torch
+        from transformers import VisionEncoderDecoderModel, TrOCRProcessor
+
+        processor = TrOCRProcessor.from_pretrained(model_name, use_fast=False)
+        model = VisionEncoderDecoderModel.from_pretrained(model_name)
+        model = model.to(torch.device(device))
+        model.eval()
+        if device == 'cpu':
+            model = apply_cpu_precision(model, registry.precision(model_name))
+        return processor, model
+
+    return registry.get(model_name, device, loader)
+
+
+def estimate_skew(points: np.ndarray) -> float:
+    """
+    Estimates the page skew as the median slope of the fragments' top edges.
+
+    Args:
+        points (np.ndarray): Array of shape (n, 4, 2) with bbox corners in
+            EasyOCR order (top-left, top-right, bottom-right, bottom-left).
+
+    Returns:
+        float: Slope dy/dx of text lines, 0.0 if it cannot be estimated.
+    """
+    dx = points[:, 1, 0] - points[:, 0, 0]
+    dy = points[:, 1, 1] - points[:, 0, 1]
+    valid = dx > 0
+    if not valid.any():
+        return 0.0
+    return float(np.median(dy[valid] / dx[valid]))
+
+
+def group_by_lines(detection_results: list, y_tolerance: int = 10,
+                   deskew: bool = False) -> list:
     """
     Groups detected text fragments into lines based on Y-coordinates.
 
+    Bbox extents for all fragments are computed in one array operation and
+    the line center is kept as a running mean, so grouping is linear in the
+    number of fragments.
+
     Args:
         detection_results (list): Results from EasyOCR readtext.
         y_tolerance (int): Tolerance for grouping fragments into lines.
+        deskew (bool): Compensate for skewed lines by projecting bbox centers
+            onto the estimated text direction before grouping.
 
     Returns:
         list: List of lines, where each line
         is a list of (bbox, text, prob) tuples.
     """
-    sorted_results = sorted(
-        detection_results,
-        key=lambda x: min([pt[1] for pt in x[0]]))
+    if not detection_results:
+        return []
+
+    points = np.asarray([bbox for bbox, _, _ in detection_results],
+                        dtype=np.float64)
+    y_min = points[:, :, 1].min(axis=1)
+    y_max = points[:, :, 1].max(axis=1)
+    y_centers = (y_min + y_max) / 2
+
+    if deskew:
+        x_centers = (points[:, :, 0].min(axis=1) + points[:, :, 0].max(axis=1)) / 2
+        offset = estimate_skew(points) * x_centers
+        y_min = y_min - offset
+        y_centers = y_centers - offset
+
+    order = np.argsort(y_min, kind='stable')
 
     lines = []
     current_line = []
-    current_line_y_center = None
-
-    for bbox, text, prob in sorted_results:
-        y_cords = [pt[1] for pt in bbox]
-        y_min, y_max = min(y_cords), max(y_cords)
-        y_center = (y_min + y_max) / 2
-
-        if current_line_y_center is None:
-            current_line.append((bbox, text, prob))
-            current_line_y_center = y_center
-        elif abs(y_center - current_line_y_center) <= y_tolerance:
-            current_line.append((bbox, text, prob))
-            centers = [
-                (min([pt[1] for pt in b]) + max([pt[1] for pt in b])) / 2
-                for b, t, p in current_line]
-            current_line_y_center = statistics.mean(centers)
-        else:
-            if current_line:
-                lines.append(current_line)
-            current_line = [(bbox, text, prob)]
-            current_line_y_center = y_center
+    line_sum = 0.0
+    line_count = 0
+
+    for idx, y_center in zip(order.tolist(), y_centers[order].tolist()):
+        bbox, text, prob = detection_results[idx]
+
+        if line_count and abs(y_center - line_sum / line_count) > y_tolerance:
+            lines.append(current_line)
+            current_line = []
+            line_sum = 0.0
+            line_count = 0
+
+        current_line.append((bbox, text, prob))
+        line_sum += y_center
+        line_count += 1
 
     if current_line:
         lines.append(current_line)
@@ -52,9 +120,93 @@ def group_by_lines(detection_results: list, y_tolerance: int = 10) -> list:
     return lines
 
 
+def crop_lines(pil_image: Image.Image, grouped_lines: list) -> list:
+    """
+    Crops every grouped line from the page image.
+
+    Args:
+        pil_image (PIL.Image.Image): Full page image.
+        grouped_lines (list): Lines returned by `group_by_lines`.
+
+    Returns:
+        list: One PIL image per line, or None for empty/degenerate lines.
+    """
+    crops = []
+    for line_fragments in grouped_lines:
+        if not line_fragments:
+            crops.append(None)
+            continue
+
+        x_cords = []
+        y_cords = []
+        for bbox, _, _ in line_fragments:
+            x_cords.extend([pt[0] for pt in bbox])
+            y_cords.extend([pt[1] for pt in bbox])
+
+        x_min = min(x_cords)
+        x_max = max(x_cords)
+        y_min = min(y_cords)
+        y_max = max(y_cords)
+
+        if x_max <= x_min or y_max <= y_min:
+            crops.append(None)
+            continue
+
+        crops.append(pil_image.crop((x_min, y_min, x_max, y_max)))
+    return crops
+
+
+def recognize_lines(line_images: list, processor, model, device: str,
+                    batch_size: int = 8) -> list:
+    """
+    Recognizes line crops with TrOCR in padded batches.
+
+    Crops are bucketed by width before batching, so short and long lines end
+    up in different batches and `generate` does not decode a short line for
+    as many steps as the longest line on the page.
+
+    Args:
+        line_images (list): PIL line crops; None entries yield "".
+        processor: TrOCR processor.
+        model: TrOCR VisionEncoderDecoderModel.
+        device (str): Device the model is placed on.
+        batch_size (int): Maximum number of lines per `generate` call.
+            1 reproduces per-line inference.
+
+    Returns:
+        list: Recognized text per input crop, in input order.
+    """
+    import torch
+
+    texts = [""] * len(line_images)
+    order = sorted((idx for idx, img in enumerate(line_images) if img is not None),
+                   key=lambda idx: line_images[idx].width)
+    batch_size = max(1, batch_size)
+
+    for batch_start in range(0, len(order), batch_size):
+        batch_indices = order[batch_start:batch_start + batch_size]
+        batch_images = [line_images[idx] for idx in batch_indices]
+
+        pixel_values = processor(images=batch_images,
+                                 return_tensors="pt").pixel_values
+        # Вход в dtype модели: при bfloat16 свёртки не принимают float32
+        pixel_values = pixel_values.to(device=device, dtype=model.dtype)
+
+        with torch.no_grad():
+            outputs = model.generate(pixel_values)
+
+        batch_texts = processor.batch_decode(outputs,
+                                             skip_special_tokens=True)
+        for idx, line_text in zip(batch_indices, batch_texts):
+            texts[idx] = line_text
+    return texts
+
+
 def perform_htr(image_path: str,
-                model_name: str = "kazars24/trocr-base-handwritten-ru",
-                y_tolerance: int = 10) -> tuple:
+                model_name: str = HTR_MODEL_NAME,
+                y_tolerance: int = 10,
+                batch_size: int = 8,
+                deskew: bool = False) -> tuple:
     """
     Performs Handwritten Text Recognition (HTR) on a multi-line image.
 
@@ -62,6 +214,10 @@ def perform_htr(image_path: str,
         image_path (str): Path to the input image file.
         model_name (str): Name of the TrOCR model to use.
         y_tolerance (int): Tolerance for grouping text fragments into lines.
+        batch_size (int): Number of line crops per TrOCR `generate` call.
+            Use 1 for per-line inference.
+        deskew (bool): Group fragments into lines along the estimated text
+            direction, for skewed scans (see `group_by_lines`).
 
     Returns:
         tuple: A tuple containing:
@@ -80,58 +236,20 @@ def perform_htr(image_path: str,
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     pil_image = Image.fromarray(image_rgb)
 
-    reader = easyocr.Reader(['ru'], gpu=True)
+    device = default_device()
+    reader = get_reader(device)
     detection_results = reader.readtext(image_rgb, paragraph=False)
 
     if not detection_results:
         return [], ""
 
-    grouped_lines = group_by_lines(detection_results, y_tolerance=y_tolerance)
-
-    processor = TrOCRProcessor.from_pretrained(model_name, use_fast=False)
-    model = VisionEncoderDecoderModel.from_pretrained(model_name)
+    grouped_lines = group_by_lines(detection_results, y_tolerance=y_tolerance, deskew=deskew)
 
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = model.to(device)
-
-    final_recognized_lines = []
-    full_text_parts = []
-
-    for line_idx, line_fragments in enumerate(grouped_lines):
-        if not line_fragments:
-            final_recognized_lines.append("")
-            full_text_parts.append("")
-            continue
-
-        x_cords = []
-        y_cords = []
-        for bbox, _, _ in line_fragments:
-            x_cords.extend([pt[0] for pt in bbox])
-            y_cords.extend([pt[1] for pt in bbox])
-
-        x_min = min(x_cords)
-        x_max = max(x_cords)
-        y_min = min(y_cords)
-        y_max = max(y_cords)
-
-        if x_max <= x_min or y_max <= y_min:
-            final_recognized_lines.append("")
-            full_text_parts.append("")
-            continue
-
-        line_image = pil_image.crop((x_min, y_min, x_max, y_max))
-
-        pixel_values = processor(images=line_image,
-                                 return_tensors="pt").pixel_values
-        pixel_values = pixel_values.to(device)
-
-        with torch.no_grad():
-            outputs = model.generate(pixel_values)
+    processor, model = load_trocr(model_name, device)
 
-        line_text = processor.batch_decode(outputs,
-                                           skip_special_tokens=True)[0]
-        final_recognized_lines.append(line_text)
-        full_text_parts.append(line_text)
+    line_images = crop_lines(pil_image, grouped_lines)
+    final_recognized_lines = recognize_lines(line_images, processor, model,
+                                             device, batch_size=batch_size)
 
-    full_text = "\n".join(full_text_parts)
+    full_text = "\n".join(final_recognized_lines)
     return final_recognized_lines, full_text
@@ -0,0 +1,377 @@
+"""
+Job Scheduler Module
+
+This module provides a bounded worker pool for background processing jobs.
+Jobs wait in a bounded FIFO queue and a fixed number of worker threads run
+them. Concurrency of individual stages (e.g. only one LLM relation extraction
+at a time) is set by the per-stage worker pools of `pipeline.Pipeline`.
+
+`JobStore` persists jobs in the `jobs` table, so work survives restarts:
+workers lease a job before running it, extend the lease with heartbeats and
+jobs whose lease expired are picked up again.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a full queue."""
+
+    def __init__(self, queue_size: int, eta_seconds):
+        super().__init__(f"Job queue is full ({queue_size} jobs waiting)")
+        self.queue_size = queue_size
+        self.eta_seconds = eta_seconds
+
+
+class JobScheduler:
+    """
+    Bounded worker pool with a FIFO job queue.
+
+    Per-stage concurrency is set by the worker pools of `pipeline.Pipeline`.
+
+    Worker threads are started on the first submitted job, so importing the
+    application (or forking worker processes) does not spawn threads.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 20,
+                 poll=None, poll_interval: float = 30):
+        """
+        Args:
+            workers (int): Number of worker threads running jobs.
+            max_queue (int): Maximum number of jobs waiting to start.
+            poll (callable): Optional function called every `poll_interval`
+                seconds once the scheduler is started, e.g. to re-queue
+                persisted jobs.
+            poll_interval (float): Seconds between `poll` calls.
+        """
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._running = set()
+        self._threads = []
+        self._avg_job_seconds = None
+        self._poll = poll
+        self._poll_interval = poll_interval
+        self._poll_thread = None
+
+    def submit(self, job_id, func, *args) -> int:
+        """
+        Queues a job for execution.
+
+        Args:
+            job_id: Identifier used for queue position lookups.
+            func (callable): Function to run in a worker thread.
+            *args: Positional arguments for `func`.
+
+        Returns:
+            int: 1-based position of the job in the waiting queue.
+
+        Raises:
+            QueueFullError: If the queue already holds `max_queue` jobs.
+        """
+        self._ensure_workers()
+        with self._lock:
+            try:
+                self._queue.put_nowait((job_id, func, args))
+            except queue.Full:
+                raise QueueFullError(len(self._pending),
+                                     self._eta_for(len(self._pending) + 1))
+            self._pending.append(job_id)
+            return len(self._pending)
+
+    def position(self, job_id):
+        """
+        Returns the job's place in the queue.
+
+        Returns:
+            int or None: 1-based waiting position, 0 if the job is running,
+            None if the scheduler does not know the job.
+        """
+        with self._lock:
+            if job_id in self._running:
+                return 0
+            try:
+                return self._pending.index(job_id) + 1
+            except ValueError:
+                return None
+
+    def eta_seconds(self, position: int):
+        """
+        Estimates seconds until a job at `position` starts running.
+
+        Returns:
+            float or None: Estimate, or None until a job has completed.
+        """
+        with self._lock:
+            return self._eta_for(position)
+
+    def stats(self) -> dict:
+        """Returns queue depth, running jobs and average job duration."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': len(self._pending),
+                'running': len(self._running),
+                'avg_job_seconds': self._avg_job_seconds,
+            }
+
+    def _eta_for(self, position: int):
+        if self._avg_job_seconds is None:
+            return None
+        # Jobs ahead are drained `workers` at a time, after the running ones
+        return self._avg_job_seconds * (position + len(self._running) - 1) / self.workers
+
+    def start(self):
+        """Starts worker threads and the poller. Safe to call repeatedly."""
+        self._ensure_workers()
+        with self._lock:
+            if self._poll is None or (self._poll_thread and self._poll_thread.is_alive()):
+                return
+            self._poll_thread = threading.Thread(target=self._poller, daemon=True,
+                                                 name='job-poller')
+            self._poll_thread.start()
+
+    def _poller(self):
+        while True:
+            try:
+                self._poll()
+            except Exception:
+                logger.exception("Job poller failed")
+            time.sleep(self._poll_interval)
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, daemon=True,
+                                          name=f'job-worker-{len(self._threads)}')
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job_id, func, args = self._queue.get()
+            with self._lock:
+                if job_id in self._pending:
+                    self._pending.remove(job_id)
+                self._running.add(job_id)
+
+            start = time.perf_counter()
+            try:
+                func(*args)
+            except Exception:
+                logger.exception(f"Job {job_id} failed")
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._running.discard(job_id)
+                    if self._avg_job_seconds is None:
+                        self._avg_job_seconds = elapsed
+                    else:
+                        # Exponential moving average of job duration
+                        self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+                self._queue.task_done()
+
+    def join(self):
+        """Blocks until every queued job has finished."""
+        self._queue.join()
+
+
+class JobStore:
+    """
+    SQLite-backed job records with leasing, heartbeats and retries.
+
+    A job is leased by a single owner for `lease_seconds`; the owner extends
+    the lease every `heartbeat_seconds` while it runs. Jobs that are queued or
+    whose lease has expired (e.g. the process was restarted) are returned by
+    `recoverable` so they can be submitted again.
+    """
+
+    def __init__(self, app, lease_seconds: int = 120, heartbeat_seconds: int = 30,
+                 max_attempts: int = 3):
+        self.app = app
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def new_owner() -> str:
+        """Returns a unique lease owner id for this process."""
+        return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def create(self, result_id: int, payload: dict) -> Job:
+        """
+        Adds a queued job for a processing result to the current session.
+
+        Args:
+            result_id (int): ProcessingResult id.
+            payload (dict): Keyword arguments for the job function.
+
+        Returns:
+            Job: The new job (committed by the caller).
+        """
+        job = Job(result_id=result_id, status='queued',
+                  payload=json.dumps(payload, ensure_ascii=False),
+                  max_attempts=self.max_attempts)
+        db.session.add(job)
+        return job
+
+    def lease(self, result_id: int, owner: str):
+        """
+        Atomically leases a queued or expired job.
+
+        Returns:
+            dict or None: Job payload, or None if the job is finished or
+            leased by another live worker.
+        """
+        with self.app.app_context():
+            now = datetime.utcnow()
+            leased = db.session.execute(
+                db.update(Job)
+                .where(Job.result_id == result_id)
+                .where(Job.attempts < Job.max_attempts)
+                .where(self._claimable(now))
+                .values(status='running', lease_owner=owner,
+                        attempts=Job.attempts + 1, heartbeat_at=now,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+            ).rowcount
+            db.session.commit()
+            if not leased:
+                return None
+            job = Job.query.filter_by(result_id=result_id).first()
+            return json.loads(job.payload or '{}')
+
+    def heartbeat(self, result_id: int, owner: str) -> bool:
+        """
+        Extends the lease held by `owner`.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        with self.app.app_context():
+            now = datetime.utcnow()
+            renewed = db.session.execute(
+                db.update(Job)
+                .where(Job.result_id == result_id, Job.lease_owner == owner,
+                       Job.status == 'running')
+                .values(heartbeat_at=now,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+            ).rowcount
+            db.session.commit()
+            return bool(renewed)
+
+    @contextmanager
+    def heartbeating(self, result_id: int, owner: str):
+        """Sends heartbeats from a helper thread while the body runs."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_seconds):
+                try:
+                    if not self.heartbeat(result_id, owner):
+                        logger.warning(f"Lost lease for job {result_id}")
+                except Exception:
+                    logger.exception(f"Heartbeat for job {result_id} failed")
+
+        thread = threading.Thread(target=beat, daemon=True,
+                                  name=f'job-heartbeat-{result_id}')
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, result_id: int, owner: str) -> None:
+        """Marks a leased job as completed."""
+        self._finish(result_id, owner, 'completed')
+
+    def fail(self, result_id: int, owner: str, error: str) -> bool:
+        """
+        Releases a failed job for retry, or marks it failed.
+
+        Returns:
+            bool: True if the job was re-queued for another attempt.
+        """
+        with self.app.app_context():
+            job = Job.query.filter_by(result_id=result_id, lease_owner=owner).first()
+            if job is None:
+                return False
+            retry = job.attempts < job.max_attempts
+            job.status = 'queued' if retry else 'failed'
+            job.lease_owner = None
+            job.lease_expires_at = None
+            job.last_error = error
+            db.session.commit()
+            return retry
+
+    def recoverable(self) -> list:
+        """
+        Returns result ids of jobs that should be (re)submitted: queued
+        jobs and jobs whose lease expired with attempts left.
+
+        Jobs never attempted are skipped for one lease interval after they
+        were created: their creator submits them itself, and picking them up
+        in between would queue them twice.
+        """
+        with self.app.app_context():
+            now = datetime.utcnow()
+            fresh = db.and_(Job.attempts == 0,
+                            Job.created_at > now - timedelta(seconds=self.lease_seconds))
+            jobs = Job.query.filter(
+                Job.attempts < Job.max_attempts,
+                self._claimable(now),
+                db.not_(fresh)
+            ).order_by(Job.id).all()
+            return [job.result_id for job in jobs]
+
+    def expire_exhausted(self) -> list:
+        """
+        Marks jobs whose lease expired on their last attempt as failed.
+
+        Returns:
+            list: Result ids of the jobs that were marked failed.
+        """
+        with self.app.app_context():
+            now = datetime.utcnow()
+            jobs = Job.query.filter(
+                Job.attempts >= Job.max_attempts,
+                Job.status == 'running',
+                Job.lease_expires_at < now
+            ).all()
+            for job in jobs:
+                job.status = 'failed'
+                job.last_error = job.last_error or 'Job lease expired'
+            db.session.commit()
+            return [job.result_id for job in jobs]
+
+    @staticmethod
+    def _claimable(now):
+        """SQL condition for jobs that are queued or have an expired lease."""
+        expired = db.and_(Job.status == 'running', Job.lease_expires_at < now)
+        return db.or_(Job.status == 'queued', expired)
+
+    def _finish(self, result_id: int, owner: str, status: str) -> None:
+        with self.app.app_context():
+            job = Job.query.filter_by(result_id=result_id, lease_owner=owner).first()
+            if job is not None:
+                job.status = status
+                job.lease_owner = None
+                job.lease_expires_at = None
+                db.session.commit()
@@ -0,0 +1,63 @@
+"""initial schema
+
+Baseline created with db.create_all() before migrations were introduced.
+Tables are only created when missing, so existing databases can simply be
+upgraded.
+
+Revision ID: 3b1f6c0e2a10
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c0e2a10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('password_hash', sa.String(length=256), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username')
+        )
+
+    if not _has_table('processing_results'):
+        op.create_table(
+            'processing_results',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('image_filename', sa.String(length=255), nullable=True),
+            sa.Column('text_type', sa.String(length=20), nullable=True),
+            sa.Column('ocr_model', sa.String(length=50), nullable=True),
+            sa.Column('translated', sa.Boolean(), nullable=True),
+            sa.Column('current_stage', sa.String(length=30), nullable=True),
+            sa.Column('stage_data', sa.Text(), nullable=True),
+            sa.Column('original_text', sa.Text(), nullable=True),
+            sa.Column('processed_text_html', sa.Text(), nullable=True),
+            sa.Column('relations_json', sa.Text(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('error_message', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('processing_results')
+    op.drop_table('users')
@@ -0,0 +1,77 @@
+"""persistent jobs, per-stage rows and translated text
+
+Revision ID: 7c2d9e4f5b21
+Revises: 3b1f6c0e2a10
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2d9e4f5b21'
+down_revision = '3b1f6c0e2a10'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _has_column(table, column):
+    return any(c['name'] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade():
+    if not _has_column('processing_results', 'translated_text'):
+        op.add_column('processing_results', sa.Column('translated_text', sa.Text(), nullable=True))
+
+    if not _has_table('jobs'):
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('result_id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=True),
+            sa.Column('max_attempts', sa.Integer(), nullable=True),
+            sa.Column('lease_owner', sa.String(length=64), nullable=True),
+            sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+            sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['result_id'], ['processing_results.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('result_id')
+        )
+        op.create_index('ix_jobs_status', 'jobs', ['status'])
+
+    if not _has_table('stage_results'):
+        op.create_table(
+            'stage_results',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('result_id', sa.Integer(), nullable=False),
+            sa.Column('stage', sa.String(length=30), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.Column('duration_seconds', sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(['result_id'], ['processing_results.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('result_id', 'stage')
+        )
+        op.create_index('ix_stage_results_result_id', 'stage_results', ['result_id'])
+
+
+def downgrade():
+    op.drop_index('ix_stage_results_result_id', table_name='stage_results')
+    op.drop_table('stage_results')
+    op.drop_index('ix_jobs_status', table_name='jobs')
+    op.drop_table('jobs')
+    with op.batch_alter_table('processing_results') as batch_op:
+        batch_op.drop_column('translated_text')
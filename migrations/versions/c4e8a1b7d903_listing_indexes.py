@@ -0,0 +1,30 @@
+"""index for result listings
+
+Revision ID: c4e8a1b7d903
+Revises: 7c2d9e4f5b21
+Create Date: 2026-10-18 12:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1b7d903'
+down_revision = '7c2d9e4f5b21'
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name):
+    return any(i['name'] == name for i in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    if not _has_index('processing_results', 'ix_processing_results_user_id_created_at'):
+        op.create_index('ix_processing_results_user_id_created_at', 'processing_results',
+                        ['user_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_processing_results_user_id_created_at', table_name='processing_results')
@@ -0,0 +1,30 @@
+"""entity spans instead of NER HTML
+
+Revision ID: e5a3f9c1d7b4
+Revises: c4e8a1b7d903
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a3f9c1d7b4'
+down_revision = 'c4e8a1b7d903'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return any(c['name'] == column for c in sa.inspect(op.get_bind()).get_columns(table))
+
+
+def upgrade():
+    if not _has_column('processing_results', 'entities_json'):
+        op.add_column('processing_results', sa.Column('entities_json', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('processing_results') as batch_op:
+        batch_op.drop_column('entities_json')
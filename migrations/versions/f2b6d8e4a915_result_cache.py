@@ -0,0 +1,41 @@
+"""content-addressed cache of NER and relation results
+
+Revision ID: f2b6d8e4a915
+Revises: e5a3f9c1d7b4
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8e4a915'
+down_revision = 'e5a3f9c1d7b4'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('result_cache'):
+        op.create_table(
+            'result_cache',
+            sa.Column('key', sa.String(length=64), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('value', sa.Text(), nullable=False),
+            sa.Column('size_bytes', sa.Integer(), nullable=False),
+            sa.Column('hits', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_used_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('key')
+        )
+        op.create_index('ix_result_cache_last_used_at', 'result_cache', ['last_used_at'])
+
+
+def downgrade():
+    op.drop_index('ix_result_cache_last_used_at', table_name='result_cache')
+    op.drop_table('result_cache')
@@ -0,0 +1,191 @@
+"""
+Model Server Module
+
+This module lets one long-lived process hold the heavy models (EasyOCR,
+Tesseract, TrOCR, Slovnet NER, the relation LLM) and serve them to the web
+workers over a Unix socket. With several Flask worker processes every one of
+them would otherwise load its own copy of the models; with the server they
+only send file paths and texts and get results back.
+
+The protocol is newline-delimited JSON. A request is
+{"op": ..., "args": {...}, "stream": bool}; the server answers with zero or
+more {"event": ...} lines (partial results, only if "stream" was set) and
+then exactly one {"result": ...} or {"error": ..., "type": ...} line. A
+connection can carry any number of requests in sequence.
+
+The operations themselves are plain callables `handler(args, emit)`, so the
+server has no model code of its own: `app.py` serves the same functions it
+calls in-process, with request batching done by the batchers behind them.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerError(Exception):
+    """Raised by `ModelClient` when the server is unreachable or an operation failed."""
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    """Serves the requests of one client connection in order."""
+
+    def setup(self):
+        super().setup()
+        self._write_lock = threading.Lock()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request['op']
+                handler = self.server.handlers[op]
+            except (ValueError, KeyError, TypeError):
+                self._send({'error': f"Bad request: {line[:100]!r}", 'type': 'BadRequest'})
+                continue
+
+            emit = self._emit if request.get('stream') else None
+            try:
+                result = handler(request.get('args') or {}, emit)
+            except Exception as e:
+                logger.exception(f"Model server operation {op} failed")
+                self._send({'error': str(e), 'type': type(e).__name__})
+            else:
+                self._send({'result': result})
+
+    def _emit(self, event):
+        # Вызывается из потока батчера; отключившийся клиент не должен ломать батч
+        try:
+            self._send({'event': event})
+        except OSError as e:
+            logger.debug(f"Dropped a streamed event: {e}")
+
+    def _send(self, message: dict):
+        data = json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._write_lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded Unix socket server dispatching requests to operation handlers.
+
+    Every connection gets its own thread; handlers that share a model are
+    expected to serialize or batch access themselves (see `RelationBatcher`).
+
+    Example:
+        >>> server = ModelServer('/tmp/ai-archive-models.sock',
+        ...                      {'ner': lambda args, emit: perform_ner_spans(args['text'])})
+        >>> server.serve_forever()
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, handlers: dict):
+        """
+        Args:
+            socket_path (str): Filesystem path of the Unix socket. A stale
+                socket file left by a previous run is removed.
+            handlers (dict): Operation name -> callable(args, emit). `args` is
+                the request's argument dict, `emit` sends a partial result to
+                the client, or is None if the client did not ask for streaming.
+                The return value (JSON-serializable) is the result.
+
+        Raises:
+            ModelServerError: Another server is already listening on the path.
+        """
+        if os.path.exists(socket_path):
+            if _is_listening(socket_path):
+                raise ModelServerError(f"A model server is already running at {socket_path}")
+            os.unlink(socket_path)
+        self.handlers = handlers
+        super().__init__(socket_path, _ConnectionHandler)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def _is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+class ModelClient:
+    """
+    Client of a `ModelServer`; opens a connection per call, so it is thread-safe.
+
+    Example:
+        >>> client = ModelClient('/tmp/ai-archive-models.sock')
+        >>> client.call('ner', text='Иван живет в Москве.')
+        [{'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'}, ...]
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 600.0):
+        """
+        Args:
+            socket_path (str): Path of the server's Unix socket.
+            timeout (float): Seconds to wait for the server, per read.
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def call(self, op: str, on_event=None, **args):
+        """
+        Runs an operation in the server and waits for its result.
+
+        Args:
+            op (str): Operation name, e.g. 'ocr' or 'relations'.
+            on_event (callable): Receives partial results while the operation
+                runs; the server only streams them if this is given.
+            **args: JSON-serializable operation arguments.
+
+        Returns:
+            The operation result as decoded from JSON (tuples become lists).
+
+        Raises:
+            ModelServerError: The server is unreachable, timed out, closed the
+                connection or the operation raised.
+        """
+        request = json.dumps({'op': op, 'args': args, 'stream': on_event is not None},
+                             ensure_ascii=False).encode('utf-8') + b'\n'
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                with sock.makefile('rwb') as stream:
+                    stream.write(request)
+                    stream.flush()
+                    for line in stream:
+                        message = json.loads(line)
+                        if 'event' in message:
+                            self._deliver(on_event, message['event'])
+                        elif 'error' in message:
+                            raise ModelServerError(f"{op} failed: {message['type']}: {message['error']}")
+                        else:
+                            return message['result']
+        except OSError as e:
+            raise ModelServerError(f"Model server at {self.socket_path} is unavailable: {e}") from e
+        raise ModelServerError(f"Model server closed the connection during {op}")
+
+    @staticmethod
+    def _deliver(on_event, event):
+        if on_event is None:
+            return
+        try:
+            on_event(event)
+        except Exception:
+            logger.exception("Model server event callback failed")
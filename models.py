@@ -1,6 +1,9 @@
 """Database models for users and processing results."""
 
+import json
+import sqlite3
 from datetime import datetime
+from sqlalchemy import event
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -8,6 +11,29 @@ from werkzeug.security import generate_password_hash, check_password_hash
 db = SQLAlchemy()
 
 
+def enable_sqlite_tuning(engine, busy_timeout_ms: int = 30000) -> None:
+    """
+    Configures every new SQLite connection of an engine for concurrent jobs.
+
+    WAL lets request threads read while background stages commit, the busy
+    timeout makes writers wait instead of failing with "database is locked",
+    and synchronous=NORMAL avoids an fsync per commit (safe with WAL).
+
+    Args:
+        engine: SQLAlchemy engine.
+        busy_timeout_ms (int): How long a writer waits for the lock.
+    """
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        cursor.close()
+
+
 class User(UserMixin, db.Model):
     """User model for authentication."""
     __tablename__ = 'users'
@@ -29,6 +55,7 @@ class User(UserMixin, db.Model):
 class ProcessingResult(db.Model):
     """Model for storing processing results with stage tracking."""
     __tablename__ = 'processing_results'
+    __table_args__ = (db.Index('ix_processing_results_user_id_created_at', 'user_id', 'created_at'),)
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -40,17 +67,35 @@ class ProcessingResult(db.Model):
     translated = db.Column(db.Boolean, default=False)
 
     current_stage = db.Column(db.String(30), default='queued')
-    stage_data = db.Column(db.Text, default='{}')  # JSON with intermediate results
-
-    original_text = db.Column(db.Text)
-    processed_text_html = db.Column(db.Text)
-    relations_json = db.Column(db.Text)
+    # Legacy JSON with intermediate results, only set for results created
+    # before per-stage rows (StageResult) were introduced
+    stage_data = db.deferred(db.Column(db.Text, default='{}'))
+
+    # Large artifacts, each stored once; deferred so status reads stay small
+    original_text = db.deferred(db.Column(db.Text))
+    translated_text = db.deferred(db.Column(db.Text))
+    # NER and date spans (JSON list) over the text NER ran on; HTML is rendered from them
+    entities_json = db.deferred(db.Column(db.Text))
+    # Legacy NER HTML of results processed before entity spans were stored
+    processed_text_html = db.deferred(db.Column(db.Text))
+    relations_json = db.deferred(db.Column(db.Text))
 
     status = db.Column(db.String(20), default='processing')
     error_message = db.Column(db.Text)
 
+    stages = db.relationship('StageResult', backref='result', lazy=True,
+                             cascade='all, delete-orphan')
+
     STAGES = ['queued', 'recognizing', 'translating', 'ner', 'relations', 'completed', 'failed']
 
+    # Stage -> (column holding its artifact, key of the artifact in progress data)
+    STAGE_ARTIFACTS = {
+        'recognizing': ('original_text', 'text'),
+        'translating': ('translated_text', 'text'),
+        'ner': ('entities_json', 'entities'),
+        'relations': ('relations_json', 'json'),
+    }
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -62,7 +107,100 @@ class ProcessingResult(db.Model):
             'current_stage': self.current_stage,
             'stage_data': self.stage_data,
             'original_text': self.original_text,
+            'translated_text': self.translated_text,
+            'entities_json': self.entities_json,
             'processed_text_html': self.processed_text_html,
             'relations_json': self.relations_json,
             'status': self.status
         }
+
+    @property
+    def ner_text(self):
+        """Text the entity spans point into: translated text if translation was on."""
+        return self.translated_text if self.translated else self.original_text
+
+    def to_summary(self, preview: str = None):
+        """
+        Listing fields only, without touching the deferred large columns.
+
+        Args:
+            preview (str): Prefix of the recognized text, selected by the caller.
+        """
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'image_filename': self.image_filename,
+            'text_type': self.text_type,
+            'ocr_model': self.ocr_model,
+            'translated': self.translated,
+            'current_stage': self.current_stage,
+            'status': self.status,
+            'error': self.error_message,
+            'preview': preview
+        }
+
+
+class StageResult(db.Model):
+    """Status, timings and small payload of one processing stage of a result."""
+    __tablename__ = 'stage_results'
+    __table_args__ = (db.UniqueConstraint('result_id', 'stage'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('processing_results.id'),
+                          nullable=False, index=True)
+    stage = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(20), default='running')
+    payload = db.Column(db.Text, default='{}')  # small JSON, e.g. relation count
+    error = db.Column(db.Text)
+
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    duration_seconds = db.Column(db.Float)
+
+    def to_dict(self):
+        data = json.loads(self.payload or '{}')
+        data.update({
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': self.duration_seconds,
+            'error': self.error
+        })
+        return data
+
+
+class Job(db.Model):
+    """Persistent background job for a processing result, with leasing and retries."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('processing_results.id'),
+                          unique=True, nullable=False)
+
+    status = db.Column(db.String(20), default='queued', index=True)
+    payload = db.Column(db.Text, default='{}')  # JSON with process_in_background kwargs
+
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    lease_owner = db.Column(db.String(64))
+    lease_expires_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    STATUSES = ['queued', 'running', 'completed', 'failed']
+
+
+class CacheEntry(db.Model):
+    """Cached model output keyed by a hash of the input text and model version."""
+    __tablename__ = 'result_cache'
+
+    key = db.Column(db.String(64), primary_key=True)  # sha256 hex
+    kind = db.Column(db.String(20), nullable=False)  # 'ner' or 'relations'
+    value = db.Column(db.Text, nullable=False)  # JSON
+    size_bytes = db.Column(db.Integer, nullable=False)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -1,12 +1,127 @@
 from navec import Navec
 from slovnet import NER
+from razdel import sentenize
+import bisect
 import re
+from array import array
+from registry import registry
 
+NER_MODEL_NAME = 'slovnet_ner_news_v1'
 navec_path = 'navec_news_v1_1B_250K_300d_100q.tar'
-navec = Navec.load(navec_path)
+ner_model_path = 'slovnet_ner_news_v1.tar'
 
-ner_model = NER.load('slovnet_ner_news_v1.tar')
-ner_model.navec(navec)
+# Версия формата спанов и правил дат: меняется вместе с ними, чтобы кэш
+# результатов NER не отдавал устаревшую разметку
+NER_OUTPUT_VERSION = 'spans-3'
+
+# Длинные тексты режутся на окна из целых предложений не длиннее этого
+NER_WINDOW_CHARS = 1000
+
+# Все форматы дат в одном выражении: текст просматривается за один проход,
+# вид даты определяется по имени сработавшей группы
+DATE_PATTERN = re.compile(
+    r'\b(?P<numeric>\d{1,2}[./\-]\d{1,2}[./\-]\d{4})\b'
+    r'|\b(?P<iso>\d{4}-\d{2}-\d{2})\b'
+    r'|\b(?P<year>\d{4})\s*(?:г\.?|год|года|году|годах)\b'
+    r'|\b(?:в\s+)?(?P<decade>\d{3}0)-[хxs]\s*(?:годах|годов|году|год|гг\.?)?\b'
+)
+
+# При пересечении спанов побеждает источник с меньшим значением
+SPAN_PRIORITY = {'ner': 0, 'date': 1}
+
+
+def get_ner_model():
+    """
+    Returns the shared Slovnet NER model with Navec embeddings,
+    loading it on first use.
+
+    Returns:
+        slovnet.NER: NER model ready for inference.
+    """
+    def loader():
+        navec = Navec.load(navec_path)
+        ner_model = NER.load(ner_model_path)
+        ner_model.navec(navec)
+        return ner_model
+
+    return registry.get(NER_MODEL_NAME, 'cpu', loader)
+
+
+# Дореволюционная орфография -> современная: посимвольная замена, ъ и Ъ удаляются.
+# Применяется цепочкой str.replace: для кириллицы это заметно быстрее str.translate
+TRANSLATION_TABLE = (
+    ('ѣ', 'е'),
+    ('Ѣ', 'Е'),
+    ('i', 'и'),
+    ('I', 'И'),
+    ('І', 'И'),
+    ('і', 'и'),
+    ('ѵ', 'и'),
+    ('Ѵ', 'И'),
+    ('ѳ', 'ф'),
+    ('Ѳ', 'Ф'),
+    ("ћ", 'e'),
+    ('y', 'ы'),  # возможно, неправильно
+)
+HARD_SIGNS = ('ъ', 'Ъ')
+
+# Участки, которые меняют длину текста: пробельные символы и твердые знаки
+_SHIFTING_RUN = re.compile(r'[\sъЪ]+')
+
+
+def _replace_letters(text: str) -> str:
+    """Applies the one-to-one letter replacements; keeps positions intact."""
+    for old, new in TRANSLATION_TABLE:
+        text = text.replace(old, new)
+    return text
+
+
+def _drop_hard_signs(text: str) -> str:
+    for sign in HARD_SIGNS:
+        text = text.replace(sign, '')
+    return text
+
+
+class OffsetMap:
+    """
+    Maps positions in translated text back to the original text.
+
+    Stored as anchors (translated_pos, original_pos); between two anchors
+    positions advance together, so the map stays small for large documents.
+
+    Example:
+        >>> translated, offsets = translate_with_offsets('Съ  Петромъ')
+        >>> translated
+        'С Петром'
+        >>> offsets.span_to_original(2, 8)
+        (4, 10)
+    """
+
+    def __init__(self):
+        self._translated = array('q')
+        self._original = array('q')
+
+    def add(self, translated_pos: int, original_pos: int) -> None:
+        """Adds an anchor; positions must be added in increasing order."""
+        if self._translated and self._translated[-1] == translated_pos:
+            self._original[-1] = original_pos
+            return
+        self._translated.append(translated_pos)
+        self._original.append(original_pos)
+
+    def to_original(self, pos: int) -> int:
+        """Returns the original position of the character at translated `pos`."""
+        index = bisect.bisect_right(self._translated, pos) - 1
+        if index < 0:
+            return pos
+        return self._original[index] + pos - self._translated[index]
+
+    def span_to_original(self, start: int, stop: int) -> tuple:
+        """Maps a [start, stop) span of the translated text to the original text."""
+        if stop <= start:
+            original = self.to_original(start)
+            return original, original
+        return self.to_original(start), self.to_original(stop - 1) + 1
 
 
 def translate_text(text: str) -> str:
@@ -22,36 +137,135 @@ def translate_text(text: str) -> str:
     Example:
         >>> translated = translate_text('Текст съ дореволюціонными буквами')
         >>> print(translated)
-        'Некоторый текст с дореволюционными буквами'
-    """
-    replacements = {
-        'ѣ': 'е',
-        'Ѣ': 'Е',
-        'i': 'и',
-        'I': 'И',
-        'І': 'И',
-        'і': 'и',
-        'ѵ': 'и',
-        'Ѵ': 'И',
-        'ѳ': 'ф',
-        'Ѳ': 'Ф',
-        "ћ": 'e',
-        'y': 'ы'  # возможно, неправильно
-    }
-
-    for old, new in replacements.items():
-        text = text.replace(old, new)
+        'Текст с дореволюционными буквами'
+    """
+    # str.split() без аргументов делит по тем же пробельным символам, что и \\s+
+    return ' '.join(_drop_hard_signs(_replace_letters(text)).split())
+
+
+def translate_with_offsets(text: str) -> tuple:
+    """
+    Translates text like `translate_text` and records where every character
+    of the result came from.
 
-    text = re.sub(r'ъ(\s|[.,;:!?—–\n\"\')\]])', r'\1', text)
-    text = re.sub(r'(\s|[.,;:!?—–\n\"\'(\[])ъ', r'\1', text)
+    Args:
+        text (str): Input text with pre-revolutionary characters.
+
+    Returns:
+        tuple: (translated text, OffsetMap to positions in `text`).
 
-    text = text.replace('ъ', '')
-    text = text.replace('Ъ', '')
+    Example:
+        >>> translated, offsets = translate_with_offsets('Иванъ въ Москвѣ')
+        >>> translated
+        'Иван в Москве'
+        >>> offsets.span_to_original(7, 13)
+        (9, 15)
+    """
+    offsets = OffsetMap()
+    translated = ''.join(translate_chunks([text], offsets))
+    return translated, offsets
 
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\n\s*\n', '\n\n', text)
 
-    return text.strip()
+def translate_chunks(chunks, offset_map: OffsetMap = None):
+    """
+    Translates a document given as an iterable of chunks, e.g. read from a
+    file piece by piece, without holding the whole text in memory.
+
+    Whitespace and hard signs at chunk boundaries are handled as if the
+    chunks were one string, so ''.join(translate_chunks(chunks)) equals
+    translate_text(''.join(chunks)).
+
+    Args:
+        chunks: Iterable of text chunks.
+        offset_map (OffsetMap): Optional map to fill with positions of the
+            translated text in the concatenated original.
+
+    Yields:
+        str: Translated pieces.
+
+    Example:
+        >>> with open('letter.txt', encoding='utf-8') as f:
+        ...     for piece in translate_chunks(iter(lambda: f.read(1 << 20), '')):
+        ...         out.write(piece)
+    """
+    if offset_map is None:
+        yield from _translate_chunks_fast(chunks)
+        return
+
+    pending_at = None  # позиция в оригинале пробела, ожидающего вывода
+    emitted = 0
+    base = 0
+    for chunk in chunks:
+        # Замены букв один к одному, так что позиции в chunk не меняются
+        chunk = _replace_letters(chunk)
+        pieces = []
+        pos = 0
+        for match in _SHIFTING_RUN.finditer(chunk):
+            if pos < match.start():
+                emitted = _emit(pieces, chunk[pos:match.start()], base + pos, pending_at, emitted, offset_map)
+                pending_at = None
+            run = match.group()
+            if pending_at is None and run.strip('ъЪ'):
+                pending_at = base + match.start() + len(run) - len(run.lstrip('ъЪ'))
+            pos = match.end()
+        if pos < len(chunk):
+            emitted = _emit(pieces, chunk[pos:], base + pos, pending_at, emitted, offset_map)
+            pending_at = None
+        base += len(chunk)
+        if pieces:
+            yield ''.join(pieces)
+
+
+def _emit(pieces, segment, original_pos, pending_at, emitted, offset_map):
+    """Appends a translated segment without whitespace or hard signs, after a pending space."""
+    if pending_at is not None and emitted:
+        offset_map.add(emitted, pending_at)
+        pieces.append(' ')
+        emitted += 1
+    offset_map.add(emitted, original_pos)
+    pieces.append(segment)
+    return emitted + len(segment)
+
+
+def _translate_chunks_fast(chunks):
+    """`translate_chunks` without offsets: the `translate_text` passes per chunk."""
+    started = False
+    pending_space = False
+    for chunk in chunks:
+        chunk = _drop_hard_signs(_replace_letters(chunk))
+        if not chunk:
+            continue
+        pending_space = pending_space or chunk[0].isspace()
+        piece = ' '.join(chunk.split())
+        if piece:
+            if pending_space and started:
+                piece = ' ' + piece
+            started = True
+            yield piece
+        pending_space = chunk[-1].isspace()
+
+
+def iter_dates(text: str):
+    """
+    Scans a text once for dates of every supported format.
+
+    Matches never overlap: at each position the first matching format wins
+    (numeric, ISO, year, decade), so "15.03.1990 г." is one numeric date
+    rather than a date plus an overlapping year.
+
+    Args:
+        text (str): Input text to search for dates.
+
+    Yields:
+        tuple: (start_pos, end_pos, kind), kind being 'numeric', 'iso',
+        'year' or 'decade'.
+
+    Example:
+        >>> list(iter_dates('В 1995 году, 2001-05-12'))
+        [(2, 11, 'year'), (13, 23, 'iso')]
+    """
+    for match in DATE_PATTERN.finditer(text):
+        yield match.start(), match.end(), match.lastgroup
 
 
 def find_dates(text: str) -> list:
@@ -62,31 +276,125 @@ def find_dates(text: str) -> list:
         text (str): Input text to search for dates.
 
     Returns:
-        list: List of tuples (start_pos, end_pos, 'date') for each found date.
+        list: List of tuples (start_pos, end_pos, 'date') for each found date,
+        sorted by position.
 
     Example:
         >>> dates = find_dates('Я родился 15.03.1990.')
         >>> print(dates)
-        [(11, 21, 'date')]
+        [(10, 20, 'date')]
+    """
+    return [(start, end, 'date') for start, end, _ in iter_dates(text)]
+
+
+def merge_spans(spans: list) -> list:
+    """
+    Resolves overlapping spans so that every character is marked at most once.
+
+    Spans are taken greedily by priority: the source first (`SPAN_PRIORITY`,
+    model entities before dates), then the longer span, then the earlier
+    one. A span overlapping an already taken span is dropped, so a date
+    inside an organization name stays part of the organization.
+
+    Args:
+        spans (list): Span dicts with 'start', 'stop' and 'source'.
+
+    Returns:
+        list: Non-overlapping spans sorted by start.
+
+    Example:
+        >>> merge_spans([{'start': 0, 'stop': 20, 'type': 'org', 'source': 'ner'},
+        ...              {'start': 6, 'stop': 15, 'type': 'date', 'source': 'date'}])
+        [{'start': 0, 'stop': 20, 'type': 'org', 'source': 'ner'}]
+    """
+    kept = []
+    cluster, cluster_stop = [], None
+    for span in sorted(spans, key=lambda span: span['start']):
+        # Кластер - цепочка пересекающихся спанов; конфликты решаются внутри него
+        if cluster and span['start'] >= cluster_stop:
+            kept.extend(_resolve_cluster(cluster))
+            cluster = []
+        if not cluster:
+            cluster_stop = span['stop']
+        cluster.append(span)
+        cluster_stop = max(cluster_stop, span['stop'])
+    kept.extend(_resolve_cluster(cluster))
+    return kept
+
+
+def _resolve_cluster(cluster: list) -> list:
+    """Greedy priority selection within a group of overlapping spans."""
+    if len(cluster) < 2:
+        return cluster
+    ranked = sorted(cluster, key=lambda span: (
+        SPAN_PRIORITY.get(span['source'], len(SPAN_PRIORITY)),
+        span['start'] - span['stop'],
+        span['start']))
+    taken = []
+    for span in ranked:
+        if all(span['stop'] <= other['start'] or other['stop'] <= span['start'] for other in taken):
+            taken.append(span)
+    return sorted(taken, key=lambda span: span['start'])
+
+
+def entity_spans(text: str, ner_spans: list) -> list:
+    """
+    Combines model entities with the dates found in a text.
+
+    Args:
+        text (str): Text the spans refer to.
+        ner_spans (list): (start, stop, type) tuples produced by the NER model.
+
+    Returns:
+        list: Non-overlapping span dicts {'start', 'stop', 'type', 'source'}
+        sorted by start; source is 'ner' for model entities and 'date' for
+        regex dates. Overlaps are resolved by `merge_spans`.
+
+    Example:
+        >>> entity_spans('Иван, 1990 г.', [(0, 4, 'per')])
+        [{'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'},
+         {'start': 6, 'stop': 13, 'type': 'date', 'source': 'date'}]
+    """
+    spans = [{'start': start, 'stop': stop, 'type': label, 'source': 'ner'}
+             for start, stop, label in ner_spans]
+    spans += [{'start': start, 'stop': stop, 'type': label, 'source': 'date'}
+              for start, stop, label in find_dates(text)]
+    return merge_spans(spans)
+
+
+def render_entities(text: str, spans: list) -> str:
     """
-    date_pattern = r'\b(\d{1,2}[./\-]\d{1,2}[./\-]\d{4})\b'
-    iso_pattern = r'\b(\d{4}-\d{2}-\d{2})\b'
-    year_pattern = r'\b(\d{4})\s*(?:г\.?|год|года|году|годах)\b'
-    year_decade_pattern = (r'\b(?:в\s+)?(\d{3}0)-[хxs]\s*'
-                           r'(?:годах|годов|году|год|гг\.?)?\b')
+    Renders entity spans as HTML mark tags.
 
-    dates = []
-    for match in re.finditer(date_pattern, text):
-        dates.append((match.start(), match.end(), 'date'))
-    for match in re.finditer(iso_pattern, text):
-        dates.append((match.start(), match.end(), 'date'))
-    for match in re.finditer(year_pattern, text):
-        dates.append((match.start(), match.end(), 'date'))
-    for match in re.finditer(year_decade_pattern, text):
-        dates.append((match.start(), match.end(), 'date'))
+    Args:
+        text (str): Text the spans refer to.
+        spans (list): Span dicts as returned by `entity_spans`.
+
+    Returns:
+        str: Text with HTML mark tags for entities.
 
-    dates.sort(key=lambda x: x[0])
-    return dates
+    Example:
+        >>> render_entities('Привет Иван', [{'start': 7, 'stop': 11, 'type': 'per', 'source': 'ner'}])
+        'Привет <mark class="ner-per">Иван</mark>'
+    """
+    tokens = []
+    last = 0
+    for span in spans:
+        start, stop = span['start'], span['stop']
+        if last < start:
+            tokens.append(text[last:start])
+        entity_text = text[start:stop]
+        tokens.append(f'<mark class="ner-{span["type"]}">{entity_text}</mark>')
+        last = stop
+    if last < len(text):
+        tokens.append(text[last:])
+    return ''.join(tokens)
+
+
+def _markup_spans(markup, offset: int = 0) -> list:
+    """(start, stop, type) tuples of a Slovnet markup, shifted by `offset`."""
+    return [(offset + span.start, offset + span.stop, span.type.lower())
+            for span in markup.spans]
 
 
 def annotate_text(markup) -> str:
@@ -104,25 +412,123 @@ def annotate_text(markup) -> str:
         >>> print(annotated)
         'Привет <mark class="ner-per">Иван</mark>'
     """
-    ner_spans = [
-        (span.start, span.stop, span.type.lower()) for span in markup.spans]
+    return render_entities(markup.text, entity_spans(markup.text, _markup_spans(markup)))
 
-    dates = find_dates(markup.text)
 
-    all_spans = ner_spans + dates
-    all_spans.sort(key=lambda x: x[0])
+def sentence_windows(text: str, max_chars: int = NER_WINDOW_CHARS) -> list:
+    """
+    Splits a text into windows of whole sentences.
 
-    tokens = []
-    last = 0
-    for start, stop, label in all_spans:
-        if last < start:
-            tokens.append(markup.text[last:start])
-        entity_text = markup.text[start:stop]
-        tokens.append(f'<mark class="ner-{label}">{entity_text}</mark>')
-        last = stop
-    if last < len(markup.text):
-        tokens.append(markup.text[last:])
-    return ''.join(tokens)
+    Consecutive sentences are packed into one window while it stays within
+    `max_chars`; a single longer sentence becomes a window of its own.
+
+    Args:
+        text (str): Input text.
+        max_chars (int): Maximum window length.
+
+    Returns:
+        list: (offset, window_text) tuples; offsets point into `text`.
+
+    Example:
+        >>> sentence_windows('Иван живет в Москве. Он врач.', max_chars=20)
+        [(0, 'Иван живет в Москве.'), (21, 'Он врач.')]
+    """
+    if len(text) <= max_chars:
+        return [(0, text)]
+
+    windows = []
+    start = stop = None
+    for sentence in sentenize(text):
+        if start is not None and sentence.stop - start > max_chars:
+            windows.append((start, text[start:stop]))
+            start = None
+        if start is None:
+            start = sentence.start
+        stop = sentence.stop
+    if start is not None:
+        windows.append((start, text[start:stop]))
+    return windows
+
+
+def perform_ner_spans_batch(texts: list, model=None, window_chars: int = NER_WINDOW_CHARS) -> list:
+    """
+    Performs NER on many texts at once and returns entity spans for each.
+
+    Every text is split into sentence windows, all windows of all texts go
+    through Slovnet's batched `map`, and the spans are shifted back to
+    offsets in the original text. Dates are searched in the whole text, so
+    the result is the same as calling `perform_ner_spans` on each text.
+
+    Args:
+        texts (list): Input texts.
+        model: Slovnet NER model; defaults to the shared model. Its
+            `batch_size` controls how many windows are inferred together.
+        window_chars (int): Maximum window length in characters.
+
+    Returns:
+        list: One list of span dicts (see `entity_spans`) per input text.
+    """
+    model = model or get_ner_model()
+
+    owners, offsets, chunks = [], [], []
+    for index, text in enumerate(texts):
+        for offset, chunk in sentence_windows(text, window_chars):
+            owners.append(index)
+            offsets.append(offset)
+            chunks.append(chunk)
+
+    ner_spans = [[] for _ in texts]
+    for owner, offset, markup in zip(owners, offsets, model.map(chunks)):
+        ner_spans[owner].extend(_markup_spans(markup, offset))
+
+    return [entity_spans(text, spans) for text, spans in zip(texts, ner_spans)]
+
+
+def perform_ner_batch(texts: list, model=None, window_chars: int = NER_WINDOW_CHARS) -> list:
+    """
+    Performs NER on many texts at once and returns annotated HTML for each.
+
+    Same as `perform_ner_spans_batch` followed by `render_entities`; the
+    output matches calling `perform_ner` on each text.
+
+    Args:
+        texts (list): Input texts.
+        model: Slovnet NER model; defaults to the shared model.
+        window_chars (int): Maximum window length in characters.
+
+    Returns:
+        list: Annotated HTML, one string per input text.
+
+    Example:
+        >>> perform_ner_batch(['Иван живет в Москве.', 'Пётр в Туле.'])
+        ['<mark class="ner-per">Иван</mark> живет в <mark class="ner-loc">Москве</mark>.',
+         '<mark class="ner-per">Пётр</mark> в <mark class="ner-loc">Туле</mark>.']
+    """
+    spans = perform_ner_spans_batch(texts, model, window_chars)
+    return [render_entities(text, text_spans) for text, text_spans in zip(texts, spans)]
+
+
+def perform_ner_spans(text: str) -> list:
+    """
+    Performs NER on the input text and returns entity spans.
+
+    The text goes through `perform_ner_spans_batch`, i.e. it is split into
+    sentence windows, so the spans match the batched path exactly.
+
+    Args:
+        text (str): Input text to analyze.
+
+    Returns:
+        list: Span dicts {'start', 'stop', 'type', 'source'}; render them
+        with `render_entities` when HTML is needed.
+
+    Example:
+        >>> perform_ner_spans('Иван живет в Москве.')
+        [{'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'},
+         {'start': 13, 'stop': 19, 'type': 'loc', 'source': 'ner'}]
+    """
+    # Slovnet размечает с учетом контекста: другой путь дал бы другие спаны
+    return perform_ner_spans_batch([text])[0]
 
 
 def perform_ner(text: str) -> str:
@@ -141,5 +547,4 @@ def perform_ner(text: str) -> str:
         '<mark class="ner-per">Иван</mark> живет в
         <mark class="ner-loc">Москве</mark>.'
     """
-    markup = ner_model(text)
-    return annotate_text(markup)
+    return perform_ner_batch([text])[0]
@@ -1,6 +1,27 @@
-import easyocr
+from registry import registry, default_device
 
-ocr_reader = easyocr.Reader(['ru'], gpu=True)
+EASYOCR_MODEL_NAME = 'easyocr-ru'
+
+
+def get_reader(device: str = None):
+    """
+    Returns the shared EasyOCR reader for Russian, loading it on first use.
+
+    Args:
+        device (str): Device to run on ('cpu' or 'cuda'). Defaults to GPU
+            when available.
+
+    Returns:
+        easyocr.Reader: Reader instance shared by OCR and HTR.
+    """
+    device = device or default_device()
+
+    def loader():
+        # Imported lazily: easyocr pulls in torch, which slows down app startup
+        import easyocr
+        return easyocr.Reader(['ru'], gpu=device == 'cuda')
+
+    return registry.get(EASYOCR_MODEL_NAME, device, loader)
 
 
 def perform_ocr(image_path: str) -> str:
@@ -18,6 +39,6 @@ def perform_ocr(image_path: str) -> str:
         >>> print(text)
         'Hello world'
     """
-    result = ocr_reader.readtext(image_path)
+    result = get_reader().readtext(image_path)
     text = " ".join([item[1] for item in result])
     return text
@@ -0,0 +1,139 @@
+"""
+OCR Cascade Module
+
+This module implements the `auto` OCR mode: Tesseract reads the page first,
+and only the lines it is unsure about are re-read with EasyOCR. Tesseract is
+much cheaper on clean print, EasyOCR copes better with degraded scans, so
+most pages never touch the EasyOCR model.
+
+When most lines of a page are low-confidence, the whole page goes to EasyOCR
+in one call instead of line by line. Escalation counters are kept in
+`cascade_stats`.
+"""
+
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from ocr import get_reader
+from tesseract_ocr import recognize_tesseract_lines
+
+# Строка уходит в EasyOCR, если средняя уверенность Tesseract ниже порога (0-100)
+MIN_LINE_CONFIDENCE = 70.0
+# Доля неуверенных строк, с которой в EasyOCR уходит вся страница
+PAGE_ESCALATION_SHARE = 0.5
+# Поля вокруг строки при вырезании для EasyOCR, пиксели
+LINE_PADDING = 4
+
+
+class CascadeStats:
+    """Thread-safe counters of pages and lines escalated to EasyOCR."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pages = 0
+            self._pages_escalated = 0
+            self._pages_whole = 0
+            self._lines = 0
+            self._lines_escalated = 0
+            self._seconds = 0.0
+
+    def record(self, lines: int, lines_escalated: int, whole_page: bool, seconds: float) -> None:
+        with self._lock:
+            self._pages += 1
+            self._pages_escalated += int(whole_page or lines_escalated > 0)
+            self._pages_whole += int(whole_page)
+            self._lines += lines
+            self._lines_escalated += lines_escalated
+            self._seconds += seconds
+
+    def stats(self) -> dict:
+        """Returns page and line counts, escalated shares and average latency."""
+        with self._lock:
+            return {
+                'pages': self._pages,
+                # Страницы, где EasyOCR читал всю страницу или отдельные строки
+                'pages_escalated': self._pages_escalated,
+                'page_escalation_rate': self._pages_escalated / self._pages if self._pages else None,
+                # Из них страницы, целиком прочитанные EasyOCR
+                'pages_whole': self._pages_whole,
+                'lines': self._lines,
+                'lines_escalated': self._lines_escalated,
+                'line_escalation_rate': self._lines_escalated / self._lines if self._lines else None,
+                'avg_seconds': self._seconds / self._pages if self._pages else None,
+            }
+
+
+cascade_stats = CascadeStats()
+
+
+def perform_auto_ocr(image_path: str,
+                     min_confidence: float = MIN_LINE_CONFIDENCE,
+                     page_share: float = PAGE_ESCALATION_SHARE,
+                     lang: str = 'rus') -> str:
+    """
+    Performs OCR with Tesseract, re-reading low-confidence lines with EasyOCR.
+
+    Args:
+        image_path (str): Path to the input image file.
+        min_confidence (float): Lines with a lower mean Tesseract word
+            confidence (0-100) are re-read with EasyOCR.
+        page_share (float): If at least this share of lines is below
+            `min_confidence` (or Tesseract finds no text), the whole page is
+            read with EasyOCR instead.
+        lang (str): Language code for Tesseract.
+
+    Returns:
+        str: Lines in Tesseract's reading order joined by newlines, with a
+        blank line between text blocks; or the EasyOCR text of the page if it
+        was escalated as a whole.
+
+    Example:
+        >>> text = perform_auto_ocr('path/to/page.jpg')
+        >>> cascade_stats.stats()['line_escalation_rate']
+        0.1
+    """
+    start = time.perf_counter()
+    image = Image.open(image_path).convert('RGB')
+    lines = recognize_tesseract_lines(image, lang=lang)
+    uncertain = [line for line in lines if line['confidence'] < min_confidence]
+
+    if not lines or len(uncertain) >= page_share * len(lines):
+        # То же, что perform_ocr
+        text = ' '.join(item[1] for item in get_reader().readtext(image_path))
+        cascade_stats.record(len(lines), len(lines), True, time.perf_counter() - start)
+        return text
+
+    reader = get_reader() if uncertain else None
+    for line in uncertain:
+        text = _read_line(reader, image, line['box'])
+        # Пустой ответ EasyOCR не лучше строки Tesseract
+        if text:
+            line['text'] = text
+
+    cascade_stats.record(len(lines), len(uncertain), False, time.perf_counter() - start)
+    return _join_lines(lines)
+
+
+def _read_line(reader, image: Image.Image, box: tuple) -> str:
+    """Reads one line crop with EasyOCR, fragments ordered left to right."""
+    left, top, right, bottom = box
+    crop = image.crop((max(0, left - LINE_PADDING), max(0, top - LINE_PADDING),
+                       min(image.width, right + LINE_PADDING), min(image.height, bottom + LINE_PADDING)))
+    result = reader.readtext(np.asarray(crop.convert('L')))
+    return ' '.join(item[1] for item in sorted(result, key=lambda item: item[0][0][0]))
+
+
+def _join_lines(lines: list) -> str:
+    parts = []
+    for index, line in enumerate(lines):
+        if index and line['block'] != lines[index - 1]['block']:
+            parts.append('')
+        parts.append(line['text'])
+    return '\n'.join(parts)
@@ -0,0 +1,171 @@
+"""
+Stage Pipeline Module
+
+This module runs documents through processing stages
+(recognize -> translate -> NER -> relations) where every stage has its own
+worker pool and input queue. While document N is in relation extraction,
+document N+1 can already be recognized, so OCR hardware and the LLM are
+busy at the same time.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Stage:
+    """A named stage with a worker pool, an input queue and metrics."""
+
+    def __init__(self, name: str, func, workers: int):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.active = 0
+
+    def record(self, waited: float, busy: float, ok: bool):
+        with self.lock:
+            self.active -= 1
+            self.wait_seconds += waited
+            self.busy_seconds += busy
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def stats(self, elapsed: float = None) -> dict:
+        with self.lock:
+            done = self.processed + self.failed
+            avg_seconds = self.busy_seconds / done if done else None
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'queued': self.queue.qsize(),
+                'active': self.active,
+                'processed': self.processed,
+                'failed': self.failed,
+                'avg_seconds': avg_seconds,
+                'avg_wait_seconds': self.wait_seconds / done if done else None,
+                # Documents per second the pool can sustain at full load
+                'capacity_per_sec': self.workers / avg_seconds if avg_seconds else None,
+                # Share of pool time spent working since the pipeline started
+                'utilization': self.busy_seconds / (elapsed * self.workers) if elapsed else None,
+            }
+
+
+class Pipeline:
+    """
+    Runs items through a fixed sequence of stages, each with its own pool.
+
+    A stage function receives the item (a dict) and updates it in place.
+    If it raises, the item skips the remaining stages and the error is
+    reported to the item's callback.
+
+    Example:
+        >>> pipeline = Pipeline([('recognizing', recognize, 2),
+        ...                      ('relations', relations, 1)])
+        >>> pipeline.run({'result_id': 1})
+    """
+
+    def __init__(self, stages: list):
+        """
+        Args:
+            stages (list): (name, func, workers) tuples in execution order.
+        """
+        self._stages = [_Stage(name, func, workers) for name, func, workers in stages]
+        self._lock = threading.Lock()
+        self._started_at = None
+
+    def submit(self, item: dict, callback) -> None:
+        """
+        Queues an item at the first stage.
+
+        Args:
+            item (dict): Mutable per-document context.
+            callback (callable): Called as callback(item, error) after the
+                last stage, with error=None on success.
+        """
+        self._ensure_workers()
+        self._enqueue(0, item, callback)
+
+    def run(self, item: dict) -> dict:
+        """
+        Submits an item and blocks until it leaves the pipeline.
+
+        Returns:
+            dict: The processed item.
+
+        Raises:
+            Exception: The error raised by the failing stage.
+        """
+        finished = threading.Event()
+        outcome = {}
+
+        def callback(_, error):
+            outcome['error'] = error
+            finished.set()
+
+        self.submit(item, callback)
+        finished.wait()
+        if outcome['error'] is not None:
+            raise outcome['error']
+        return item
+
+    def stats(self) -> list:
+        """
+        Returns per-stage throughput metrics for sizing worker pools.
+
+        Returns:
+            list: One dict per stage with queue depth, processed count,
+            average service and wait time, capacity and utilization.
+        """
+        elapsed = time.perf_counter() - self._started_at if self._started_at else None
+        return [stage.stats(elapsed) for stage in self._stages]
+
+    def _enqueue(self, index: int, item: dict, callback):
+        self._stages[index].queue.put((time.perf_counter(), item, callback))
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.perf_counter()
+            for index, stage in enumerate(self._stages):
+                stage.threads = [t for t in stage.threads if t.is_alive()]
+                while len(stage.threads) < stage.workers:
+                    thread = threading.Thread(
+                        target=self._worker, args=(index,), daemon=True,
+                        name=f'stage-{stage.name}-{len(stage.threads)}')
+                    thread.start()
+                    stage.threads.append(thread)
+
+    def _worker(self, index: int):
+        stage = self._stages[index]
+        while True:
+            queued_at, item, callback = stage.queue.get()
+            with stage.lock:
+                stage.active += 1
+            start = time.perf_counter()
+            error = None
+            try:
+                stage.func(item)
+            except Exception as e:
+                logger.exception(f"Stage {stage.name} failed")
+                error = e
+            stage.record(start - queued_at, time.perf_counter() - start, error is None)
+
+            if error is None and index + 1 < len(self._stages):
+                self._enqueue(index + 1, item, callback)
+                continue
+            try:
+                callback(item, error)
+            except Exception:
+                logger.exception("Pipeline callback failed")
@@ -0,0 +1,256 @@
+"""
+Model Registry Module
+
+This module provides a process-wide, thread-safe registry for heavy models
+(EasyOCR, TrOCR, Slovnet, the relation LLM). Each model is loaded once per
+(name, device) pair and then shared by every caller in the process.
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Точность весов на CPU: float32 (как есть), bfloat16 или int8 (динамическое
+# квантование линейных слоёв)
+CPU_PRECISIONS = ('float32', 'bfloat16', 'int8')
+
+
+def _current_rss() -> int:
+    """
+    Returns the resident set size of the current process in bytes.
+
+    Returns:
+        int: RSS in bytes, or 0 if it cannot be determined on this platform.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def default_device() -> str:
+    """
+    Returns the default torch device name for model inference.
+
+    Returns:
+        str: 'cuda' if a GPU is available, otherwise 'cpu'.
+    """
+    import torch
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+@functools.lru_cache(maxsize=None)
+def cpu_supports_bf16() -> bool:
+    """
+    Checks whether the CPU has native bfloat16 instructions.
+
+    Without AVX512-BF16 or AMX the bfloat16 matmuls are emulated and slower
+    than float32.
+
+    Returns:
+        bool: True if /proc/cpuinfo lists avx512_bf16 or amx_bf16.
+    """
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            flags = set(cpuinfo.read().split())
+    except OSError:
+        return False
+    return bool(flags & {'avx512_bf16', 'amx_bf16'})
+
+
+def effective_cpu_precision(precision: str) -> str:
+    """
+    Returns the precision `apply_cpu_precision` actually uses on this CPU.
+
+    Args:
+        precision (str): One of `CPU_PRECISIONS`.
+
+    Returns:
+        str: `precision`, or 'float32' for bfloat16 on a CPU without native
+        bfloat16 support.
+
+    Raises:
+        ValueError: If the precision is unknown.
+    """
+    if precision not in CPU_PRECISIONS:
+        raise ValueError(f"Unknown CPU precision: {precision}")
+    if precision == 'bfloat16' and not cpu_supports_bf16():
+        return 'float32'
+    return precision
+
+
+def apply_cpu_precision(model, precision: str):
+    """
+    Converts a float32 torch model for CPU inference at the given precision.
+
+    Args:
+        model: torch.nn.Module on the CPU.
+        precision (str): One of `CPU_PRECISIONS`. bfloat16 falls back to
+            float32 when the CPU lacks native support.
+
+    Returns:
+        The converted model (a new module for int8).
+
+    Raises:
+        ValueError: If the precision is unknown.
+    """
+    applied = effective_cpu_precision(precision)
+    if applied != precision:
+        logger.warning("CPU has no native bfloat16 support, keeping float32")
+    if applied == 'float32':
+        return model
+
+    import torch
+    if applied == 'bfloat16':
+        return model.to(torch.bfloat16)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ModelRegistry:
+    """
+    Thread-safe cache of loaded models keyed by (name, device).
+
+    Loading is serialized per key, so two threads asking for the same model
+    wait for a single load, while different models can load concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._models = {}
+        self._stats = {}
+        self._precisions = {}
+        self._precision_models = set()
+
+    def get(self, name: str, device: str, loader):
+        """
+        Returns the model registered under (name, device), loading it if needed.
+
+        Args:
+            name (str): Model name, e.g. a HuggingFace model id.
+            device (str): Device the model is placed on ('cpu', 'cuda').
+            loader (callable): Zero-argument function that loads the model.
+
+        Returns:
+            The object returned by `loader` on the first call.
+
+        Example:
+            >>> reader = registry.get('easyocr-ru', 'cpu',
+            ...                       lambda: easyocr.Reader(['ru'], gpu=False))
+        """
+        key = (name, device)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            logger.info(f"Loading model {name} on {device}...")
+            rss_before = _current_rss()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            rss_bytes = max(_current_rss() - rss_before, 0)
+
+            self._models[key] = model
+            self._stats[key] = {
+                'name': name,
+                'device': device,
+                'load_seconds': load_seconds,
+                'rss_bytes': rss_bytes,
+                'precision': effective_cpu_precision(self.precision(name)) if device == 'cpu' else None,
+            }
+            logger.info(f"Model {name} loaded on {device} in {load_seconds:.2f}s "
+                        f"(+{rss_bytes / 2 ** 20:.1f} MiB RSS)")
+            return model
+
+    def allow_precision(self, name: str) -> None:
+        """
+        Marks a model as a torch model whose loader applies `precision`.
+
+        Args:
+            name (str): Model name.
+        """
+        self._precision_models.add(name)
+
+    def set_precision(self, name: str, precision: str) -> None:
+        """
+        Sets the CPU inference precision loaders use for a model.
+
+        Takes effect on the next load; call before the model is first used.
+
+        Args:
+            name (str): Model name, registered with `allow_precision`.
+            precision (str): One of `CPU_PRECISIONS`.
+
+        Raises:
+            ValueError: If the precision is unknown or the model's loader
+                does not support a precision setting.
+        """
+        if precision not in CPU_PRECISIONS:
+            raise ValueError(f"Unknown CPU precision: {precision}")
+        if name not in self._precision_models:
+            raise ValueError(f"Model {name} does not support a CPU precision setting")
+        self._precisions[name] = precision
+
+    def precision(self, name: str) -> str:
+        """Returns the configured CPU precision of a model (float32 by default)."""
+        return self._precisions.get(name, 'float32')
+
+    def is_loaded(self, name: str, device: str = None) -> bool:
+        """
+        Checks whether a model is resident in the registry.
+
+        Args:
+            name (str): Model name.
+            device (str): Device name. If None, any device matches.
+
+        Returns:
+            bool: True if the model has been loaded.
+        """
+        if device is not None:
+            return (name, device) in self._models
+        return any(key[0] == name for key in list(self._models))
+
+    def stats(self) -> list:
+        """
+        Returns load statistics for every resident model.
+
+        Returns:
+            list: Dicts with name, device, load_seconds, rss_bytes and the
+            CPU precision actually applied.
+        """
+        return [dict(entry) for entry in list(self._stats.values())]
+
+    def unload(self, name: str, device: str) -> None:
+        """
+        Drops a model from the registry so the next `get` reloads it.
+
+        Args:
+            name (str): Model name.
+            device (str): Device name.
+        """
+        key = (name, device)
+        with self._lock:
+            self._models.pop(key, None)
+            self._stats.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops all models from the registry."""
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+
+
+registry = ModelRegistry()
@@ -0,0 +1,171 @@
+"""
+Rule-Based Relations Module
+
+This module extracts relations from template-like archival records
+(metric-book entries: births, baptisms, marriages, deaths, family ties)
+without the LLM. Persons and places come from the NER spans, dates from
+`find_dates`; a small pattern library of trigger words links them within a
+sentence into the same (entity, relation, entity) tuples the LLM returns.
+
+Every result comes with a coverage score, the share of person, place and
+date spans used by some relation, so callers can fall back to the LLM for
+texts the templates do not describe.
+"""
+
+import re
+
+from razdel import sentenize
+
+from relations import merge_relations
+
+# Типы спанов, которые правила связывают отношениями
+RELEVANT_TYPES = ('per', 'loc', 'date')
+
+# Событие: триггер и отношения субъекта с первой датой/местом рядом с ним
+EVENT_RULES = (
+    (re.compile(r'\b(?:родил(?:ся|ась|ись)|рожд[её]н[аы]?|рождения)\b', re.IGNORECASE),
+     {'date': 'дата рождения', 'loc': 'место рождения'}),
+    (re.compile(r'\b(?:о?крещ[её]н[аы]?|крестил(?:ся|ась|ись|а|и)?)\b', re.IGNORECASE),
+     {'date': 'дата крещения', 'loc': 'место крещения'}),
+    (re.compile(r'\b(?:венчал(?:ся|ась|ись)|обвенчан[аы]?|вступил[аи]? в брак)\b', re.IGNORECASE),
+     {'date': 'дата брака', 'loc': 'место брака'}),
+    (re.compile(r'\b(?:умер(?:ла|ли)?|скончал(?:ся|ась|ись)|погиб(?:ла|ли)?)\b', re.IGNORECASE),
+     {'date': 'дата смерти', 'loc': 'место смерти'}),
+    (re.compile(r'\b(?:проживал[аи]?|проживает|жил[аи]?)\b', re.IGNORECASE),
+     {'loc': 'место жительства'}),
+)
+
+# Родство: триггер перед именем родственника и вид отношения
+KIN_RULES = (
+    (re.compile(r'\b(?:отец|отца|мать|матери)\b', re.IGNORECASE), 'parent'),
+    (re.compile(r'\b(?:сын|сына|дочь|дочери)\b', re.IGNORECASE), 'child'),
+    (re.compile(r'\b(?:жена|жены|супруга|супруги|муж|мужа|супруг|женат на|замужем за|в браке с)\b',
+                re.IGNORECASE), 'spouse'),
+    (re.compile(r'\b(?:брат|брата)\b', re.IGNORECASE), 'брат'),
+    (re.compile(r'\b(?:сестра|сестры)\b', re.IGNORECASE), 'сестра'),
+    (re.compile(r'\b(?:крестил[аи]?|восприемник(?:ом)?|восприемница|восприемницей|кр[её]стн(?:ый|ая|ым|ой))\b',
+                re.IGNORECASE), 'godparent'),
+)
+
+
+def extract_rule_relations(text: str, spans: list) -> tuple:
+    """
+    Extracts relations with the pattern library.
+
+    Sentences are handled one at a time. Kinship triggers link the person
+    named right after them to an anchor: the last other person before the
+    trigger, or the current subject of the document. Event triggers link
+    their person to the nearest date and place: an entity belongs to the
+    closest trigger before it, or to a trigger directly after it
+    ("1845 года рождения").
+
+    Args:
+        text (str): Text the spans refer to.
+        spans (list): Span dicts {'start', 'stop', 'type', ...} as returned
+            by `ner.perform_ner_spans` (persons, places and dates).
+
+    Returns:
+        tuple: (relations, coverage); relations are de-duplicated
+        (entity1, relation, entity2) tuples, coverage is the share of person,
+        place and date spans used by at least one relation (1.0 if the text
+        has none).
+
+    Example:
+        >>> text = 'Иван Смирнов родился 15.03.1890 в Москве.'
+        >>> spans = [{'start': 0, 'stop': 12, 'type': 'per'}, {'start': 21, 'stop': 31, 'type': 'date'},
+        ...          {'start': 34, 'stop': 40, 'type': 'loc'}]
+        >>> extract_rule_relations(text, spans)
+        ([('Иван Смирнов', 'дата рождения', '15.03.1890'), ('Иван Смирнов', 'место рождения', 'Москве')], 1.0)
+    """
+    entities = sorted((span['start'], span['stop'], span['type']) for span in spans
+                      if span['type'] in RELEVANT_TYPES)
+    found = []
+    used = set()
+    subject = None
+
+    def add(first, relation, second):
+        found.append((text[first[0]:first[1]], relation, text[second[0]:second[1]]))
+        used.update((first[:2], second[:2]))
+
+    for sentence in sentenize(text):
+        inside = [entity for entity in entities
+                  if entity[0] >= sentence.start and entity[1] <= sentence.stop]
+        persons = [entity for entity in inside if entity[2] == 'per']
+        if subject is None and persons:
+            subject = persons[0]
+
+        # Родственники, названные в предложении, не бывают субъектом событий
+        relatives = set()
+        kin = sorted((match.start(), match.end(), kind) for pattern, kind in KIN_RULES
+                     for match in pattern.finditer(text, sentence.start, sentence.stop))
+        for start, stop, kind in kin:
+            relative = _first_after(persons, stop)
+            if relative is None:
+                continue
+            before = _last_before([person for person in persons if person not in relatives], start)
+            anchor = before or subject
+            if anchor is None or anchor == relative:
+                continue
+            relatives.add(relative)
+            if kind == 'parent':
+                add(relative, 'родитель', anchor)
+            elif kind == 'child':
+                # "Иван, сын Петра" - ребёнок стоит прямо перед триггером
+                if before and not text[before[1]:start].strip(' ,—–-'):
+                    add(relative, 'родитель', before)
+                else:
+                    add(anchor, 'родитель', relative)
+            elif kind == 'spouse':
+                add(relative, 'супруг', anchor)
+            elif kind == 'godparent':
+                add(relative, 'крестил', anchor)
+            else:
+                add(relative, kind, anchor)
+
+        principals = [person for person in persons if person not in relatives]
+        triggers = sorted((match.start(), match.end(), relations) for pattern, relations in EVENT_RULES
+                          for match in pattern.finditer(text, sentence.start, sentence.stop))
+        people = []
+        for start, stop, _ in triggers:
+            person = _last_before(principals, start) or _first_after(principals, stop) or subject
+            people.append(person)
+            if person is not None:
+                subject = person
+
+        taken = set()
+        for entity in inside:
+            if entity[2] == 'per':
+                continue
+            index = _owner(text, triggers, entity)
+            if index is None or people[index] is None or (index, entity[2]) in taken:
+                continue
+            relation = triggers[index][2].get(entity[2])
+            if relation:
+                taken.add((index, entity[2]))
+                add(people[index], relation, entity)
+
+    relevant = {entity[:2] for entity in entities}
+    coverage = len(used & relevant) / len(relevant) if relevant else 1.0
+    return merge_relations([found]), coverage
+
+
+def _owner(text: str, triggers: list, entity: tuple):
+    """Index of the event trigger a date or place belongs to, or None."""
+    following = next((index for index, trigger in enumerate(triggers) if trigger[0] >= entity[1]), None)
+    if following is not None and not text[entity[1]:triggers[following][0]].strip():
+        return following
+    preceding = [index for index, trigger in enumerate(triggers) if trigger[1] <= entity[0]]
+    if preceding:
+        return preceding[-1]
+    return following
+
+
+def _last_before(entities: list, position: int):
+    """Last entity ending at or before `position`, or None."""
+    before = [entity for entity in entities if entity[1] <= position]
+    return before[-1] if before else None
+
+
+def _first_after(entities: list, position: int):
+    """First entity starting at or after `position`, or None."""
+    return next((entity for entity in entities if entity[0] >= position), None)
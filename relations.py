@@ -6,10 +6,15 @@ using a local LLM model via the transformers library.
 """
 
 import ast
+import copy
+import hashlib
 import logging
 import re
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+import time
+from concurrent.futures import Future
+from razdel import sentenize
+from batching import DynamicBatcher
+from registry import registry, default_device, apply_cpu_precision, cpu_supports_bf16, effective_cpu_precision
 
 # logging
 logger = logging.getLogger(__name__)
@@ -21,13 +26,26 @@ logging.basicConfig(
 # Global variables for model caching (loaded on first use)
 _tokenizer = None
 _generator = None
+_prefix = None
 
 # Model configuration
 MODEL_NAME = "Qwen/Qwen2.5-3B-Instruct"
+registry.allow_precision(MODEL_NAME)
 MAX_NEW_TOKENS = 512
 TEMPERATURE = 0.1
 TOP_P = 0.9
 REPETITION_PENALTY = 1.1
+# Reuse the KV cache of the shared prompt prefix (system message and examples)
+PREFIX_CACHE = True
+# Stop generating once the model has closed the list of relations
+EARLY_STOPPING = True
+
+# Длинные документы режутся на окна из целых предложений: бюджет токенов
+# текста на окно и число предложений, повторяемых в начале следующего окна
+WINDOW_TOKENS = 768
+WINDOW_OVERLAP_SENTENCES = 1
+# Сколько окон генерируется за один вызов модели
+MAX_BATCH_WINDOWS = 8
 
 # Prompt template for relation extraction
 RELATION_PROMPT = """
@@ -84,51 +102,337 @@ RELATION_PROMPT = """
 
 Ответ:"""
 
+SYSTEM_MESSAGE = ("Ты — система извлечения отношений из текста. "
+                  "Отвечай только списком кортежей.")
 
-def _load_model():
+# Changes whenever the prompt or generation settings change, so cached
+# relations produced with an older prompt are not reused
+PROMPT_VERSION = hashlib.sha256(
+    f"{SYSTEM_MESSAGE}|{RELATION_PROMPT}|{MAX_NEW_TOKENS}|{TEMPERATURE}|{TOP_P}|{REPETITION_PENALTY}"
+    f"|{WINDOW_TOKENS}|{WINDOW_OVERLAP_SENTENCES}"
+    .encode('utf-8')).hexdigest()[:12]
+
+
+def cache_version(device: str) -> str:
     """
-    Load the LLM model and tokenizer. Cached after first call.
-    Uses GPU if available, otherwise falls back to CPU.
+    Version of cached relations: the prompt version and the precision the
+    model runs at, since bfloat16 and int8 answers differ from float32 ones.
+
+    Args:
+        device (str): Device the model runs on ('cpu' or 'cuda').
+
+    Returns:
+        str: e.g. '3f2a9c1b7d04-int8'.
     """
-    global _tokenizer, _generator
+    if device == 'cuda':
+        precision = 'float16'
+    else:
+        precision = effective_cpu_precision(registry.precision(MODEL_NAME))
+    return f"{PROMPT_VERSION}-{precision}"
 
-    if _generator is not None:
-        logger.debug("Model already loaded, skipping initialization")
-        return
 
-    logger.info(f"Loading relation extraction model: {MODEL_NAME}...")
-    logger.debug(f"Device: {'GPU' if torch.cuda.is_available() else 'CPU'}")
-    logger.debug(f"Torch dtype: "
-                 f"{'float16' if torch.cuda.is_available() else 'float32'}")
+def _build_generator(device: str, precision: str = None) -> tuple:
+    """
+    Load the LLM model and tokenizer and wrap them in a generation pipeline.
 
-    device = 0 if torch.cuda.is_available() else -1
-    torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+    Args:
+        device (str): Device to load the model on ('cpu' or 'cuda').
+        precision (str): CPU precision ('float32', 'bfloat16', 'int8');
+            defaults to the one configured in the model registry.
 
-    _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    Returns:
+        tuple: (tokenizer, text-generation pipeline).
+    """
+    # Imported lazily: torch and transformers dominate app startup time
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+
+    use_cuda = device == 'cuda'
+    precision = precision or registry.precision(MODEL_NAME)
+    if use_cuda:
+        torch_dtype = torch.float16
+    elif precision == 'bfloat16' and cpu_supports_bf16():
+        # Сразу в bfloat16, без промежуточной копии весов в float32
+        torch_dtype = torch.bfloat16
+    else:
+        torch_dtype = torch.float32
+    logger.debug(f"Torch dtype: {torch_dtype}")
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    # Батчи дополняются слева, чтобы генерация продолжала каждый промпт с его конца
+    tokenizer.padding_side = 'left'
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
     logger.debug("Tokenizer loaded successfully")
 
     model = AutoModelForCausalLM.from_pretrained(
         MODEL_NAME,
         torch_dtype=torch_dtype,
-        device_map="auto" if torch.cuda.is_available() else None,
+        device_map="auto" if use_cuda else None,
         low_cpu_mem_usage=True,
     )
     logger.debug("Model loaded successfully")
 
-    if not torch.cuda.is_available():
+    if not use_cuda:
         model.to("cpu")
-        logger.debug("Model moved to CPU")
+        model = apply_cpu_precision(model, precision)
+        logger.debug(f"Model moved to CPU ({precision})")
 
-    _generator = pipeline(
+    generator = pipeline(
         "text-generation",
         model=model,
-        tokenizer=_tokenizer,
-        device=device,
+        tokenizer=tokenizer,
+        device=0 if use_cuda else -1,
     )
+    logger.debug(f"Generator pipeline created on {device}")
+    return tokenizer, generator
 
-    logger.info(f"Model loaded successfully on "
-                f"{'GPU' if torch.cuda.is_available() else 'CPU'}")
-    logger.debug(f"Generator pipeline created with device={device}")
+
+def _load_model():
+    """
+    Load the LLM model and tokenizer from the shared model registry.
+    Uses GPU if available, otherwise falls back to CPU.
+    """
+    global _tokenizer, _generator, _prefix
+
+    if _generator is not None:
+        logger.debug("Model already loaded, skipping initialization")
+        return
+
+    device = default_device()
+    tokenizer, generator = registry.get(
+        MODEL_NAME, device, lambda: _build_generator(device))
+    if PREFIX_CACHE:
+        # Префикс зависит только от промпта, поэтому считается один раз на модель
+        _prefix = registry.get(f"{MODEL_NAME}:prefix-{PROMPT_VERSION}", device,
+                               lambda: PromptPrefix(tokenizer, generator.model))
+    _tokenizer, _generator = tokenizer, generator
+    logger.info(f"Relation extraction model ready on {device.upper()}")
+
+
+class PromptPrefix:
+    """
+    Key/value cache of the prompt part shared by every document.
+
+    The system message and the few-shot `RELATION_PROMPT` header are the same
+    for every call, only the text after "Текст для анализа:" changes. The
+    prefix is prefilled once; each generation starts from a copy of its cache,
+    so the model only prefills the document text and the prompt tail.
+
+    Example:
+        >>> prefix = PromptPrefix(tokenizer, model)
+        >>> responses = prefix.generate([_format_prompt(text)])
+    """
+
+    _MARKER = '\x00TEXT\x00'
+
+    def __init__(self, tokenizer, model):
+        """
+        Args:
+            tokenizer: Tokenizer of the relation model.
+            model: Causal LM (the `model` of the generation pipeline).
+        """
+        import torch
+        from transformers import DynamicCache
+
+        self.tokenizer = tokenizer
+        self.model = model
+        self.text = _format_prompt(self._MARKER, tokenizer).split(self._MARKER)[0]
+        self.ids = tokenizer(self.text, return_tensors='pt', add_special_tokens=False) \
+            .input_ids.to(model.device)
+        with torch.no_grad():
+            self.cache = model(self.ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+        logger.info(f"Prompt prefix cached ({self.ids.shape[1]} tokens)")
+
+    def generate(self, prompts: list, stopping_criteria=None) -> list:
+        """
+        Generates responses for full formatted prompts starting with the prefix.
+
+        Only the part after the prefix is tokenized and prefilled. In a batch
+        the tails are padded between prefix and tail, masked out of attention.
+
+        Args:
+            prompts (list): Prompts built by `_format_prompt`.
+            stopping_criteria (list): Optional criteria passed to `generate`.
+
+        Returns:
+            list: Generated text per prompt, without the prompt.
+        """
+        import torch
+
+        tails = []
+        for prompt in prompts:
+            if not prompt.startswith(self.text):
+                raise ValueError("Prompt does not start with the cached prefix")
+            tails.append(self.tokenizer(prompt[len(self.text):], add_special_tokens=False).input_ids)
+
+        width = max(len(tail) for tail in tails)
+        pad_id = self.tokenizer.pad_token_id
+        if pad_id is None:
+            pad_id = self.tokenizer.eos_token_id
+        prefix_ids = self.ids[0].tolist()
+        input_ids = [prefix_ids + [pad_id] * (width - len(tail)) + tail for tail in tails]
+        attention_mask = [[1] * len(prefix_ids) + [0] * (width - len(tail)) + [1] * len(tail)
+                          for tail in tails]
+
+        cache = copy.deepcopy(self.cache)
+        if len(prompts) > 1:
+            cache.batch_repeat_interleave(len(prompts))
+        kwargs = _generation_kwargs(self.tokenizer)
+        kwargs['pad_token_id'] = pad_id
+        if stopping_criteria:
+            kwargs['stopping_criteria'] = stopping_criteria
+        with torch.no_grad():
+            output = self.model.generate(
+                input_ids=torch.tensor(input_ids, device=self.model.device),
+                attention_mask=torch.tensor(attention_mask, device=self.model.device),
+                past_key_values=cache,
+                **kwargs)
+        generated = output[:, len(prefix_ids) + width:]
+        return self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+
+
+class TupleStreamParser:
+    """
+    Incremental parser for the generated list of relation tuples.
+
+    Text is fed as it is generated; every `(entity, relation, entity)` tuple
+    is returned as soon as its closing parenthesis arrives, and `closed`
+    turns True once the top-level list is closed. Text before the opening
+    bracket (and anything after the list) is ignored.
+
+    Example:
+        >>> parser = TupleStreamParser()
+        >>> parser.feed("[('Иван', 'место рожд")
+        []
+        >>> parser.feed("ения', 'Москва'), ")
+        [('Иван', 'место рождения', 'Москва')]
+        >>> parser.feed("]"), parser.closed
+        ([], True)
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._started = False
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+        self._buffer = []
+
+    def feed(self, chunk: str) -> list:
+        """
+        Consumes the next piece of generated text.
+
+        Returns:
+            list: Tuples completed by this piece.
+        """
+        found = []
+        for char in chunk:
+            if self.closed:
+                break
+            if not self._started:
+                if char == '[':
+                    self._started = True
+                    self._depth = 1
+                continue
+            if self._depth >= 2:
+                self._buffer.append(char)
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == self._quote:
+                    self._quote = None
+            elif char in '\'"':
+                self._quote = char
+            elif char in '([':
+                self._depth += 1
+                if self._depth == 2:
+                    self._buffer = [char]
+            elif char in ')]':
+                self._depth -= 1
+                if self._depth == 1:
+                    relation = self._parse_tuple(''.join(self._buffer))
+                    if relation:
+                        found.append(relation)
+                elif self._depth == 0:
+                    self.closed = True
+        return found
+
+    @staticmethod
+    def _parse_tuple(source: str):
+        try:
+            value = ast.literal_eval(source)
+        except (ValueError, SyntaxError):
+            return None
+        if isinstance(value, (list, tuple)) and len(value) == 3:
+            relation = tuple(str(part).strip() for part in value)
+            if all(relation):
+                return relation
+        return None
+
+
+class ListClosedCriteria:
+    """
+    Stopping criterion for `generate`: a row is finished once its generated
+    text has closed the top-level relation list.
+
+    Only the tokens added since the previous step are decoded (with the
+    token before them as context, so leading spaces and multi-byte
+    characters come out right) and fed to a `TupleStreamParser` per batch
+    row; `on_tuple(row, relation)` is called for every completed tuple,
+    e.g. to publish partial results.
+    """
+
+    def __init__(self, tokenizer, on_tuple=None):
+        """
+        Args:
+            tokenizer: Tokenizer used to decode generated tokens.
+            on_tuple (callable): Optional callback on_tuple(row, relation).
+        """
+        self.tokenizer = tokenizer
+        self.on_tuple = on_tuple
+        self.generated_tokens = None
+        self._start = None
+        self._parsers = None
+        # Для каждой строки: начало контекста и начало ещё не выданных токенов
+        self._prefix_offsets = None
+        self._read_offsets = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        if self._start is None:
+            # Первый вызов - после первого сгенерированного токена
+            self._start = input_ids.shape[1] - 1
+            rows = input_ids.shape[0]
+            self._parsers = [TupleStreamParser() for _ in range(rows)]
+            self._prefix_offsets = [self._start] * rows
+            self._read_offsets = [self._start] * rows
+            self.generated_tokens = [0] * rows
+
+        done = []
+        for row, parser in enumerate(self._parsers):
+            if not parser.closed:
+                self.generated_tokens[row] = input_ids.shape[1] - self._start
+                relations = parser.feed(self._new_text(input_ids, row))
+                if self.on_tuple:
+                    for relation in relations:
+                        self.on_tuple(row, relation)
+            done.append(parser.closed)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def _new_text(self, input_ids, row: int) -> str:
+        """Text of the row's tokens not yet fed to its parser."""
+        prefix, read = self._prefix_offsets[row], self._read_offsets[row]
+        prefix_text = self.tokenizer.decode(input_ids[row, prefix:read], skip_special_tokens=True)
+        text = self.tokenizer.decode(input_ids[row, prefix:], skip_special_tokens=True)
+        # Незавершённый многобайтовый символ декодируется как U+FFFD: ждём следующих токенов
+        if len(text) <= len(prefix_text) or text.endswith('\ufffd'):
+            return ''
+        self._prefix_offsets[row], self._read_offsets[row] = read, input_ids.shape[1]
+        return text[len(prefix_text):]
 
 
 def _parse_llm_response(response: str) -> list:
@@ -193,15 +497,254 @@ def _parse_llm_response(response: str) -> list:
     return []
 
 
-def extract_relations(text: str) -> list:
+def _should_skip(text: str) -> bool:
+    """Checks whether a text is too short to contain relations."""
+    if not text or not text.strip():
+        logger.debug("Empty or None text provided, returning empty list")
+        return True
+
+    # Skip very short texts that are unlikely to contain relations
+    if len(text.strip()) < 10:
+        logger.debug(f"Text too short "
+                     f"({len(text.strip())} chars), returning empty list")
+        return True
+    return False
+
+
+def _format_prompt(text: str, tokenizer=None) -> str:
+    """Builds the chat-formatted generation prompt for one text."""
+    tokenizer = tokenizer or _tokenizer
+    prompt = RELATION_PROMPT.format(text=text.strip())
+    logger.debug(f"Prompt prepared (length: {len(prompt)} chars)")
+
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt},
+    ]
+
+    # Use chat template if available
+    if hasattr(tokenizer, 'apply_chat_template'):
+        formatted_prompt = tokenizer.apply_chat_template(
+            messages,
+            tokenize=False,
+            add_generation_prompt=True
+        )
+        logger.debug("Applied chat template to prompt")
+    else:
+        formatted_prompt = prompt
+        logger.debug("Using raw prompt (no chat template available)")
+    return formatted_prompt
+
+
+def _generation_kwargs(tokenizer=None) -> dict:
+    tokenizer = tokenizer or _tokenizer
+    logger.debug(f"Generation parameters: max_new_tokens={MAX_NEW_TOKENS}, "
+                 f"temperature={TEMPERATURE}, top_p={TOP_P}, "
+                 f"repetition_penalty={REPETITION_PENALTY}")
+    return {
+        'max_new_tokens': MAX_NEW_TOKENS,
+        'temperature': TEMPERATURE,
+        'top_p': TOP_P,
+        'repetition_penalty': REPETITION_PENALTY,
+        'do_sample': True,
+        'pad_token_id': tokenizer.eos_token_id,
+    }
+
+
+def _relations_from_output(response: str, formatted_prompt: str) -> list:
+    """Strips the echoed prompt from generated text and parses the relations."""
+    logger.debug(f"Raw generated text length: {len(response)} chars")
+
+    if response.startswith(formatted_prompt):
+        response = response[len(formatted_prompt):]
+        logger.debug("Removed prompt prefix from response")
+
+    logger.debug(f"Response to parse: {response[:300]}...")
+
+    relations = _parse_llm_response(response)
+
+    logger.info(f"Extraction complete. Found {len(relations)} relations:")
+    for i, rel in enumerate(relations, 1):
+        logger.info(f"  {i}. {rel[0]} → {rel[1]} → {rel[2]}")
+    return relations
+
+
+def _count_tokens(text: str) -> int:
+    """Counts model tokens, estimating ~3 characters per token before the model loads."""
+    if _tokenizer is None:
+        return len(text) // 3 + 1
+    return len(_tokenizer(text, add_special_tokens=False)['input_ids'])
+
+
+def relation_windows(text: str, max_tokens: int = WINDOW_TOKENS,
+                     overlap: int = WINDOW_OVERLAP_SENTENCES, count_tokens=None) -> list:
+    """
+    Splits a document into overlapping windows of whole sentences.
+
+    Sentences are packed into a window while its text stays within
+    `max_tokens`; the last `overlap` sentences of a window start the next one,
+    so relations spanning a window boundary are seen whole at least once.
+    A single longer sentence becomes a window of its own.
+
+    Args:
+        text (str): Input text.
+        max_tokens (int): Token budget for the text of one window.
+        overlap (int): Sentences repeated at the start of the next window.
+        count_tokens (callable): Token counter, defaults to the model tokenizer.
+
+    Returns:
+        list: Window texts in document order.
+
+    Example:
+        >>> relation_windows('Иван родился. Отец Пётр. Мать Анна.', max_tokens=4,
+        ...                  count_tokens=lambda t: len(t.split()))
+        ['Иван родился. Отец Пётр.', 'Отец Пётр. Мать Анна.']
+    """
+    count_tokens = count_tokens or _count_tokens
+    text = text.strip()
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    sentences = [(sentence.text, count_tokens(sentence.text)) for sentence in sentenize(text)]
+    windows = []
+    current = []
+    tokens = 0
+    for sentence in sentences:
+        if current and tokens + sentence[1] > max_tokens:
+            windows.append(' '.join(part for part, _ in current))
+            current = current[-overlap:] if overlap else []
+            tokens = sum(count for _, count in current)
+            # Перекрытие не должно съедать весь бюджет следующего окна
+            while current and tokens + sentence[1] > max_tokens:
+                tokens -= current.pop(0)[1]
+        current.append(sentence)
+        tokens += sentence[1]
+    if current:
+        windows.append(' '.join(part for part, _ in current))
+    return windows
+
+
+def _normalize_entity(value) -> str:
+    """Collapses whitespace and strips quotes and punctuation around an entity."""
+    return ' '.join(str(value).split()).strip(' .,;:"\'«»()')
+
+
+def merge_relations(window_relations: list) -> list:
+    """
+    Merges relations extracted from the windows of one document.
+
+    Entities are normalized (whitespace, surrounding quotes and punctuation);
+    duplicates are detected case-insensitively with ё read as е, and the
+    first spelling seen is kept.
+
+    Args:
+        window_relations (list): Lists of (entity1, relation, entity2) tuples.
+
+    Returns:
+        list: De-duplicated tuples in order of first appearance.
+
+    Example:
+        >>> merge_relations([[('Иван', 'родитель', 'Пётр')], [('иван ', 'Родитель', '«Пётр»')]])
+        [('Иван', 'родитель', 'Пётр')]
+    """
+    merged = {}
+    for relations in window_relations:
+        for relation in relations:
+            relation = tuple(_normalize_entity(part) for part in relation)
+            if all(relation):
+                merged.setdefault(_relation_key(relation), relation)
+    return list(merged.values())
+
+
+def _relation_key(relation: tuple) -> tuple:
+    """Comparison key of a normalized relation: case-insensitive, ё read as е."""
+    return tuple(part.casefold().replace('ё', 'е') for part in relation)
+
+
+def _generate(prompts: list, on_tuple=None) -> list:
+    """
+    Generates responses for formatted prompts, returning text per prompt.
+
+    With `EARLY_STOPPING` each row stops once its relation list is closed and
+    `on_tuple(row, relation)` receives tuples while they are generated.
+    """
+    criteria = [ListClosedCriteria(_tokenizer, on_tuple)] if EARLY_STOPPING else None
+    if _prefix is not None:
+        return _prefix.generate(prompts, criteria)
+    kwargs = _generation_kwargs()
+    if criteria:
+        kwargs['stopping_criteria'] = criteria
+    if len(prompts) == 1:
+        return [_generator(prompts[0], **kwargs)[0]["generated_text"]]
+    outputs = _generator(prompts, batch_size=len(prompts), **kwargs)
+    # Для списка входов pipeline возвращает список вариантов на каждый вход
+    return [(output[0] if isinstance(output, list) else output)["generated_text"]
+            for output in outputs]
+
+
+def _extract_windows(texts: list, on_relation=None) -> list:
+    """
+    Runs every window of every text through the model in batches of
+    `MAX_BATCH_WINDOWS` and merges the relations per text.
+
+    `on_relation` is an optional list of callbacks, one per text, called with
+    every new (normalized, de-duplicated) relation while it is generated.
+    """
+    streamed = [set() for _ in texts]
+
+    def emit(index, relation):
+        relation = tuple(_normalize_entity(part) for part in relation)
+        key = _relation_key(relation)
+        if all(relation) and key not in streamed[index]:
+            streamed[index].add(key)
+            try:
+                on_relation[index](relation)
+            except Exception:
+                # Ошибка отображения прогресса не должна прерывать генерацию
+                logger.exception("Relation progress callback failed")
+
+    windows = []
+    for index, text in enumerate(texts):
+        for window in relation_windows(text, WINDOW_TOKENS, WINDOW_OVERLAP_SENTENCES):
+            windows.append((index, window, _count_tokens(window)))
+    logger.info(f"Extracting relations from {len(texts)} texts in {len(windows)} windows")
+
+    found = [[] for _ in texts]
+    for start in range(0, len(windows), MAX_BATCH_WINDOWS):
+        chunk = windows[start:start + MAX_BATCH_WINDOWS]
+        prompts = [_format_prompt(window) for _, window, _ in chunk]
+
+        def on_tuple(row, relation, chunk=chunk):
+            index = chunk[row][0]
+            if on_relation[index]:
+                emit(index, relation)
+
+        started = time.perf_counter()
+        responses = _generate(prompts, on_tuple if on_relation else None)
+        elapsed = time.perf_counter() - started
+        for offset, ((index, _, tokens), prompt, response) in enumerate(zip(chunk, prompts, responses)):
+            relations = _relations_from_output(response, prompt)
+            logger.info(f"Window {start + offset + 1}/{len(windows)}: {tokens} tokens, "
+                        f"{len(relations)} relations, batch of {len(chunk)} took {elapsed:.2f}s")
+            found[index].append(relations)
+    return [merge_relations(relations) for relations in found]
+
+
+def extract_relations(text: str, raise_errors: bool = False, on_relation=None) -> list:
     """
     Extracts relationships from the input text using a local LLM.
 
     Uses Qwen2.5-3B-Instruct model to identify semantic relations such as
-    parent-child, birth place, birth date, baptism, marriage, etc.
+    parent-child, birth place, birth date, baptism, marriage, etc. Long texts
+    are split into overlapping sentence windows (see `relation_windows`)
+    whose relations are merged.
 
     Args:
         text (str): Input text to analyze for relationships.
+        raise_errors (bool): Re-raise model errors instead of returning an
+            empty list, e.g. so that a failure is not cached as "no relations".
+        on_relation (callable): Optional callback receiving each relation as
+            soon as the model has generated it, for progress reporting.
 
     Returns:
         list: List of tuples containing (entity1, relation, entity2).
@@ -211,14 +754,7 @@ def extract_relations(text: str) -> list:
         >>> print(relations)
         [('Иван', 'место рождения', 'Москва'), ('Иван', 'дата рождения', '1890')]
     """
-    if not text or not text.strip():
-        logger.debug("Empty or None text provided, returning empty list")
-        return []
-
-    # Skip very short texts that are unlikely to contain relations
-    if len(text.strip()) < 10:
-        logger.debug(f"Text too short "
-                     f"({len(text.strip())} chars), returning empty list")
+    if _should_skip(text):
         return []
 
     logger.info(f"Starting relation extraction for text (length: {len(text)} chars)")
@@ -226,61 +762,102 @@ def extract_relations(text: str) -> list:
 
     try:
         _load_model()
+        return _extract_windows([text], [on_relation] if on_relation else None)[0]
 
-        prompt = RELATION_PROMPT.format(text=text.strip())
-        logger.debug(f"Prompt prepared (length: {len(prompt)} chars)")
-
-        messages = [
-            {"role": "system",
-             "content": "Ты — система извлечения отношений из текста. "
-                        "Отвечай только списком кортежей."},
-            {"role": "user", "content": prompt},
-        ]
-
-        # Use chat template if available
-        if hasattr(_tokenizer, 'apply_chat_template'):
-            formatted_prompt = _tokenizer.apply_chat_template(
-                messages,
-                tokenize=False,
-                add_generation_prompt=True
-            )
-            logger.debug("Applied chat template to prompt")
-        else:
-            formatted_prompt = prompt
-            logger.debug("Using raw prompt (no chat template available)")
-
-        logger.debug(f"Generation parameters: max_new_tokens={MAX_NEW_TOKENS}, "
-                    f"temperature={TEMPERATURE}, top_p={TOP_P}, "
-                    f"repetition_penalty={REPETITION_PENALTY}")
-
-        result = _generator(
-            formatted_prompt,
-            max_new_tokens=MAX_NEW_TOKENS,
-            temperature=TEMPERATURE,
-            top_p=TOP_P,
-            repetition_penalty=REPETITION_PENALTY,
-            do_sample=True,
-            pad_token_id=_tokenizer.eos_token_id,
-        )
+    except Exception as e:
+        logger.error(f"Error extracting relations: {e}")
+        logger.exception("Full traceback:")
+        if raise_errors:
+            raise
+        return []
 
-        response = result[0]["generated_text"]
-        logger.debug(f"Raw generated text length: {len(response)} chars")
 
-        if response.startswith(formatted_prompt):
-            response = response[len(formatted_prompt):]
-            logger.debug("Removed prompt prefix from response")
+def extract_relations_batch(texts: list, raise_errors: bool = False, on_relation: list = None) -> list:
+    """
+    Extracts relationships from several texts with shared generation calls.
 
-        logger.debug(f"Response to parse: {response[:300]}...")
+    On CPU a generation call is dominated by per-call overhead, so running
+    documents (and the windows of long documents) together raises
+    throughput. Texts too short for relations are answered without the model.
 
-        relations = _parse_llm_response(response)
+    Args:
+        texts (list): Input texts.
+        raise_errors (bool): Re-raise model errors instead of returning empty
+            lists for the whole batch.
+        on_relation (list): Optional callbacks aligned with `texts` (None
+            entries allowed) receiving relations while they are generated.
 
-        logger.info(f"Extraction complete. Found {len(relations)} relations:")
-        for i, rel in enumerate(relations, 1):
-            logger.info(f"  {i}. {rel[0]} → {rel[1]} → {rel[2]}")
+    Returns:
+        list: One list of (entity1, relation, entity2) tuples per text.
+    """
+    results = [[] for _ in texts]
+    pending = [i for i, text in enumerate(texts) if not _should_skip(text)]
+    if not pending:
+        return results
 
-        return relations
+    logger.info(f"Starting batched relation extraction for {len(pending)} texts")
+    try:
+        _load_model()
+        callbacks = [on_relation[i] for i in pending] if on_relation else None
+        for i, relations in zip(pending, _extract_windows([texts[i] for i in pending], callbacks)):
+            results[i] = relations
+        return results
 
     except Exception as e:
         logger.error(f"Error extracting relations: {e}")
         logger.exception("Full traceback:")
-        return []
+        if raise_errors:
+            raise
+        return [[] for _ in texts]
+
+
+class RelationBatcher(DynamicBatcher):
+    """
+    Collects relation extraction requests from concurrent callers and runs
+    them through the LLM as batches.
+
+    A `DynamicBatcher` whose items are (text, on_relation) pairs; the
+    callbacks of a batch are passed to the extraction function together.
+
+    Example:
+        >>> batcher = RelationBatcher(max_batch=4, max_wait=0.05)
+        >>> relations = batcher.extract('Иван родился в Москве в 1890 году.')
+    """
+
+    def __init__(self, max_batch: int = 4, max_wait: float = 0.05, extract_batch=None):
+        """
+        Args:
+            max_batch (int): Maximum texts per generation call.
+            max_wait (float): Seconds to wait for more texts after the first.
+            extract_batch (callable): Batch function called as
+                extract_batch(texts, callbacks), defaults to
+                `extract_relations_batch` with raise_errors=True.
+        """
+        super().__init__(self._run_batch, max_batch, max_wait, name='relation-batcher')
+        self._extract_batch = extract_batch or (
+            lambda texts, callbacks: extract_relations_batch(texts, raise_errors=True,
+                                                             on_relation=callbacks))
+
+    def submit(self, text: str, on_relation=None) -> Future:
+        """
+        Queues a text for the next batch.
+
+        Args:
+            text (str): Input text.
+            on_relation (callable): Optional callback receiving relations of
+                this text while they are generated.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the list of relations, or
+            to the model error.
+        """
+        return super().submit((text, on_relation))
+
+    def extract(self, text: str, on_relation=None) -> list:
+        """Blocking `submit`: returns the relations or raises the model error."""
+        return self.submit(text, on_relation).result()
+
+    def _run_batch(self, items: list) -> list:
+        texts = [text for text, _ in items]
+        callbacks = [on_relation for _, on_relation in items]
+        return self._extract_batch(texts, callbacks if any(callbacks) else None)
@@ -1,54 +1,243 @@
 import pytesseract
+import cv2
+import numpy as np
 from PIL import Image
 import os
 import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from registry import registry
 
-# Путь к Tesseract для Windows (измените на свой путь, если нужно)
-if platform.system() == 'Windows':
-    # Типичные пути установки Tesseract на Windows
-    possible_paths = [
-        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-        os.path.expanduser(r'~\AppData\Local\Tesseract-OCR\tesseract.exe')
-    ]
+TESSERACT_MODEL_NAME = 'tesseract'
 
-    # Проверяем, существует ли какой-то из путей
-    for path in possible_paths:
-        if os.path.exists(path):
-            pytesseract.pytesseract.tesseract_cmd = path
-            break
+# OEM 3 - движок по умолчанию (LSTM), PSM 6 - один равномерный блок текста
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
 
+# Разбиение страницы на блоки: ядро склейки в долях ширины и высоты страницы
+# (шире пробела между словами, уже промежутка между колонками)
+BLOCK_KERNEL = (1 / 60, 1 / 80)
+# Блоки меньше этой доли площади страницы считаются шумом
+MIN_BLOCK_AREA = 0.0005
+# Блок шире этой доли текста страницы (заголовок над колонками) читается целиком
+# между колонками выше и ниже него
+WIDE_BLOCK_SHARE = 0.6
+# Поля вокруг блока при вырезании, пиксели
+BLOCK_PADDING = 8
 
-def perform_tesseract_ocr(image_path: str, lang: str = 'rus') -> str:
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_tesseract() -> str:
+    """
+    Locates the Tesseract binary on first use and returns its version.
+
+    Returns:
+        str: Tesseract version reported by the binary.
+    """
+    def loader():
+        # Путь к Tesseract для Windows (измените на свой путь, если нужно)
+        if platform.system() == 'Windows':
+            # Типичные пути установки Tesseract на Windows
+            possible_paths = [
+                r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+                r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+                os.path.expanduser(r'~\AppData\Local\Tesseract-OCR\tesseract.exe')
+            ]
+
+            # Проверяем, существует ли какой-то из путей
+            for path in possible_paths:
+                if os.path.exists(path):
+                    pytesseract.pytesseract.tesseract_cmd = path
+                    break
+
+        return str(pytesseract.get_tesseract_version())
+
+    return registry.get(TESSERACT_MODEL_NAME, 'cpu', loader)
+
+
+def perform_tesseract_ocr(image_path: str, lang: str = 'rus', workers: int = 1) -> str:
     """
     Performs OCR on an image using Tesseract 5 (LSTM) and returns the extracted text.
 
     Args:
         image_path (str): Path to the input image file.
         lang (str): Language code for Tesseract (default: 'rus' for Russian).
+        workers (int): With more than 1, the page is split into text blocks
+            (`segment_blocks`) that are recognized concurrently by up to
+            `workers` Tesseract processes; the text of the blocks is joined
+            in reading order, separated by blank lines.
 
     Returns:
         str: Extracted text from the image.
     """
     try:
+        get_tesseract()
+
         # Открываем изображение
         image = Image.open(image_path)
 
+        if workers > 1:
+            boxes = segment_blocks(image)
+            if len(boxes) > 1:
+                return _recognize_blocks(image, boxes, lang, workers)
+
         # Выполняем OCR с использованием Tesseract 5 (LSTM)
         # Tesseract 5 по умолчанию использует LSTM нейронную сеть
         # PSM 6 - Предполагаем один равномерный блок текста
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(image, lang=lang, config=custom_config)
+        text = pytesseract.image_to_string(image, lang=lang, config=TESSERACT_CONFIG)
 
         return text.strip()
     except Exception as e:
-        error_msg = str(e)
-        if "TesseractNotFoundError" in error_msg or "not found" in error_msg.lower():
-            raise Exception(
-                "Tesseract OCR не установлен или не найден в системе. "
-                "Для Windows скачайте и установите Tesseract с: "
-                "https://github.com/UB-Mannheim/tesseract/wiki\n"
-                "После установки убедитесь, что путь к tesseract.exe добавлен в PATH "
-                "или укажите путь в файле tesseract_ocr.py"
-            )
-        raise Exception(f"Error performing Tesseract OCR: {error_msg}")
+        raise _tesseract_error(e)
+
+
+def segment_blocks(image: Image.Image) -> list:
+    """
+    Splits a page into text blocks and orders them for reading.
+
+    Ink is binarized (Otsu) and dilated with a kernel wider than the gaps
+    between words and lines but narrower than column gutters, so every
+    paragraph becomes one connected region. Blocks wider than
+    `WIDE_BLOCK_SHARE` of the text (headings across columns) are read in
+    place; the blocks between them are grouped into columns by horizontal
+    overlap and read column by column, left to right, top to bottom.
+
+    Args:
+        image (PIL.Image.Image): Page image.
+
+    Returns:
+        list: Block boxes (left, top, right, bottom) in reading order.
+
+    Example:
+        >>> segment_blocks(Image.open('two_columns.png'))
+        [(40, 30, 1360, 90), (40, 130, 680, 1900), (720, 130, 1360, 1900)]
+    """
+    gray = np.asarray(image.convert('L'))
+    height, width = gray.shape
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(
+        cv2.MORPH_RECT, (max(3, int(width * BLOCK_KERNEL[0])), max(3, int(height * BLOCK_KERNEL[1]))))
+    contours, _ = cv2.findContours(cv2.dilate(binary, kernel), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h >= MIN_BLOCK_AREA * width * height:
+            boxes.append((x, y, x + w, y + h))
+    return _reading_order(boxes)
+
+
+def _reading_order(boxes: list) -> list:
+    """Orders blocks: wide blocks split the page into bands, bands are read column by column."""
+    if not boxes:
+        return boxes
+    content = max(box[2] for box in boxes) - min(box[0] for box in boxes)
+    ordered, band = [], []
+    for box in sorted(boxes, key=lambda box: (box[1], box[0])):
+        if box[2] - box[0] > WIDE_BLOCK_SHARE * content:
+            ordered.extend(_columns(band))
+            ordered.append(box)
+            band = []
+        else:
+            band.append(box)
+    return ordered + _columns(band)
+
+
+def _columns(boxes: list) -> list:
+    return [box for column in _split(boxes, 0) for box in sorted(column, key=lambda box: (box[1], box[0]))]
+
+
+def _split(boxes: list, axis: int) -> list:
+    """Groups boxes whose extents along the axis overlap, in axis order."""
+    groups = []
+    end = None
+    for box in sorted(boxes, key=lambda box: box[axis]):
+        if end is None or box[axis] >= end:
+            groups.append([])
+            end = box[axis + 2]
+        groups[-1].append(box)
+        end = max(end, box[axis + 2])
+    return groups
+
+
+def _recognize_blocks(image: Image.Image, boxes: list, lang: str, workers: int) -> str:
+    def recognize(box):
+        crop = image.crop((max(0, box[0] - BLOCK_PADDING), max(0, box[1] - BLOCK_PADDING),
+                           min(image.width, box[2] + BLOCK_PADDING), min(image.height, box[3] + BLOCK_PADDING)))
+        return pytesseract.image_to_string(crop, lang=lang, config=TESSERACT_CONFIG).strip()
+
+    texts = _pool(workers).map(recognize, boxes)
+    return '\n\n'.join(text for text in texts if text)
+
+
+def _pool(workers: int) -> ThreadPoolExecutor:
+    # pytesseract запускает отдельный процесс tesseract на каждый вызов, потокам
+    # остается только ждать его; общий пул ограничивает число процессов на все документы
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tesseract')
+        return _pools[workers]
+
+
+def recognize_tesseract_lines(image: Image.Image, lang: str = 'rus') -> list:
+    """
+    Recognizes an image with Tesseract and returns text lines with confidences.
+
+    Uses `image_to_data` with the same settings as `perform_tesseract_ocr`
+    and groups the words by Tesseract's block, paragraph and line numbers.
+
+    Args:
+        image (PIL.Image.Image): Page image.
+        lang (str): Language code for Tesseract.
+
+    Returns:
+        list: Lines in Tesseract's reading order, dicts {'block', 'text',
+        'box': (left, top, right, bottom), 'confidence'}; the confidence is
+        the mean word confidence, 0-100. Lines without words are skipped.
+
+    Example:
+        >>> recognize_tesseract_lines(Image.open('page.png'))
+        [{'block': 1, 'text': 'Метрическая книга', 'box': (40, 32, 610, 78), 'confidence': 91.5}, ...]
+    """
+    try:
+        get_tesseract()
+        data = pytesseract.image_to_data(image, lang=lang, config=TESSERACT_CONFIG,
+                                         output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        raise _tesseract_error(e)
+
+    lines = {}
+    for index, word in enumerate(data['text']):
+        # conf -1 - строки и блоки без текста
+        confidence = float(data['conf'][index])
+        if not word.strip() or confidence < 0:
+            continue
+        key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+        left, top = data['left'][index], data['top'][index]
+        right, bottom = left + data['width'][index], top + data['height'][index]
+        line = lines.setdefault(key, {'words': [], 'confidences': [], 'box': (left, top, right, bottom)})
+        line['words'].append(word.strip())
+        line['confidences'].append(confidence)
+        box = line['box']
+        line['box'] = (min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom))
+
+    return [{
+        'block': key[0],
+        'text': ' '.join(line['words']),
+        'box': line['box'],
+        'confidence': sum(line['confidences']) / len(line['confidences']),
+    } for key, line in sorted(lines.items())]
+
+
+def _tesseract_error(error: Exception) -> Exception:
+    error_msg = str(error)
+    if "TesseractNotFoundError" in error_msg or "not found" in error_msg.lower():
+        return Exception(
+            "Tesseract OCR не установлен или не найден в системе. "
+            "Для Windows скачайте и установите Tesseract с: "
+            "https://github.com/UB-Mannheim/tesseract/wiki\n"
+            "После установки убедитесь, что путь к tesseract.exe добавлен в PATH "
+            "или укажите путь в файле tesseract_ocr.py"
+        )
+    return Exception(f"Error performing Tesseract OCR: {error_msg}")
@@ -1,5 +1,14 @@
 import pytest
 from app import app
+from registry import registry
+
+
+@pytest.fixture(autouse=True)
+def clear_model_registry():
+    """Drop models (and mocks) cached in the registry between tests."""
+    registry.clear()
+    yield
+    registry.clear()
 
 
 @pytest.fixture
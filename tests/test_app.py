@@ -1,6 +1,8 @@
 """Tests for the Flask application."""
 
 import io
+import json
+import os
 import pytest
 from unittest.mock import MagicMock
 from app import app, db
@@ -22,13 +24,15 @@ def client():
 @pytest.fixture
 def mock_heavy_functions(monkeypatch):
     """Mock all heavy functions."""
-    monkeypatch.setattr('app.perform_ner', MagicMock(return_value="mock ner result"))
+    monkeypatch.setattr('app.perform_ner_spans', MagicMock(return_value=[
+        {'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'}
+    ]))
     monkeypatch.setattr('app.perform_ocr', MagicMock(return_value="mock ocr text"))
     monkeypatch.setattr('app.perform_tesseract_ocr', MagicMock(return_value="mock tesseract text"))
     monkeypatch.setattr('app.perform_htr', MagicMock(return_value=("mock_image", "mock htr text")))
     monkeypatch.setattr('app.translate_text', MagicMock(side_effect=lambda x: f"translated: {x}"))
-    monkeypatch.setattr('app.extract_relations', MagicMock(return_value=[
-        ('Entity1', 'relation_type', 'Entity2')
+    monkeypatch.setattr('app.extract_relations_batch', MagicMock(side_effect=lambda texts, **kwargs: [
+        [('Entity1', 'relation_type', 'Entity2')] for _ in texts
     ]))
 
 
@@ -101,6 +105,34 @@ class TestProtectedRoutes:
         assert response.status_code == 200
 
 
+class TestHealth:
+    """Tests for liveness and readiness probes."""
+
+    def test_healthz(self, client):
+        response = client.get('/healthz')
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'ok'}
+
+    def test_readyz_without_warmup(self, client):
+        response = client.get('/readyz')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['ready'] is True
+        assert data['models']['ner'] is False
+
+    def test_readyz_waits_for_required_models(self, client, monkeypatch):
+        from registry import registry
+        from ner import NER_MODEL_NAME
+        monkeypatch.setitem(app.config, 'WARMUP_MODELS', ['ner'])
+
+        assert client.get('/readyz').status_code == 503
+
+        registry.get(NER_MODEL_NAME, 'cpu', MagicMock)
+        response = client.get('/readyz')
+        assert response.status_code == 200
+        assert response.get_json()['models']['ner'] is True
+
+
 class TestProcessing:
     """Tests for image processing."""
 
@@ -122,6 +154,469 @@ class TestProcessing:
         assert data['success'] is True
         assert 'result_id' in data
 
+    def test_process_queue_full(self, authenticated_client, mock_heavy_functions, monkeypatch):
+        from jobs import QueueFullError
+
+        def full(*args):
+            raise QueueFullError(20, 120.0)
+
+        monkeypatch.setattr('app.scheduler.submit', full)
+        data = {
+            'image': (io.BytesIO(b"fake image data"), 'test.jpg'),
+            'text_type': 'ocr',
+            'ocr_model': 'easyocr'
+        }
+        response = authenticated_client.post('/process',
+                                            data=data,
+                                            content_type='multipart/form-data')
+        assert response.status_code == 429
+        data = response.get_json()
+        assert data['queue_position'] == 21
+        assert data['eta_seconds'] == 120.0
+
+
+class TestProgressStream:
+    """Tests for the SSE progress stream."""
+
+    def _create_result(self, **fields):
+        from models import User, ProcessingResult
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, **fields)
+        db.session.add(result)
+        db.session.commit()
+        return result.id
+
+    def test_finished_result_sends_snapshot_only(self, authenticated_client):
+        import json
+        result_id = self._create_result(status='completed', current_stage='completed',
+                                        stage_data='{}')
+        response = authenticated_client.get(f'/api/result/{result_id}/events')
+        assert response.mimetype == 'text/event-stream'
+
+        body = response.get_data(as_text=True)
+        assert body.startswith('event: snapshot\n')
+        payload = json.loads(body.split('data: ', 1)[1])
+        assert payload['status'] == 'completed'
+
+    def test_streams_stage_deltas(self, authenticated_client):
+        import json
+        import threading
+        import app as app_module
+        from events import progress_events
+
+        result_id = self._create_result(status='processing', current_stage='queued',
+                                        stage_data='{}')
+        response = authenticated_client.get(f'/api/result/{result_id}/events',
+                                            buffered=False)
+        chunks = (chunk.decode() for chunk in response.response)
+        assert next(chunks).startswith('event: snapshot')
+
+        def publish():
+            while not progress_events.subscriber_count(result_id):
+                pass
+            app_module.publish_progress(result_id, 'ner',
+                                        stage_data={'ner': {'status': 'completed', 'html': 'x'}})
+            app_module.publish_progress(result_id, 'completed', status='completed')
+
+        threading.Thread(target=publish).start()
+        events = [json.loads(chunk.split('data: ', 1)[1]) for chunk in chunks]
+        response.close()
+
+        assert events[0]['current_stage'] == 'ner'
+        assert events[0]['stage_data'] == {'ner': {'status': 'completed', 'html': 'x'}}
+        assert events[1]['status'] == 'completed'
+        assert progress_events.subscriber_count(result_id) == 0
+
+    def test_stream_requires_owner(self, authenticated_client):
+        from models import User
+        other = User(username='other')
+        other.set_password('pass')
+        db.session.add(other)
+        db.session.commit()
+        from models import ProcessingResult
+        result = ProcessingResult(user_id=other.id, status='processing')
+        db.session.add(result)
+        db.session.commit()
+
+        response = authenticated_client.get(f'/api/result/{result.id}/events')
+        assert response.status_code == 403
+
+
+class TestBackgroundProcessing:
+    """Tests for resumable background processing."""
+
+    def test_resume_skips_completed_stages(self, client, mock_heavy_functions):
+        import app as app_module
+        from models import User, ProcessingResult, StageResult
+
+        user = User(username='resumeuser')
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.flush()
+        result = ProcessingResult(user_id=user.id, status='processing', current_stage='ner',
+                                  original_text='saved text')
+        db.session.add(result)
+        db.session.flush()
+        db.session.add(StageResult(result_id=result.id, stage='recognizing', status='completed'))
+        db.session.commit()
+        result_id = result.id
+
+        app_module.process_in_background(result_id, 'missing.jpg', 'ocr', 'easyocr', False)
+
+        app_module.perform_ocr.assert_not_called()
+        app_module.perform_ner_spans.assert_called_once_with('saved text')
+        db.session.expire_all()
+        result = ProcessingResult.query.get(result_id)
+        assert result.status == 'completed'
+        assert json.loads(result.entities_json) == [{'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'}]
+        assert result.processed_text_html is None
+        stages = {row.stage: row for row in StageResult.query.filter_by(result_id=result_id)}
+        assert stages['relations'].status == 'completed'
+        assert stages['relations'].duration_seconds >= 0
+
+    def test_model_server_error_requeues_job(self, client, mock_heavy_functions, monkeypatch):
+        import app as app_module
+        from model_server import ModelServerError
+        from models import User, ProcessingResult, StageResult, Job
+
+        def call(op, on_event=None, **args):
+            if op == 'relations':
+                raise ModelServerError('Model server is not running')
+            return {'ocr': 'server text', 'ner': [], 'relations_version': 'v1'}[op]
+
+        monkeypatch.setattr('app.model_client', MagicMock(call=MagicMock(side_effect=call)))
+        monkeypatch.setattr('app._relation_cache_version', None)
+        user = User(username='retryuser')
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.flush()
+        result = ProcessingResult(user_id=user.id, status='processing')
+        db.session.add(result)
+        db.session.flush()
+        app_module.job_store.create(result.id, {'filepath': 'scan.jpg', 'text_type': 'ocr',
+                                                'ocr_model': 'easyocr', 'translate': False})
+        db.session.commit()
+        result_id = result.id
+
+        app_module.run_job(result_id)
+
+        db.session.expire_all()
+        assert Job.query.filter_by(result_id=result_id).first().status == 'queued'
+        result = ProcessingResult.query.get(result_id)
+        assert result.status == 'processing'
+        assert result.current_stage == 'queued'
+        assert 'Model server is not running' in result.error_message
+        assert StageResult.query.filter_by(result_id=result_id, stage='relations').first().status == 'failed'
+        # Ошибка не попала в кэш
+        assert app_module.result_cache.stats()['kinds'].get('relations', {}).get('entries', 0) == 0
+
+    def test_htr_deskew_config(self, client, mock_heavy_functions, monkeypatch):
+        import app as app_module
+        monkeypatch.setitem(app.config, 'HTR_DESKEW', True)
+
+        assert app_module.recognize_text('scan.jpg', 'htr') == 'mock htr text'
+        app_module.perform_htr.assert_called_once_with('scan.jpg', deskew=True)
+
+    def test_legacy_ner_html(self, authenticated_client):
+        from models import User, ProcessingResult
+
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, status='completed', original_text='text',
+                                  processed_text_html='<mark class="ner-loc">text</mark>')
+        db.session.add(result)
+        db.session.commit()
+
+        stage = authenticated_client.get(f'/api/result/{result.id}/stages/ner').get_json()
+        assert stage['html'] == '<mark class="ner-loc">text</mark>'
+        assert stage['entities'] is None
+        assert authenticated_client.get(f'/api/result/{result.id}/entities').status_code == 404
+
+    def test_stage_rows_and_artifacts(self, authenticated_client, mock_heavy_functions):
+        import app as app_module
+        from models import User, ProcessingResult
+
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, status='processing', translated=True)
+        db.session.add(result)
+        db.session.commit()
+        result_id = result.id
+
+        app_module.process_in_background(result_id, 'missing.jpg', 'ocr', 'easyocr', True)
+        db.session.expire_all()
+
+        progress = authenticated_client.get(f'/api/result/{result_id}/progress').get_json()
+        assert progress['status'] == 'completed'
+        assert set(progress['stage_data']) == {'recognizing', 'translating', 'ner', 'relations'}
+        # Progress carries only small stage rows, not the artifacts
+        assert 'text' not in progress['stage_data']['recognizing']
+        assert progress['stage_data']['relations']['count'] == 1
+
+        stage = authenticated_client.get(f'/api/result/{result_id}/stages/translating').get_json()
+        assert stage['status'] == 'completed'
+        assert stage['text'] == 'translated: mock ocr text'
+
+        stage = authenticated_client.get(f'/api/result/{result_id}/stages/ner').get_json()
+        assert stage['count'] == 1
+        assert stage['entities'] == [{'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'}]
+        # HTML is rendered from the spans over the translated text
+        assert stage['html'] == '<mark class="ner-per">tran</mark>slated: mock ocr text'
+
+        entities = authenticated_client.get(f'/api/result/{result_id}/entities').get_json()
+        assert entities['text'] == 'translated: mock ocr text'
+        assert entities['entities'][0]['type'] == 'per'
+
+        page = authenticated_client.get(f'/result/{result_id}').get_data(as_text=True)
+        assert '<mark class="ner-per">tran</mark>slated' in page
+
+        response = authenticated_client.get(f'/api/result/{result_id}/stages/unknown')
+        assert response.status_code == 404
+
+    def test_partial_relations_published(self, authenticated_client, mock_heavy_functions, monkeypatch):
+        import app as app_module
+        from events import progress_events
+        from models import User, ProcessingResult
+
+        def extract_batch(texts, raise_errors=False, on_relation=None):
+            for callback in on_relation or []:
+                if callback:
+                    callback(('Иван', 'родитель', 'Пётр'))
+                    callback(('Анна', 'супруг', 'Иван'))
+            return [[('Иван', 'родитель', 'Пётр'), ('Анна', 'супруг', 'Иван')] for _ in texts]
+
+        monkeypatch.setattr('app.extract_relations_batch', extract_batch)
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, status='processing')
+        db.session.add(result)
+        db.session.commit()
+        result_id = result.id
+
+        subscriber = progress_events.subscribe(result_id)
+        try:
+            app_module.process_in_background(result_id, 'missing.jpg', 'ocr', 'easyocr', False)
+        finally:
+            progress_events.unsubscribe(result_id, subscriber)
+        events = []
+        while not subscriber.empty():
+            events.append(subscriber.get_nowait())
+
+        partial = [event['stage_data']['relations'] for event in events
+                   if event['stage_data'].get('relations', {}).get('status') == 'running']
+        assert [info['count'] for info in partial] == [1, 2]
+        assert [info['relation'] for info in partial] == [('Иван', 'родитель', 'Пётр'), ('Анна', 'супруг', 'Иван')]
+        assert events[-1]['status'] == 'completed'
+
+    def test_auto_ocr_model(self, authenticated_client, mock_heavy_functions, monkeypatch):
+        import app as app_module
+        from models import User, ProcessingResult
+
+        monkeypatch.setattr('app.perform_auto_ocr', MagicMock(return_value='mock auto text'))
+        monkeypatch.setitem(app.config, 'OCR_AUTO_MIN_CONFIDENCE', 60.0)
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, status='processing')
+        db.session.add(result)
+        db.session.commit()
+
+        app_module.process_in_background(result.id, 'scan.jpg', 'ocr', 'auto', False)
+
+        app_module.perform_auto_ocr.assert_called_once_with('scan.jpg', min_confidence=60.0, page_share=0.5)
+        app_module.perform_ocr.assert_not_called()
+        app_module.perform_tesseract_ocr.assert_not_called()
+        app_module.perform_ner_spans.assert_called_once_with('mock auto text')
+
+    def test_entities_on_original_text(self, authenticated_client):
+        from models import User, ProcessingResult
+
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, status='completed', translated=True,
+                                  original_text='Иванъ  въ Москвѣ', translated_text='Иван в Москве',
+                                  entities_json=json.dumps([
+                                      {'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'},
+                                      {'start': 7, 'stop': 13, 'type': 'loc', 'source': 'ner'}]))
+        db.session.add(result)
+        db.session.commit()
+
+        data = authenticated_client.get(f'/api/result/{result.id}/entities?text=original').get_json()
+        assert data['text'] == 'Иванъ  въ Москвѣ'
+        assert [data['text'][s['start']:s['stop']] for s in data['entities']] == ['Иван', 'Москвѣ']
+
+
+class TestResultsListing:
+    """Tests for the paginated results listing."""
+
+    def _create_results(self, count):
+        from datetime import datetime
+        from models import User, ProcessingResult
+
+        user = User.query.filter_by(username='testuser').first()
+        # Same created_at for all rows, so ordering falls back to id
+        created_at = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(count):
+            db.session.add(ProcessingResult(user_id=user.id, created_at=created_at,
+                                            image_filename=f'doc{i}.jpg', status='completed',
+                                            original_text=f'text {i} ' + 'x' * 500))
+        db.session.commit()
+
+    def test_api_pages_with_cursor(self, authenticated_client):
+        self._create_results(5)
+
+        first = authenticated_client.get('/api/results?limit=2').get_json()
+        assert [r['image_filename'] for r in first['results']] == ['doc4.jpg', 'doc3.jpg']
+        assert first['results'][0]['preview'] == ('text 4 ' + 'x' * 500)[:200]
+        assert 'original_text' not in first['results'][0]
+
+        second = authenticated_client.get(f"/api/results?limit=2&cursor={first['next_cursor']}").get_json()
+        assert [r['image_filename'] for r in second['results']] == ['doc2.jpg', 'doc1.jpg']
+
+        last = authenticated_client.get(f"/api/results?limit=2&cursor={second['next_cursor']}").get_json()
+        assert [r['image_filename'] for r in last['results']] == ['doc0.jpg']
+        assert last['next_cursor'] is None
+
+    def test_api_rejects_bad_cursor_and_limit(self, authenticated_client):
+        assert authenticated_client.get('/api/results?cursor=bogus').status_code == 400
+        assert authenticated_client.get('/api/results?limit=0').status_code == 400
+
+    def test_my_results_page(self, authenticated_client):
+        app.config['RESULTS_PAGE_SIZE'] = 2
+        try:
+            self._create_results(3)
+            page = authenticated_client.get('/my_results').get_data(as_text=True)
+            assert 'doc2.jpg' in page and 'doc0.jpg' not in page
+            assert 'cursor=' in page
+        finally:
+            app.config['RESULTS_PAGE_SIZE'] = 20
+
+
+class TestNerCheck:
+    """Tests for the NER check page."""
+
+    def test_repeated_text_uses_cache(self, authenticated_client, mock_heavy_functions):
+        import app as app_module
+
+        for _ in range(2):
+            response = authenticated_client.post('/ner_check', data={'text': 'Иван живет в Москве.'})
+            assert response.status_code == 200
+            assert '<mark class="ner-per">Иван</mark>' in response.get_data(as_text=True)
+
+        app_module.perform_ner_spans.assert_called_once()
+        app_module.extract_relations_batch.assert_called_once()
+        stats = authenticated_client.get('/api/stats').get_json()['cache']['kinds']
+        assert stats['ner']['hits'] >= 1
+        assert stats['relations']['hits'] >= 1
+
+
+class TestRelationModes:
+    """Tests for RELATIONS_MODE selection."""
+
+    TEXT = 'Иван родился в Москве.'
+
+    @pytest.fixture
+    def spans(self, monkeypatch):
+        monkeypatch.setattr('app.perform_ner_spans', MagicMock(return_value=[
+            {'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'},
+            {'start': 15, 'stop': 21, 'type': 'loc', 'source': 'ner'},
+        ]))
+
+    def test_rules_mode_skips_llm(self, authenticated_client, mock_heavy_functions, spans, monkeypatch):
+        import app as app_module
+        monkeypatch.setitem(app.config, 'RELATIONS_MODE', 'rules')
+
+        relations, source = app_module.relations_for_text(self.TEXT)
+
+        assert relations == [('Иван', 'место рождения', 'Москве')]
+        assert source == 'rules'
+        app_module.extract_relations_batch.assert_not_called()
+
+    def test_fallback_on_low_coverage(self, authenticated_client, mock_heavy_functions, spans, monkeypatch):
+        import app as app_module
+        monkeypatch.setitem(app.config, 'RELATIONS_MODE', 'rules-then-llm')
+
+        assert app_module.relations_for_text(self.TEXT)[1] == 'rules'
+        monkeypatch.setitem(app.config, 'RELATIONS_RULES_MIN_COVERAGE', 1.1)
+        relations, source = app_module.relations_for_text(self.TEXT)
+        assert source == 'llm'
+        assert relations == [('Entity1', 'relation_type', 'Entity2')]
+
+    def test_unknown_mode_is_rejected(self, authenticated_client, mock_heavy_functions, spans, monkeypatch):
+        import app as app_module
+        monkeypatch.setitem(app.config, 'RELATIONS_MODE', 'rules-than-llm')
+
+        with pytest.raises(ValueError, match='Unknown RELATIONS_MODE'):
+            app_module.relations_for_text(self.TEXT)
+        app_module.extract_relations_batch.assert_not_called()
+        assert app_module.relations_mode('rules-then-llm-on-low-coverage') == 'rules-then-llm'
+        assert app_module.relations_mode(' rules ') == 'rules'
+
+
+class TestModelServer:
+    """Tests for the thin-client mode against an in-test model server."""
+
+    @pytest.fixture
+    def model_server(self, mock_heavy_functions, monkeypatch):
+        import shutil
+        import tempfile
+        import threading
+        import app as app_module
+        from model_server import ModelServer, ModelClient
+
+        monkeypatch.setattr('app.perform_ner_spans_batch', MagicMock(side_effect=lambda texts: [
+            [{'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'}] for _ in texts
+        ]))
+        directory = tempfile.mkdtemp(prefix='ms-')
+        socket_path = os.path.join(directory, 'models.sock')
+        server = ModelServer(socket_path, app_module.model_server_handlers())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setattr('app.model_client', ModelClient(socket_path, timeout=5))
+        monkeypatch.setattr('app._relation_cache_version', None)
+        yield server
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def test_document_processed_by_server(self, authenticated_client, model_server):
+        import app as app_module
+        from models import User, ProcessingResult
+
+        user = User.query.filter_by(username='testuser').first()
+        result = ProcessingResult(user_id=user.id, status='processing')
+        db.session.add(result)
+        db.session.commit()
+        result_id = result.id
+
+        app_module.process_in_background(result_id, 'scan.jpg', 'ocr', 'tesseract', False)
+
+        app_module.perform_tesseract_ocr.assert_called_once_with(os.path.abspath('scan.jpg'), workers=1)
+        app_module.perform_ner_spans.assert_not_called()
+        app_module.perform_ner_spans_batch.assert_called_once_with(['mock tesseract text'])
+        db.session.expire_all()
+        result = ProcessingResult.query.get(result_id)
+        assert result.status == 'completed'
+        assert result.original_text == 'mock tesseract text'
+        assert json.loads(result.relations_json) == [['Entity1', 'relation_type', 'Entity2']]
+
+    def test_relation_cache_version_from_server(self, model_server, monkeypatch):
+        import app as app_module
+        from relations import cache_version
+
+        calls = []
+        call = app_module.model_client.call
+        monkeypatch.setattr(app_module.model_client, 'call', lambda op, **kwargs: calls.append(op) or call(op, **kwargs))
+
+        assert app_module.relation_cache_version() == cache_version(app_module.default_device())
+        assert app_module.relation_cache_version() == cache_version(app_module.default_device())
+        # Версию спрашивают у сервера один раз
+        assert calls == ['relations_version']
+
+    def test_readyz_and_stats_from_server(self, authenticated_client, model_server, monkeypatch):
+        monkeypatch.setitem(app.config, 'WARMUP_MODELS', ['relations'])
+
+        response = authenticated_client.get('/readyz')
+        assert response.status_code == 503
+        assert response.get_json()['models']['relations'] is False
+
+        stats = authenticated_client.get('/api/stats').get_json()
+        assert stats['model_server']['ner_batching']['max_batch'] == app.config['NER_BATCH_SIZE']
+        assert 'relations_batching' in stats['model_server']
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
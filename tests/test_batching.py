@@ -0,0 +1,43 @@
+"""Tests for the dynamic batching module."""
+
+import threading
+
+import pytest
+
+from batching import DynamicBatcher
+
+
+def test_items_are_batched_in_order():
+    """Items from concurrent callers are processed together, results go back to each caller."""
+    calls = []
+
+    def process_batch(items):
+        calls.append(list(items))
+        return [item.upper() for item in items]
+
+    batcher = DynamicBatcher(process_batch, max_batch=3, max_wait=0.5, name='test-batcher')
+    results = {}
+    threads = [threading.Thread(target=lambda item=item: results.update({item: batcher.run(item)}))
+               for item in ('иван', 'пётр', 'анна')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [sorted(call) for call in calls] == [['анна', 'иван', 'пётр']]
+    assert results == {'иван': 'ИВАН', 'пётр': 'ПЁТР', 'анна': 'АННА'}
+    assert batcher.stats()['batches'] == 1
+
+
+def test_error_reaches_every_caller_and_worker_survives():
+    """A failing batch raises in its callers; later batches still run."""
+    def process_batch(items):
+        if 'ошибка' in items:
+            raise RuntimeError('model error')
+        return items
+
+    batcher = DynamicBatcher(process_batch, max_batch=2, max_wait=0.01)
+
+    with pytest.raises(RuntimeError, match='model error'):
+        batcher.run('ошибка')
+    assert batcher.run('текст') == 'текст'
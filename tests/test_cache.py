@@ -0,0 +1,72 @@
+"""Tests for the result cache module."""
+
+import pytest
+from unittest.mock import MagicMock
+from app import app, db
+from cache import ResultCache, make_key, normalize_text
+
+
+@pytest.fixture
+def cache():
+    """Create a small cache on the application database."""
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield ResultCache(app, max_bytes=1000)
+        db.drop_all()
+
+
+class TestResultCache:
+    """Tests for the ResultCache class."""
+
+    def test_hit_after_miss(self, cache):
+        compute = MagicMock(return_value=[['Иван', 'родитель', 'Пётр']])
+
+        first = cache.get_or_compute('relations', 'Иван  и Пётр', 'm', 'v1', compute)
+        second = cache.get_or_compute('relations', ' Иван и\nПётр ', 'm', 'v1', compute)
+
+        assert first == second == [['Иван', 'родитель', 'Пётр']]
+        compute.assert_called_once()
+        stats = cache.stats()['kinds']['relations']
+        assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+        assert stats['hit_rate'] == 0.5
+
+    def test_key_depends_on_model_version_and_exact_text(self, cache):
+        assert make_key('ner', 'text', 'm', 'v1') != make_key('ner', 'text', 'm', 'v2')
+        assert make_key('ner', 'text', 'm', 'v1') != make_key('relations', 'text', 'm', 'v1')
+        assert normalize_text('  a \n b ') == 'a b'
+
+        compute = MagicMock(return_value=[])
+        cache.get_or_compute('ner', 'a  b', 'm', 'v1', compute, normalize=False)
+        cache.get_or_compute('ner', 'a b', 'm', 'v1', compute, normalize=False)
+        assert compute.call_count == 2
+
+    def test_none_is_not_cached(self, cache):
+        compute = MagicMock(return_value=None)
+        assert cache.get_or_compute('relations', 'text', 'm', 'v1', compute) is None
+        assert cache.get_or_compute('relations', 'text', 'm', 'v1', compute) is None
+        assert compute.call_count == 2
+
+    def test_lru_eviction(self, cache):
+        value = 'x' * 300
+        for text in ('a', 'b', 'c'):
+            cache.get_or_compute('ner', text, 'm', 'v1', lambda: value)
+        # 'a' used recently, so 'b' is the least recently used entry
+        cache.get_or_compute('ner', 'a', 'm', 'v1', MagicMock())
+        cache.get_or_compute('ner', 'd', 'm', 'v1', lambda: value)
+
+        stats = cache.stats()['kinds']['ner']
+        assert stats['evictions'] == 1
+        assert stats['bytes'] <= 1000
+        compute = MagicMock(return_value=value)
+        cache.get_or_compute('ner', 'b', 'm', 'v1', compute)
+        compute.assert_called_once()
+        cache.get_or_compute('ner', 'a', 'm', 'v1', compute)
+        compute.assert_called_once()
+
+    def test_disabled(self, cache):
+        cache.enabled = False
+        compute = MagicMock(return_value=[])
+        cache.get_or_compute('ner', 'text', 'm', 'v1', compute)
+        cache.get_or_compute('ner', 'text', 'm', 'v1', compute)
+        assert compute.call_count == 2
@@ -0,0 +1,38 @@
+"""Tests for the progress events module."""
+
+from events import EventBus
+
+
+class TestEventBus:
+    """Tests for the EventBus class."""
+
+    def test_publish_to_subscribers(self):
+        """Test that events reach every subscriber of the channel only."""
+        bus = EventBus()
+        first = bus.subscribe(1)
+        second = bus.subscribe(1)
+        other = bus.subscribe(2)
+
+        assert bus.publish(1, {'current_stage': 'ner'}) == 2
+        assert first.get_nowait() == {'current_stage': 'ner'}
+        assert second.get_nowait() == {'current_stage': 'ner'}
+        assert other.empty()
+
+    def test_unsubscribe(self):
+        """Test that unsubscribed queues no longer receive events."""
+        bus = EventBus()
+        subscriber = bus.subscribe(1)
+        bus.unsubscribe(1, subscriber)
+
+        assert bus.publish(1, {'current_stage': 'ner'}) == 0
+        assert bus.subscriber_count(1) == 0
+
+    def test_slow_subscriber_drops_oldest(self):
+        """Test that a full subscriber queue keeps the newest events."""
+        bus = EventBus(max_queue=2)
+        subscriber = bus.subscribe(1)
+        for stage in ('recognizing', 'ner', 'relations'):
+            bus.publish(1, {'current_stage': stage})
+
+        assert subscriber.get_nowait()['current_stage'] == 'ner'
+        assert subscriber.get_nowait()['current_stage'] == 'relations'
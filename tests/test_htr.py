@@ -25,6 +25,43 @@ def test_group_by_lines_empty():
     assert result == []
 
 
+def test_group_by_lines_running_mean():
+    """Тест группировки: центр строки - среднее по фрагментам"""
+    detections = [
+        ([[0, 0], [10, 0], [10, 20], [0, 20]], 'a', 0.9),     # center 10
+        ([[20, 8], [30, 8], [30, 28], [20, 28]], 'b', 0.9),   # center 18
+        ([[40, 14], [50, 14], [50, 34], [40, 34]], 'c', 0.9),  # center 24
+    ]
+
+    # 24 далеко от первого центра (10), но близко к среднему (14)
+    result = group_by_lines(detections, y_tolerance=10)
+    assert [[t for _, t, _ in line] for line in result] == [['a', 'b', 'c']]
+
+
+def skewed_detections():
+    """Две строки по 6 фрагментов с наклоном 0.08"""
+    detections = []
+    for line_y in (100, 160):
+        for col in range(6):
+            x = col * 100
+            y = line_y + col * 8  # наклон 0.08
+            bbox = [[x, y], [x + 90, y + 7], [x + 90, y + 27], [x, y + 20]]
+            detections.append((bbox, f'{line_y}-{col}', 0.9))
+    return detections
+
+
+def test_group_by_lines_deskew():
+    """Тест группировки наклонных строк"""
+    detections = skewed_detections()
+
+    assert len(group_by_lines(detections, y_tolerance=10)) > 2
+
+    result = group_by_lines(detections, y_tolerance=10, deskew=True)
+    assert len(result) == 2
+    assert all(len(line) == 6 for line in result)
+    assert all(text.startswith('100') for _, text, _ in result[0])
+
+
 @patch('htr.cv2.imread', return_value=None)
 def test_perform_htr_file_not_found(mock_imread):
     """Тест perform_htr с несуществующим файлом"""
@@ -35,7 +72,7 @@ def test_perform_htr_file_not_found(mock_imread):
 @patch('htr.cv2.imread')
 @patch('htr.cv2.cvtColor')
 @patch('htr.Image.fromarray')
-@patch('htr.easyocr.Reader')
+@patch('htr.get_reader')
 def test_perform_htr_no_detections(mock_reader_class,
                                    mock_fromarray,
                                    mock_cvtColor,
@@ -52,3 +89,89 @@ def test_perform_htr_no_detections(mock_reader_class,
     lines, full_text = perform_htr('dummy_path.jpg')
     assert lines == []
     assert full_text == ''
+
+
+def _fake_trocr():
+    """Processor/model pair that 'recognizes' a crop as its width."""
+    import torch
+
+    processor = MagicMock()
+    processor.side_effect = lambda images, return_tensors: MagicMock(
+        pixel_values=torch.tensor([[img.width] for img in images]))
+    processor.batch_decode.side_effect = lambda outputs, skip_special_tokens: [
+        f'w{int(row[0])}' for row in outputs]
+
+    model = MagicMock()
+    model.dtype = torch.float32
+    model.generate.side_effect = lambda pixel_values: pixel_values
+    return processor, model
+
+
+@patch('htr.default_device', return_value='cpu')
+@patch('htr.load_trocr')
+@patch('htr.get_reader')
+@patch('htr.cv2.imread')
+def test_perform_htr_deskew(mock_imread, mock_get_reader, mock_load_trocr, mock_device):
+    """Тест perform_htr на наклонной странице: deskew доходит до группировки строк"""
+    mock_imread.return_value = np.full((300, 700, 3), 255, dtype=np.uint8)
+    mock_get_reader.return_value.readtext.return_value = skewed_detections()
+    mock_load_trocr.side_effect = lambda *args: _fake_trocr()
+
+    lines, _ = perform_htr('skewed.jpg')
+    assert len(lines) > 2
+
+    lines, full_text = perform_htr('skewed.jpg', deskew=True)
+    # Каждая строка вырезана целиком по ширине всех шести фрагментов
+    assert lines == ['w590', 'w590']
+    assert full_text == 'w590\nw590'
+
+
+def test_crop_lines_skips_degenerate():
+    """Тест вырезания строк: пустые и вырожденные строки дают None"""
+    from PIL import Image
+    from htr import crop_lines
+
+    image = Image.new('RGB', (200, 100))
+    lines = [
+        [([[10, 10], [100, 10], [100, 30], [10, 30]], 'a', 0.9)],
+        [],
+        [([[10, 50], [10, 50], [10, 50], [10, 50]], 'b', 0.9)],
+    ]
+    crops = crop_lines(image, lines)
+    assert crops[0].size == (90, 20)
+    assert crops[1] is None
+    assert crops[2] is None
+
+
+def test_recognize_lines_batched_matches_per_line():
+    """Тест пакетного распознавания: порядок строк сохраняется"""
+    from PIL import Image
+    from htr import recognize_lines
+
+    images = [Image.new('RGB', (w, 20)) for w in (300, 50, 120, 80, 500)]
+    images.insert(2, None)
+    processor, model = _fake_trocr()
+
+    per_line = recognize_lines(images, processor, model, 'cpu', batch_size=1)
+    assert model.generate.call_count == 5
+
+    model.generate.reset_mock()
+    batched = recognize_lines(images, processor, model, 'cpu', batch_size=2)
+    assert model.generate.call_count == 3
+
+    assert batched == per_line
+    assert batched == ['w300', 'w50', '', 'w120', 'w80', 'w500']
+
+
+def test_recognize_lines_buckets_by_width():
+    """Тест группировки по ширине: короткие строки в одном пакете"""
+    from PIL import Image
+    from htr import recognize_lines
+
+    images = [Image.new('RGB', (w, 20)) for w in (400, 40, 410, 45)]
+    processor, model = _fake_trocr()
+
+    recognize_lines(images, processor, model, 'cpu', batch_size=2)
+    batches = [sorted(img.width for img in call.kwargs['images'])
+               for call in processor.call_args_list]
+    assert batches == [[40, 45], [400, 410]]
@@ -0,0 +1,147 @@
+"""Tests for the job scheduler module."""
+
+import threading
+import pytest
+from jobs import JobScheduler, QueueFullError
+
+
+class TestJobScheduler:
+    """Tests for the JobScheduler class."""
+
+    def test_runs_jobs(self):
+        """Test that submitted jobs are executed by workers."""
+        scheduler = JobScheduler(workers=2, max_queue=10)
+        results = []
+        for i in range(5):
+            scheduler.submit(i, results.append, i)
+        scheduler.join()
+        assert sorted(results) == [0, 1, 2, 3, 4]
+
+    def test_queue_full(self):
+        """Test that a full queue rejects new jobs with position info."""
+        scheduler = JobScheduler(workers=1, max_queue=2)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_job():
+            started.set()
+            release.wait(5)
+
+        scheduler.submit('running', blocking_job)
+        started.wait(5)
+        assert scheduler.submit('a', lambda: None) == 1
+        assert scheduler.submit('b', lambda: None) == 2
+        assert scheduler.position('running') == 0
+        assert scheduler.position('b') == 2
+
+        with pytest.raises(QueueFullError) as exc_info:
+            scheduler.submit('c', lambda: None)
+        assert exc_info.value.queue_size == 2
+
+        release.set()
+        scheduler.join()
+        assert scheduler.position('b') is None
+
+    def test_failed_job_does_not_kill_worker(self):
+        """Test that an exception in a job leaves the worker running."""
+        scheduler = JobScheduler(workers=1, max_queue=10)
+        results = []
+
+        def failing():
+            raise RuntimeError('boom')
+
+        scheduler.submit(1, failing)
+        scheduler.submit(2, results.append, 2)
+        scheduler.join()
+        assert results == [2]
+        assert scheduler.eta_seconds(1) is not None
+
+
+@pytest.fixture
+def store():
+    """JobStore over a fresh database with one processing result."""
+    from app import app
+    from models import db, User, ProcessingResult
+    from jobs import JobStore
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='jobuser')
+        user.set_password('pass')
+        db.session.add(user)
+        db.session.flush()
+        result = ProcessingResult(user_id=user.id, status='processing')
+        db.session.add(result)
+        db.session.flush()
+
+        store = JobStore(app, lease_seconds=60, heartbeat_seconds=1, max_attempts=2)
+        store.create(result.id, {'filepath': 'x.jpg'})
+        db.session.commit()
+        store.result_id = result.id
+        yield store
+        db.session.remove()
+        db.drop_all()
+
+
+class TestJobStore:
+    """Tests for the JobStore class."""
+
+    def test_lease_is_exclusive(self, store):
+        """Test that a leased job cannot be leased by another owner."""
+        assert store.lease(store.result_id, 'a') == {'filepath': 'x.jpg'}
+        assert store.lease(store.result_id, 'b') is None
+        assert store.recoverable() == []
+
+    def test_new_job_left_to_its_creator(self, store):
+        """Test that a just-created job is not recovered during one lease interval."""
+        from datetime import datetime, timedelta
+        from models import db, Job
+
+        assert store.recoverable() == []
+        with store.app.app_context():
+            job = Job.query.filter_by(result_id=store.result_id).first()
+            job.created_at = datetime.utcnow() - timedelta(seconds=61)
+            db.session.commit()
+        assert store.recoverable() == [store.result_id]
+
+    def test_expired_lease_is_recovered(self, store):
+        """Test that a job whose owner died is leased again."""
+        from datetime import datetime, timedelta
+        from models import db, Job
+
+        store.lease(store.result_id, 'dead')
+        with store.app.app_context():
+            job = Job.query.filter_by(result_id=store.result_id).first()
+            job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+            db.session.commit()
+
+        assert store.recoverable() == [store.result_id]
+        assert store.lease(store.result_id, 'alive') is not None
+        assert store.heartbeat(store.result_id, 'alive') is True
+        assert store.heartbeat(store.result_id, 'dead') is False
+
+    def test_retries_until_max_attempts(self, store):
+        """Test that failed jobs are re-queued until attempts run out."""
+        from models import Job
+
+        store.lease(store.result_id, 'a')
+        assert store.fail(store.result_id, 'a', 'boom') is True
+        assert store.recoverable() == [store.result_id]
+
+        store.lease(store.result_id, 'b')
+        assert store.fail(store.result_id, 'b', 'boom again') is False
+        assert store.recoverable() == []
+        with store.app.app_context():
+            job = Job.query.filter_by(result_id=store.result_id).first()
+            assert job.status == 'failed'
+            assert job.last_error == 'boom again'
+
+    def test_complete(self, store):
+        """Test that completed jobs are not recovered."""
+        from models import Job
+
+        store.lease(store.result_id, 'a')
+        store.complete(store.result_id, 'a')
+        assert store.recoverable() == []
+        with store.app.app_context():
+            assert Job.query.filter_by(result_id=store.result_id).first().status == 'completed'
@@ -0,0 +1,103 @@
+"""Tests for the model server module."""
+
+import os
+import shutil
+import tempfile
+import threading
+
+import pytest
+
+from model_server import ModelServer, ModelClient, ModelServerError
+
+
+@pytest.fixture
+def socket_path():
+    # Путь Unix-сокета ограничен ~100 символами, tmp_path бывает длиннее
+    directory = tempfile.mkdtemp(prefix='ms-')
+    yield os.path.join(directory, 'models.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def serve(socket_path):
+    servers = []
+
+    def start(handlers):
+        server = ModelServer(socket_path, handlers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return ModelClient(socket_path, timeout=5)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_call_returns_result(serve):
+    client = serve({'upper': lambda args, emit: args['text'].upper()})
+
+    assert client.call('upper', text='иван') == 'ИВАН'
+    assert client.call('upper', text='пётр') == 'ПЁТР'
+
+
+def test_events_are_streamed_before_result(serve):
+    def relations(args, emit):
+        for relation in (['Иван', 'родитель', 'Пётр'], ['Анна', 'супруг', 'Иван']):
+            if emit:
+                emit(relation)
+        return 'done'
+
+    client = serve({'relations': relations})
+    events = []
+
+    assert client.call('relations', on_event=events.append, text='...') == 'done'
+    assert events == [['Иван', 'родитель', 'Пётр'], ['Анна', 'супруг', 'Иван']]
+    # Без обработчика сервер события не отправляет
+    assert client.call('relations', text='...') == 'done'
+
+
+def test_errors_are_raised_by_client(serve):
+    def fail(args, emit):
+        raise RuntimeError('model crashed')
+
+    client = serve({'fail': fail})
+
+    with pytest.raises(ModelServerError, match='RuntimeError: model crashed'):
+        client.call('fail')
+    with pytest.raises(ModelServerError, match='BadRequest'):
+        client.call('unknown')
+
+
+def test_concurrent_calls_share_server(serve):
+    barrier = threading.Barrier(4)
+
+    def wait(args, emit):
+        # Все четыре запроса должны обслуживаться одновременно
+        barrier.wait(timeout=5)
+        return args['value'] * 2
+
+    client = serve({'wait': wait})
+    results = {}
+    threads = [threading.Thread(target=lambda v=v: results.update({v: client.call('wait', value=v)}))
+               for v in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {0: 0, 1: 2, 2: 4, 3: 6}
+
+
+def test_unavailable_server(socket_path):
+    with pytest.raises(ModelServerError, match='unavailable'):
+        ModelClient(socket_path, timeout=1).call('ner', text='Иван')
+
+
+def test_stale_socket_is_replaced(serve, socket_path):
+    open(socket_path, 'w').close()
+    client = serve({'ping': lambda args, emit: 'pong'})
+
+    assert client.call('ping') == 'pong'
+    with pytest.raises(ModelServerError, match='already running'):
+        ModelServer(socket_path, {})
@@ -0,0 +1,31 @@
+"""Tests for database model helpers."""
+
+from sqlalchemy import create_engine, inspect, text
+from models import db, enable_sqlite_tuning
+
+
+def test_enable_sqlite_tuning(tmp_path):
+    """Test that WAL, synchronous=NORMAL and the busy timeout are applied."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    enable_sqlite_tuning(engine, busy_timeout_ms=1234)
+
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        # 1 == NORMAL
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+    engine.dispose()
+
+
+def test_listing_indexes(tmp_path):
+    """Test that listing and login lookups are backed by indexes."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    db.metadata.create_all(engine)
+
+    inspector = inspect(engine)
+    result_indexes = {i['name']: i['column_names'] for i in inspector.get_indexes('processing_results')}
+    assert result_indexes['ix_processing_results_user_id_created_at'] == ['user_id', 'created_at']
+    # Логин ищет по username: его покрывает индекс ограничения UNIQUE, отдельный не нужен
+    assert {'username'} == {column for c in inspector.get_unique_constraints('users') for column in c['column_names']}
+    assert inspector.get_indexes('users') == []
+    engine.dispose()
@@ -1,5 +1,30 @@
+import re
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
-from ner import perform_ner, find_dates, annotate_text, translate_text
+from ner import (perform_ner, perform_ner_batch, iter_dates, merge_spans, entity_spans, perform_ner_spans, perform_ner_spans_batch, render_entities,
+                 sentence_windows, find_dates, annotate_text, translate_text, NER_WINDOW_CHARS)
+
+
+class FakeNER:
+    """Tags capitalized words as PER, like a context-free Slovnet model."""
+
+    def __init__(self):
+        self.batches = []
+
+    def map(self, texts):
+        texts = list(texts)
+        self.batches.append(len(texts))
+        for text in texts:
+            yield self._markup(text)
+
+    def __call__(self, text):
+        return self._markup(text)
+
+    @staticmethod
+    def _markup(text):
+        spans = [SimpleNamespace(start=m.start(), stop=m.end(), type='PER')
+                 for m in re.finditer(r'[А-ЯЁ][а-яё]+', text)]
+        return SimpleNamespace(text=text, spans=spans)
 
 
 @patch('ner.NER.load')
@@ -20,12 +45,13 @@ def test_perform_ner(mock_navec_load, mock_ner_load):
     mock_span.type = 'PER'
     mock_markup.spans = [mock_span]
     mock_markup.text = 'Тест текст'
-    mock_ner_instance.return_value = mock_markup
+    mock_ner_instance.map.side_effect = lambda chunks: iter([mock_markup])
 
-    with patch('ner.annotate_text') as mock_annotate:
-        mock_annotate.return_value = 'annotated text'
+    with patch('ner.render_entities') as mock_render:
+        mock_render.return_value = 'annotated text'
         result = perform_ner('Тест текст')
         assert result == 'annotated text'
+    mock_ner_instance.map.assert_called_once()
 
 
 def test_find_dates():
@@ -71,3 +97,113 @@ def test_translate_text():
     expected = 'Некоторый текст с дореволюционными буквами и е'
     result = translate_text(input_text)
     assert result == expected
+
+
+def test_sentence_windows():
+    """Тест разбиения текста на окна из целых предложений"""
+    text = 'Иван живет в Москве. Он врач. Пётр живет в Туле.'
+    windows = sentence_windows(text, max_chars=30)
+
+    assert windows == [(0, 'Иван живет в Москве. Он врач.'), (30, 'Пётр живет в Туле.')]
+    for offset, window in windows:
+        assert text[offset:offset + len(window)] == window
+    assert sentence_windows('Короткий текст.') == [(0, 'Короткий текст.')]
+
+
+def test_perform_ner_batch_matches_perform_ner():
+    """Тест: пакетный NER с окнами совпадает с perform_ner"""
+    model = FakeNER()
+    texts = [
+        'Иван родился 15.03.1990 в Москве. ' * 20,
+        'Короткий текст без сущностей.',
+        '',
+        'В 1995 году Пётр уехал в Тулу. Там жил Сергей.',
+    ]
+
+    with patch('ner.get_ner_model', return_value=model):
+        expected = [perform_ner(text) for text in texts]
+        model.batches.clear()
+        result = perform_ner_batch(texts, window_chars=100)
+
+    assert result == expected
+    # Все окна всех текстов ушли в модель одним вызовом map
+    assert model.batches == [len(sentence_windows(texts[0], 100)) + 3]
+
+
+class ContextNER(FakeNER):
+    """Tags capitalized words only in texts that mention a birth, like a model using context."""
+
+    def __init__(self):
+        super().__init__()
+        self.inputs = []
+
+    def _markup(self, text):
+        self.inputs.append(text)
+        if 'родился' not in text:
+            return SimpleNamespace(text=text, spans=[])
+        return FakeNER._markup(text)
+
+
+def test_single_text_uses_windows():
+    """Тест: одиночный NER размечает те же окна, что и пакетный"""
+    text = 'Иван родился в Москве. ' + 'Пётр жил в Туле. ' * 100
+    model = ContextNER()
+
+    with patch('ner.get_ner_model', return_value=model):
+        spans = perform_ner_spans(text)
+        html = perform_ner(text)
+    batch = perform_ner_spans_batch([text], model=ContextNER())[0]
+
+    assert spans == batch
+    assert render_entities(text, spans) == html
+    # "родился" есть только в первом окне: целиком текст разметился бы везде
+    first = sentence_windows(text)[0][1]
+    assert len(first) < len(text)
+    assert spans and all(span['stop'] <= len(first) for span in spans)
+    assert max(len(chunk) for chunk in model.inputs) <= NER_WINDOW_CHARS
+
+
+def test_perform_ner_spans():
+    """Тест: спаны NER и дат, HTML из них совпадает с perform_ner"""
+    text = 'Иван родился 15.03.1990 в Москве.'
+    with patch('ner.get_ner_model', return_value=FakeNER()):
+        spans = perform_ner_spans(text)
+        html = perform_ner(text)
+
+    assert spans[0] == {'start': 0, 'stop': 4, 'type': 'per', 'source': 'ner'}
+    assert {'start': 13, 'stop': 23, 'type': 'date', 'source': 'date'} in spans
+    assert [span['start'] for span in spans] == sorted(span['start'] for span in spans)
+    assert render_entities(text, spans) == html
+
+    batch = perform_ner_spans_batch([text, text], model=FakeNER(), window_chars=20)
+    assert batch == [spans, spans]
+
+
+def test_iter_dates_kinds():
+    """Тест: один проход находит все виды дат без пересечений"""
+    text = 'Приказ от 15.03.1917 г., запись 1914-08-01, в 1995 году и в 1920-х годах.'
+    kinds = [(text[start:stop], kind) for start, stop, kind in iter_dates(text)]
+
+    assert kinds == [('15.03.1917', 'numeric'), ('1914-08-01', 'iso'),
+                     ('1995 году', 'year'), ('в 1920-х годах', 'decade')]
+    assert find_dates(text) == [(start, stop, 'date') for start, stop, _ in iter_dates(text)]
+
+
+def test_merge_spans_priority():
+    """Тест: сущность NER важнее даты, при равенстве - более длинный спан"""
+    org = {'start': 0, 'stop': 20, 'type': 'org', 'source': 'ner'}
+    inner_date = {'start': 6, 'stop': 15, 'type': 'date', 'source': 'date'}
+    date = {'start': 25, 'stop': 35, 'type': 'date', 'source': 'date'}
+    short_date = {'start': 30, 'stop': 40, 'type': 'date', 'source': 'date'}
+
+    assert merge_spans([date, inner_date, org, short_date]) == [org, date]
+    assert merge_spans([]) == []
+
+
+def test_entity_spans_no_nested_marks():
+    """Тест: дата внутри сущности не дает вложенной разметки"""
+    text = 'Завод 1905 года закрыт.'
+    spans = entity_spans(text, [(0, 15, 'org')])
+
+    assert spans == [{'start': 0, 'stop': 15, 'type': 'org', 'source': 'ner'}]
+    assert render_entities(text, spans) == '<mark class="ner-org">Завод 1905 года</mark> закрыт.'
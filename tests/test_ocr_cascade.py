@@ -0,0 +1,116 @@
+"""Tests for the Tesseract-first OCR cascade."""
+
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+import ocr_cascade
+from ocr_cascade import perform_auto_ocr, cascade_stats
+from tesseract_ocr import recognize_tesseract_lines
+
+
+def tesseract_data(words):
+    """image_to_data DICT output for (block, line, text, conf, left, top) words."""
+    data = {key: [] for key in ('block_num', 'par_num', 'line_num', 'text', 'conf',
+                                'left', 'top', 'width', 'height')}
+    for block, line, text, conf, left, top in words:
+        for key, value in (('block_num', block), ('par_num', 1), ('line_num', line), ('text', text),
+                           ('conf', conf), ('left', left), ('top', top), ('width', 50), ('height', 20)):
+            data[key].append(value)
+    return data
+
+
+PAGE = [
+    (1, 0, '', -1, 0, 0),
+    (1, 1, 'Метрическая', 95, 10, 10),
+    (1, 1, 'книга', 91, 70, 12),
+    (1, 2, 'Ивaн', 40, 10, 40),
+    (1, 2, 'Пeтров', 30, 70, 40),
+    (2, 1, '1890', 88, 10, 100),
+]
+
+
+@pytest.fixture
+def page(tmp_path):
+    path = tmp_path / 'page.png'
+    Image.new('RGB', (200, 140), 'white').save(path)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def tesseract(monkeypatch):
+    monkeypatch.setattr('tesseract_ocr.get_tesseract', lambda: '5.3.0')
+    cascade_stats.reset()
+    with patch('tesseract_ocr.pytesseract.image_to_data') as image_to_data:
+        yield image_to_data
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    with patch('ocr_cascade.get_reader') as get_reader:
+        yield get_reader.return_value
+
+
+def test_recognize_tesseract_lines(tesseract):
+    tesseract.return_value = tesseract_data(PAGE)
+
+    lines = recognize_tesseract_lines(Image.new('RGB', (200, 140)))
+
+    assert [line['text'] for line in lines] == ['Метрическая книга', 'Ивaн Пeтров', '1890']
+    assert lines[0]['box'] == (10, 10, 120, 32)
+    assert lines[1]['confidence'] == 35
+    assert [line['block'] for line in lines] == [1, 1, 2]
+
+
+def test_confident_page_skips_easyocr(tesseract, reader, page):
+    tesseract.return_value = tesseract_data([word for word in PAGE if word[2] not in ('Ивaн', 'Пeтров')])
+
+    text = perform_auto_ocr(page)
+
+    assert text == 'Метрическая книга\n\n1890'
+    reader.readtext.assert_not_called()
+    stats = cascade_stats.stats()
+    assert stats['pages_escalated'] == 0
+    assert stats['line_escalation_rate'] == 0
+
+
+def test_uncertain_lines_are_reread(tesseract, reader, page):
+    tesseract.return_value = tesseract_data(PAGE)
+    # Фрагменты EasyOCR приходят не по порядку
+    reader.readtext.return_value = [
+        [[[60, 0], [120, 0], [120, 20], [60, 20]], 'Петров', 0.9],
+        [[[0, 0], [50, 0], [50, 20], [0, 20]], 'Иван', 0.9],
+    ]
+
+    text = perform_auto_ocr(page)
+
+    assert text == 'Метрическая книга\nИван Петров\n\n1890'
+    crop = reader.readtext.call_args.args[0]
+    assert crop.shape == (28, 118)
+    stats = cascade_stats.stats()
+    assert stats['lines_escalated'] == 1
+    assert stats['lines'] == 3
+    assert stats['page_escalation_rate'] == 1.0
+    assert stats['pages_whole'] == 0
+
+
+def test_mostly_uncertain_page_goes_to_easyocr(tesseract, reader, page):
+    tesseract.return_value = tesseract_data(PAGE)
+    reader.readtext.return_value = [[[[0, 0]], 'Метрическая книга', 0.9], [[[0, 0]], 'Иван Петров', 0.8]]
+
+    text = perform_auto_ocr(page, page_share=0.3)
+
+    assert text == 'Метрическая книга Иван Петров'
+    reader.readtext.assert_called_once_with(page)
+    assert cascade_stats.stats()['lines_escalated'] == 3
+    assert cascade_stats.stats()['pages_whole'] == 1
+
+
+def test_empty_line_result_keeps_tesseract_text(tesseract, reader, page, monkeypatch):
+    monkeypatch.setattr(ocr_cascade, 'LINE_PADDING', 0)
+    tesseract.return_value = tesseract_data(PAGE)
+    reader.readtext.return_value = []
+
+    assert perform_auto_ocr(page) == 'Метрическая книга\nИвaн Пeтров\n\n1890'
+    assert reader.readtext.call_args.args[0].shape == (20, 110)
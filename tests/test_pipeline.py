@@ -0,0 +1,71 @@
+"""Tests for the stage pipeline module."""
+
+import threading
+import time
+import pytest
+from pipeline import Pipeline
+
+
+class TestPipeline:
+    """Tests for the Pipeline class."""
+
+    def test_runs_stages_in_order(self):
+        """Test that every stage sees the item in sequence."""
+        pipeline = Pipeline([
+            ('a', lambda doc: doc['trace'].append('a'), 1),
+            ('b', lambda doc: doc['trace'].append('b'), 1),
+        ])
+        doc = pipeline.run({'trace': []})
+        assert doc['trace'] == ['a', 'b']
+
+    def test_error_skips_remaining_stages(self):
+        """Test that a failing stage stops the item and re-raises."""
+        def fail(doc):
+            raise ValueError('bad page')
+
+        later = []
+        pipeline = Pipeline([('a', fail, 1), ('b', later.append, 1)])
+        with pytest.raises(ValueError):
+            pipeline.run({})
+        assert later == []
+        assert pipeline.stats()[0]['failed'] == 1
+
+    def test_stages_overlap_across_documents(self):
+        """Test that document 2 is recognized while document 1 is in a later stage."""
+        events = []
+        lock = threading.Lock()
+
+        def stage(name):
+            def run(doc):
+                with lock:
+                    events.append(('start', name, doc['id']))
+                time.sleep(0.05)
+                with lock:
+                    events.append(('end', name, doc['id']))
+            return run
+
+        pipeline = Pipeline([('ocr', stage('ocr'), 1), ('llm', stage('llm'), 1)])
+        threads = [threading.Thread(target=pipeline.run, args=({'id': i},)) for i in (1, 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # With one worker per stage, ocr of one doc runs while llm of the other does
+        llm_start = next(i for i, e in enumerate(events) if e[:2] == ('start', 'llm'))
+        second_ocr_end = [i for i, e in enumerate(events) if e[:2] == ('end', 'ocr')][1]
+        assert llm_start < second_ocr_end
+
+    def test_stats(self):
+        """Test that per-stage throughput metrics are reported."""
+        pipeline = Pipeline([('a', lambda doc: time.sleep(0.01), 2)])
+        for _ in range(3):
+            pipeline.run({})
+
+        stats = pipeline.stats()[0]
+        assert stats['stage'] == 'a'
+        assert stats['workers'] == 2
+        assert stats['processed'] == 3
+        assert stats['avg_seconds'] >= 0.01
+        assert stats['capacity_per_sec'] > 0
+        assert 0 < stats['utilization'] <= 1
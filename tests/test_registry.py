@@ -0,0 +1,130 @@
+"""Tests for the model registry module."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from registry import ModelRegistry, apply_cpu_precision
+
+
+class TestModelRegistry:
+    """Tests for the ModelRegistry class."""
+
+    def test_loads_once(self):
+        """Test that a model is loaded only once per key."""
+        registry = ModelRegistry()
+        loader = MagicMock(return_value='model')
+
+        assert registry.get('m', 'cpu', loader) == 'model'
+        assert registry.get('m', 'cpu', loader) == 'model'
+        loader.assert_called_once()
+
+    def test_keyed_by_device(self):
+        """Test that the same model on different devices is cached separately."""
+        registry = ModelRegistry()
+        registry.get('m', 'cpu', lambda: 'cpu-model')
+        registry.get('m', 'cuda', lambda: 'cuda-model')
+
+        assert registry.get('m', 'cpu', MagicMock()) == 'cpu-model'
+        assert registry.get('m', 'cuda', MagicMock()) == 'cuda-model'
+
+    def test_concurrent_get_loads_once(self):
+        """Test that concurrent callers wait for a single load."""
+        registry = ModelRegistry()
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'model'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                registry.get('m', 'cpu', slow_loader)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['model'] * 8
+
+    def test_stats(self):
+        """Test that load statistics are reported per model."""
+        registry = ModelRegistry()
+        registry.get('m', 'cpu', lambda: 'model')
+
+        stats = registry.stats()
+        assert len(stats) == 1
+        assert stats[0]['name'] == 'm'
+        assert stats[0]['device'] == 'cpu'
+        assert stats[0]['load_seconds'] >= 0
+        assert stats[0]['rss_bytes'] >= 0
+
+    def test_unload_and_clear(self):
+        """Test that unloaded models are reloaded on next use."""
+        registry = ModelRegistry()
+        registry.get('m', 'cpu', lambda: 'model')
+        assert registry.is_loaded('m')
+
+        registry.unload('m', 'cpu')
+        assert not registry.is_loaded('m', 'cpu')
+
+        registry.get('m', 'cpu', lambda: 'model')
+        registry.clear()
+        assert registry.stats() == []
+
+
+class TestCpuPrecision:
+    """Tests for per-model CPU precision."""
+
+    def test_set_precision(self):
+        registry = ModelRegistry()
+        registry.allow_precision('m')
+        assert registry.precision('m') == 'float32'
+        registry.set_precision('m', 'int8')
+        assert registry.precision('m') == 'int8'
+        registry.get('m', 'cpu', lambda: 'model')
+        assert registry.stats()[0]['precision'] == 'int8'
+        with pytest.raises(ValueError):
+            registry.set_precision('m', 'int4')
+
+    def test_precision_rejected_for_other_models(self):
+        registry = ModelRegistry()
+        with pytest.raises(ValueError):
+            registry.set_precision('easyocr', 'int8')
+
+    def test_stats_report_bfloat16_fallback(self):
+        registry = ModelRegistry()
+        registry.allow_precision('m')
+        registry.set_precision('m', 'bfloat16')
+        with patch('registry.cpu_supports_bf16', return_value=False):
+            registry.get('m', 'cpu', lambda: 'model')
+        assert registry.precision('m') == 'bfloat16'
+        assert registry.stats()[0]['precision'] == 'float32'
+
+    def test_int8_quantizes_linear_layers(self):
+        torch = pytest.importorskip('torch')
+        model = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.ReLU(), torch.nn.Linear(8, 2))
+        inputs = torch.randn(4, 8)
+        expected = model(inputs)
+
+        quantized = apply_cpu_precision(model, 'int8')
+
+        assert 'quantized' in type(quantized[0]).__module__
+        assert torch.allclose(quantized(inputs), expected, atol=0.1)
+        assert apply_cpu_precision(model, 'float32') is model
+
+    def test_bfloat16_needs_cpu_support(self):
+        torch = pytest.importorskip('torch')
+        with patch('registry.cpu_supports_bf16', return_value=False):
+            assert apply_cpu_precision(torch.nn.Linear(4, 4), 'bfloat16').weight.dtype == torch.float32
+        with patch('registry.cpu_supports_bf16', return_value=True):
+            assert apply_cpu_precision(torch.nn.Linear(4, 4), 'bfloat16').weight.dtype == torch.bfloat16
+        with pytest.raises(ValueError):
+            apply_cpu_precision(torch.nn.Linear(4, 4), 'fp8')
@@ -0,0 +1,69 @@
+"""Tests for the rule-based relations module."""
+
+from relation_rules import extract_rule_relations
+
+
+def spans_for(text, entities):
+    """Span dicts for (substring, type) pairs, located in the text."""
+    spans = []
+    for substring, label in entities:
+        start = text.index(substring)
+        spans.append({'start': start, 'stop': start + len(substring), 'type': label, 'source': 'ner'})
+    return spans
+
+
+class TestExtractRuleRelations:
+    """Tests for extract_rule_relations."""
+
+    def test_birth_and_parents(self):
+        text = ("Иван Петрович родился 15 марта 1890 года в Москве. "
+                "Его отец Пётр Сергеевич, а мать Анна Михайловна. "
+                "Крестила его Мария Сидорова в церкви села Коломенское.")
+        spans = spans_for(text, [('Иван Петрович', 'per'), ('1890 года', 'date'), ('Москве', 'loc'),
+                                 ('Пётр Сергеевич', 'per'), ('Анна Михайловна', 'per'),
+                                 ('Мария Сидорова', 'per'), ('Коломенское', 'loc')])
+
+        relations, coverage = extract_rule_relations(text, spans)
+
+        assert relations == [
+            ('Иван Петрович', 'дата рождения', '1890 года'),
+            ('Иван Петрович', 'место рождения', 'Москве'),
+            ('Пётр Сергеевич', 'родитель', 'Иван Петрович'),
+            ('Анна Михайловна', 'родитель', 'Иван Петрович'),
+            ('Мария Сидорова', 'крестил', 'Иван Петрович'),
+            ('Иван Петрович', 'место крещения', 'Коломенское'),
+        ]
+        assert coverage == 1.0
+
+    def test_dates_attach_to_their_own_event(self):
+        text = ("Князь Алексей Дмитриевич Щербаков, 1845 года рождения, "
+                "скончался в Санкт-Петербурге в 1912 году. Его жена — Екатерина Васильевна.")
+        spans = spans_for(text, [('Алексей Дмитриевич Щербаков', 'per'), ('1845 года', 'date'),
+                                 ('Санкт-Петербурге', 'loc'), ('1912 году', 'date'),
+                                 ('Екатерина Васильевна', 'per')])
+
+        relations, _ = extract_rule_relations(text, spans)
+
+        assert set(relations) == {
+            ('Алексей Дмитриевич Щербаков', 'дата рождения', '1845 года'),
+            ('Алексей Дмитриевич Щербаков', 'место смерти', 'Санкт-Петербурге'),
+            ('Алексей Дмитриевич Щербаков', 'дата смерти', '1912 году'),
+            ('Екатерина Васильевна', 'супруг', 'Алексей Дмитриевич Щербаков'),
+        }
+
+    def test_child_named_before_trigger(self):
+        text = "Иван, сын Петра Смирнова, женат на Марии Орловой."
+        spans = spans_for(text, [('Иван', 'per'), ('Петра Смирнова', 'per'), ('Марии Орловой', 'per')])
+
+        relations, _ = extract_rule_relations(text, spans)
+
+        assert relations == [('Петра Смирнова', 'родитель', 'Иван'), ('Марии Орловой', 'супруг', 'Иван')]
+
+    def test_low_coverage_without_templates(self):
+        text = "Письмо Анны Ковалевой отправлено из Казани в 1912 году."
+        spans = spans_for(text, [('Анны Ковалевой', 'per'), ('Казани', 'loc'), ('1912 году', 'date')])
+
+        assert extract_rule_relations(text, spans) == ([], 0.0)
+
+    def test_no_entities(self):
+        assert extract_rule_relations("Текст без имён.", []) == ([], 1.0)
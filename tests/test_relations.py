@@ -1,7 +1,14 @@
 """Tests for the relations extraction module."""
 
+import threading
+from types import SimpleNamespace
 from unittest.mock import patch
-from relations import extract_relations, _parse_llm_response
+
+import pytest
+
+import relations
+from relations import extract_relations, extract_relations_batch, RelationBatcher, PromptPrefix, _parse_llm_response
+from relations import relation_windows, merge_relations, TupleStreamParser, ListClosedCriteria
 
 
 class TestParseLlmResponse:
@@ -108,3 +115,344 @@ class TestExtractRelations:
 
         result = extract_relations("Иван родился в Москве.")
         assert result == []
+
+
+class TestExtractRelationsBatch:
+    """Tests for batched relation extraction."""
+
+    @patch('relations._load_model')
+    @patch('relations._generator')
+    @patch('relations._tokenizer')
+    def test_one_generation_call_for_batch(self, mock_tokenizer, mock_generator, mock_load):
+        """Texts share one generation call; short texts skip the model."""
+        mock_tokenizer.eos_token_id = 0
+        mock_tokenizer.apply_chat_template.side_effect = lambda messages, **kwargs: messages[1]['content']
+        mock_generator.side_effect = lambda prompts, **kwargs: [
+            [{"generated_text": prompt + f"[('Doc{i}', 'родитель', 'Иван')]"}]
+            for i, prompt in enumerate(prompts)
+        ]
+
+        texts = ["Пётр — отец Ивана.", "Коротко", "Мария — мать Ивана."]
+        result = extract_relations_batch(texts)
+
+        mock_generator.assert_called_once()
+        assert mock_generator.call_args.kwargs['batch_size'] == 2
+        assert result == [[('Doc0', 'родитель', 'Иван')], [], [('Doc1', 'родитель', 'Иван')]]
+
+    @patch('relations._load_model')
+    @patch('relations._generator')
+    @patch('relations._tokenizer')
+    def test_batch_error(self, mock_tokenizer, mock_generator, mock_load):
+        """A model error empties the whole batch or is re-raised."""
+        mock_tokenizer.eos_token_id = 0
+        mock_tokenizer.apply_chat_template.return_value = "formatted prompt"
+        mock_generator.side_effect = RuntimeError("Model error")
+
+        texts = ["Пётр — отец Ивана.", "Мария — мать Ивана."]
+        assert extract_relations_batch(texts) == [[], []]
+        with pytest.raises(RuntimeError):
+            extract_relations_batch(texts, raise_errors=True)
+
+
+class TestRelationBatcher:
+    """Tests for the dynamic request batcher."""
+
+    def test_concurrent_requests_share_batch(self):
+        """Requests arriving within the wait window run as one batch."""
+        calls = []
+
+        def extract_batch(texts, callbacks):
+            calls.append(list(texts))
+            return [[(text, 'длина', str(len(text)))] for text in texts]
+
+        batcher = RelationBatcher(max_batch=4, max_wait=0.5, extract_batch=extract_batch)
+        texts = [f"Документ номер {i}" for i in range(4)]
+        results = {}
+
+        def worker(text):
+            results[text] = batcher.extract(text)
+
+        threads = [threading.Thread(target=worker, args=(text,)) for text in texts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == texts
+        for text in texts:
+            assert results[text] == [(text, 'длина', str(len(text)))]
+        assert batcher.stats()['avg_batch_size'] == 4
+
+    def test_batch_size_limit(self):
+        """A full batch runs without waiting for the deadline."""
+        calls = []
+
+        def extract_batch(texts, callbacks):
+            calls.append(len(texts))
+            return [[] for _ in texts]
+
+        batcher = RelationBatcher(max_batch=2, max_wait=0.5, extract_batch=extract_batch)
+        futures = [batcher.submit(f"Документ номер {i}") for i in range(3)]
+        for future in futures:
+            assert future.result(timeout=5) == []
+        assert calls == [2, 1]
+
+    def test_error_propagates_to_callers(self):
+        """Every caller of a failed batch gets the model error."""
+        def extract_batch(texts, callbacks):
+            raise RuntimeError("Model error")
+
+        batcher = RelationBatcher(max_batch=2, max_wait=0.01, extract_batch=extract_batch)
+        with pytest.raises(RuntimeError):
+            batcher.extract("Пётр — отец Ивана.")
+
+
+class CharTokenizer:
+    """Character-level stand-in tokenizer for a tiny random model."""
+
+    pad_token_id = 1
+    eos_token_id = 2
+
+    def __call__(self, text, return_tensors=None, add_special_tokens=False):
+        import torch
+        ids = [3 + ord(char) % 250 for char in text]
+        return SimpleNamespace(input_ids=torch.tensor([ids]) if return_tensors == 'pt' else ids)
+
+    def batch_decode(self, rows, skip_special_tokens=True):
+        return [' '.join(str(int(token)) for token in row if int(token) > 2) for row in rows]
+
+
+class TestPromptPrefix:
+    """Tests for the prompt prefix KV cache."""
+
+    @pytest.fixture
+    def greedy(self, monkeypatch):
+        monkeypatch.setattr('relations._generation_kwargs', lambda tokenizer=None: {
+            'max_new_tokens': 6, 'do_sample': False, 'pad_token_id': 2})
+
+    def test_matches_generation_without_cache(self, greedy):
+        """Cached-prefix generation equals full-prompt generation, single and batched."""
+        torch = pytest.importorskip('torch')
+        transformers = pytest.importorskip('transformers')
+        torch.manual_seed(0)
+        config = transformers.Qwen2Config(vocab_size=256, hidden_size=32, intermediate_size=64,
+                                          num_hidden_layers=2, num_attention_heads=4,
+                                          num_key_value_heads=2)
+        model = transformers.Qwen2ForCausalLM(config).eval()
+        tokenizer = CharTokenizer()
+
+        prefix = PromptPrefix(tokenizer, model)
+        prompts = [relations._format_prompt(text, tokenizer)
+                   for text in ("Иван родился в Москве.", "Пётр — отец Ивана, жил в Туле.")]
+        assert all(prompt.startswith(prefix.text) for prompt in prompts)
+
+        expected = []
+        for prompt in prompts:
+            ids = tokenizer(prompt, return_tensors='pt').input_ids
+            output = model.generate(input_ids=ids, attention_mask=torch.ones_like(ids),
+                                    max_new_tokens=6, do_sample=False, pad_token_id=2)
+            expected.append(tokenizer.batch_decode(output[:, ids.shape[1]:])[0])
+
+        assert prefix.generate(prompts) == expected
+        assert prefix.generate(prompts[:1]) == expected[:1]
+
+    @patch('relations._load_model')
+    @patch('relations._generator')
+    @patch('relations._tokenizer')
+    def test_extract_relations_uses_prefix(self, mock_tokenizer, mock_generator, mock_load, monkeypatch):
+        """With a cached prefix the pipeline is bypassed."""
+        mock_tokenizer.apply_chat_template.return_value = "formatted prompt"
+        prefix = SimpleNamespace(generate=lambda prompts, criteria=None: ["[('Иван', 'место рождения', 'Москва')]"])
+        monkeypatch.setattr('relations._prefix', prefix)
+
+        assert extract_relations("Иван родился в Москве.") == [('Иван', 'место рождения', 'Москва')]
+        mock_generator.assert_not_called()
+
+
+class TestCacheVersion:
+    """Tests for the relation cache version."""
+
+    def test_includes_effective_precision(self, monkeypatch):
+        monkeypatch.setattr('relations.registry._precisions', {})
+        float32 = relations.cache_version('cpu')
+
+        relations.registry.set_precision(relations.MODEL_NAME, 'int8')
+        assert relations.cache_version('cpu') == f"{relations.PROMPT_VERSION}-int8" != float32
+        assert relations.cache_version('cuda') == f"{relations.PROMPT_VERSION}-float16"
+
+        relations.registry.set_precision(relations.MODEL_NAME, 'bfloat16')
+        with patch('registry.cpu_supports_bf16', return_value=False):
+            assert relations.cache_version('cpu') == float32
+
+
+def count_words(text):
+    return len(text.split())
+
+
+class TestRelationWindows:
+    """Tests for long-document windowing and merging."""
+
+    def test_short_text_single_window(self):
+        assert relation_windows("  Иван родился в Москве. ", count_tokens=count_words) == ["Иван родился в Москве."]
+
+    def test_windows_overlap_and_respect_budget(self):
+        text = " ".join(f"Предложение номер {i}." for i in range(10))
+        windows = relation_windows(text, max_tokens=9, overlap=1, count_tokens=count_words)
+
+        assert len(windows) > 1
+        assert all(count_words(window) <= 9 for window in windows)
+        for previous, following in zip(windows, windows[1:]):
+            last_sentence = previous.rsplit(" Предложение", 1)[-1].strip()
+            assert following.endswith(last_sentence) or last_sentence in following
+        # Каждое предложение попало хотя бы в одно окно
+        for i in range(10):
+            assert any(f"номер {i}." in window for window in windows)
+
+    def test_long_sentence_own_window(self):
+        text = "Коротко. Очень " + "очень " * 20 + "длинно. Конец."
+        windows = relation_windows(text, max_tokens=5, overlap=1, count_tokens=count_words)
+        assert windows[0] == "Коротко."
+        assert any(count_words(window) > 5 for window in windows)
+        assert windows[-1].endswith("Конец.")
+
+    def test_merge_deduplicates_normalized(self):
+        merged = merge_relations([
+            [("Иван Петрович", "родитель", "Пётр"), ("Иван", "место рождения", "Москва")],
+            [("иван  петрович", "Родитель", "«Петр»."), ("Анна", "супруг", "Иван")],
+            [("", "родитель", "Пётр")],
+        ])
+        assert merged == [("Иван Петрович", "родитель", "Пётр"),
+                          ("Иван", "место рождения", "Москва"),
+                          ("Анна", "супруг", "Иван")]
+
+    @patch('relations._load_model')
+    @patch('relations._generator')
+    @patch('relations._tokenizer')
+    def test_long_document_windows_batched_and_merged(self, mock_tokenizer, mock_generator,
+                                                      mock_load, monkeypatch):
+        """Windows of a long text share generation calls and their relations are merged."""
+        monkeypatch.setattr('relations._count_tokens', count_words)
+        monkeypatch.setattr('relations.WINDOW_TOKENS', 8)
+        monkeypatch.setattr('relations.MAX_BATCH_WINDOWS', 2)
+        mock_tokenizer.eos_token_id = 0
+        mock_tokenizer.apply_chat_template.side_effect = lambda messages, **kwargs: messages[1]['content']
+
+        def generate(prompts, **kwargs):
+            if not isinstance(prompts, list):
+                return [{"generated_text": prompts + "[('Иван', 'родитель', 'Пётр')]"}]
+            return [[{"generated_text": prompt + "[('Иван', 'родитель', 'Пётр')]"}] for prompt in prompts]
+
+        mock_generator.side_effect = generate
+        text = " ".join(f"Иван Петров упомянут {i} раз." for i in range(6))
+
+        assert extract_relations(text) == [('Иван', 'родитель', 'Пётр')]
+        prompts = sum((call.args[0] if isinstance(call.args[0], list) else [call.args[0]]
+                       for call in mock_generator.call_args_list), [])
+        assert len(prompts) > 2
+        assert all(len(call.args[0]) <= 2 for call in mock_generator.call_args_list
+                   if isinstance(call.args[0], list))
+
+
+class TestTupleStreamParser:
+    """Tests for the incremental relation list parser."""
+
+    def test_tuples_emitted_when_complete(self):
+        response = ("Вот ответ: [('Иван', 'место рождения', 'Москва'),\n"
+                    "('Пётр (старший)', \"родитель\", 'Иван [сын]')] Комментарий: (\'x\', \'y\', \'z\')")
+        parser = TupleStreamParser()
+        emitted = []
+        for i, char in enumerate(response):
+            for relation in parser.feed(char):
+                emitted.append((relation, i))
+
+        assert [relation for relation, _ in emitted] == [
+            ('Иван', 'место рождения', 'Москва'),
+            ('Пётр (старший)', 'родитель', 'Иван [сын]'),
+        ]
+        # Кортеж выдаётся на его закрывающей скобке
+        assert response[emitted[0][1]] == ')'
+        assert parser.closed
+        assert parser.feed("[('a', 'b', 'c')]") == []
+
+    def test_escaped_quote_and_invalid_tuples(self):
+        parser = TupleStreamParser()
+        relations = parser.feed("[('д\\'Артаньян', 'служба', 'мушкетёры'), ('a', 'b'), ('', 'x', 'y'), ")
+        assert relations == [("д'Артаньян", 'служба', 'мушкетёры')]
+        assert not parser.closed
+
+
+class CharDecoder:
+    """Decodes token ids as character codes."""
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ''.join(chr(int(token)) for token in ids)
+
+
+class TestListClosedCriteria:
+    """Tests for the early-stopping criterion."""
+
+    def test_rows_stop_when_list_closed(self):
+        torch = pytest.importorskip('torch')
+        prompt = [ord(char) for char in "prompt"]
+        generated = ["[('Иван', 'родитель', 'Пётр')] и ещё текст", "[('Анна', 'супруг', 'Иван'), ('x"]
+        emitted = []
+        criteria = ListClosedCriteria(CharDecoder(), on_tuple=lambda row, relation: emitted.append((row, relation)))
+
+        stopped_at = [None, None]
+        for step in range(1, 40):
+            rows = [prompt + [ord(char) for char in text[:step].ljust(step)] for text in generated]
+            done = criteria(torch.tensor(rows), None)
+            assert done.dtype == torch.bool and done.shape == (2,)
+            for row in range(2):
+                if done[row] and stopped_at[row] is None:
+                    stopped_at[row] = step
+
+        assert stopped_at[0] == generated[0].index(']') + 1
+        assert stopped_at[1] is None
+        assert sorted(emitted) == [(0, ('Иван', 'родитель', 'Пётр')), (1, ('Анна', 'супруг', 'Иван'))]
+        assert criteria.generated_tokens == [stopped_at[0], 39]
+
+    def test_decodes_only_new_tokens(self):
+        torch = pytest.importorskip('torch')
+        decoded = []
+
+        class ByteDecoder:
+            """Tokens are UTF-8 bytes, so Cyrillic letters span two tokens."""
+
+            def decode(self, ids, skip_special_tokens=True):
+                decoded.append(len(ids))
+                return bytes(int(token) for token in ids).decode('utf-8', errors='replace')
+
+        emitted = []
+        criteria = ListClosedCriteria(ByteDecoder(), on_tuple=lambda row, relation: emitted.append(relation))
+        generated = list("[('Иван', 'родитель', 'Пётр'), ('Анна', 'супруг', 'Иван')]".encode('utf-8'))
+        for step in range(1, len(generated) + 1):
+            done = criteria(torch.tensor([[0] + generated[:step]]), None)
+
+        assert done.tolist() == [True]
+        assert emitted == [('Иван', 'родитель', 'Пётр'), ('Анна', 'супруг', 'Иван')]
+        # Декодируются несколько последних токенов, а не весь ответ
+        assert max(decoded) <= 4
+
+
+class TestStreamingRelations:
+    """Tests for relation callbacks during extraction."""
+
+    @patch('relations._load_model')
+    @patch('relations._tokenizer')
+    def test_on_relation_receives_deduplicated_relations(self, mock_tokenizer, mock_load, monkeypatch):
+        mock_tokenizer.apply_chat_template.side_effect = lambda messages, **kwargs: messages[1]['content']
+
+        def generate(prompts, on_tuple=None):
+            for row in range(len(prompts)):
+                on_tuple(row, ('Иван', 'родитель', 'Пётр'))
+                on_tuple(row, (' иван', 'Родитель', '«Пётр»'))
+            return ["[('Иван', 'родитель', 'Пётр')]" for _ in prompts]
+
+        monkeypatch.setattr('relations._generate', generate)
+        streamed = []
+        result = extract_relations("Пётр — отец Ивана.", on_relation=streamed.append)
+
+        assert result == [('Иван', 'родитель', 'Пётр')]
+        assert streamed == [('Иван', 'родитель', 'Пётр')]
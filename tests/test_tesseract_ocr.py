@@ -0,0 +1,68 @@
+"""Tests for the Tesseract OCR module."""
+
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw
+
+from tesseract_ocr import perform_tesseract_ocr, segment_blocks
+
+
+def two_column_page():
+    """Heading, two columns of two paragraphs each, a footer across the page."""
+    page = Image.new('L', (1200, 1600), 255)
+    draw = ImageDraw.Draw(page)
+    draw.rectangle((100, 50, 1100, 100), fill=0)
+    for top in (200, 230, 260, 600, 630):
+        draw.rectangle((100, top, 550, top + 20), fill=0)
+    for top in (200, 230, 700, 730, 760):
+        draw.rectangle((650, top, 1000, top + 20), fill=0)
+    draw.rectangle((100, 1200, 1100, 1250), fill=0)
+    return page
+
+
+@pytest.fixture
+def page(tmp_path):
+    path = tmp_path / 'page.png'
+    two_column_page().save(path)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def tesseract(monkeypatch):
+    monkeypatch.setattr('tesseract_ocr.get_tesseract', lambda: '5.3.0')
+
+
+def test_segment_blocks_reading_order():
+    boxes = segment_blocks(two_column_page())
+
+    # Заголовок, левая колонка сверху вниз, правая колонка, подвал
+    assert [(box[0] // 100, box[1] // 100) for box in boxes] == [
+        (0, 0), (0, 1), (0, 5), (6, 1), (6, 6), (0, 11)
+    ]
+    # Строки абзаца склеены в один блок
+    assert boxes[1][3] - boxes[1][1] > 80
+
+
+def test_segment_blocks_blank_page():
+    assert segment_blocks(Image.new('L', (400, 300), 255)) == []
+
+
+@patch('tesseract_ocr.pytesseract.image_to_string')
+def test_parallel_blocks_joined_in_reading_order(image_to_string, page):
+    # Текст блока - размер вырезки, у всех блоков он разный
+    image_to_string.side_effect = lambda crop, **kwargs: f"{crop.width}x{crop.height}\n"
+
+    text = perform_tesseract_ocr(page, workers=4)
+
+    assert image_to_string.call_count == 6
+    assert text.split('\n\n') == ['1036x86', '486x116', '486x86', '386x86', '386x116', '1036x86']
+
+
+@patch('tesseract_ocr.pytesseract.image_to_string')
+def test_single_worker_reads_whole_page(image_to_string, page):
+    image_to_string.return_value = ' Текст страницы \n'
+
+    assert perform_tesseract_ocr(page) == 'Текст страницы'
+    image_to_string.assert_called_once()
+    assert image_to_string.call_args.args[0].size == (1200, 1600)
@@ -1,4 +1,4 @@
-from ner import translate_text
+from ner import translate_text, translate_with_offsets, translate_chunks, OffsetMap
 
 
 def test_translate_text():
@@ -14,3 +14,37 @@ def test_translate_text_no_changes():
     input_text = "Иду по улице с собакой."
     result = translate_text(input_text)
     assert result == input_text
+
+
+def test_translate_text_whitespace_and_hard_signs():
+    """Тест удаления твердых знаков и схлопывания пробелов."""
+    assert translate_text("  Въ  городѣ\n\nъ Ъ объявленiе  ") == "В городе обявление"
+
+
+def test_translate_with_offsets():
+    """Тест карты смещений от переведенного текста к исходному."""
+    original = "Иванъ  въ Москвѣ"
+    translated, offsets = translate_with_offsets(original)
+
+    assert translated == "Иван в Москве"
+    start = translated.index("Москве")
+    assert offsets.span_to_original(start, start + len("Москве")) == (10, 16)
+    assert original[10:16] == "Москвѣ"
+    assert offsets.span_to_original(0, 4) == (0, 4)
+
+
+def test_translate_chunks_matches_translate_text():
+    """Тест: перевод по частям совпадает с переводом целого текста."""
+    text = " Съ  бумагами\nъ объявленiя Ѳомы,  1912 г. "
+    expected = translate_text(text)
+
+    for size in range(1, len(text) + 1):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert "".join(translate_chunks(chunks)) == expected
+
+        offsets = OffsetMap()
+        translated = "".join(translate_chunks(chunks, offsets))
+        assert translated == expected
+        for pos, char in enumerate(translated):
+            source = text[offsets.to_original(pos)]
+            assert source.isspace() if char == " " else translate_text(source) == char